@@ -0,0 +1,141 @@
+"""
+This file contains the generators of the synthetic benchmark inputs:
+dictionaries, misspelled words and directories of text files.
+Every generator takes a random.Random instance, so the inputs are reproducible from a seed.
+"""
+
+import json
+import os
+import string
+
+from src.trie import TrieIndex
+from src.utils import damerau_levenshtein_distance
+
+ALPHABET = string.ascii_lowercase
+
+
+def random_word(rng, min_length, max_length):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(min_length, max_length)))
+
+
+def generate_dictionary(rng, base_dictionary, size, max_word_length):
+    """
+    Makes a dictionary of the given size. The base dictionary's words are kept (as many as fit),
+    the rest is filled with random words whose counts follow a Zipf-like distribution.
+
+    :param rng: random number generator.
+    :param base_dictionary: mapping of real words to their likelihood (e.g. htc-dictionary.json).
+    :param size: number of words in the generated dictionary.
+    :param max_word_length: maximum length of the random words.
+    :return: dictionary of words and their likelihood.
+    """
+    dictionary = dict(sorted(base_dictionary.items())[:size])
+
+    rank = 1
+    while len(dictionary) < size:
+        word = random_word(rng, 3, max_word_length)
+        if word not in dictionary:
+            dictionary[word] = max(1, 100000 // rank)
+            rank += 1
+
+    return dictionary
+
+
+def edit(rng, word):
+    """
+    :return: the word with a random deletion, insertion, substitution or transposition.
+    """
+    position = rng.randrange(len(word))
+    operation = rng.choice('disst' if len(word) > 1 else 'is')
+
+    if operation == 'd':
+        return word[:position] + word[position + 1:]
+    elif operation == 'i':
+        return word[:position] + rng.choice(ALPHABET) + word[position:]
+    elif operation == 's':
+        return word[:position] + rng.choice(ALPHABET) + word[position + 1:]
+
+    position = min(position, len(word) - 2)
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+def generate_misspellings(rng, dictionary, count, min_length=1, max_length=25, max_tries=100000):
+    """
+    Makes words for every correction case: known words (distance 0), words whose closest dictionary word is
+    1 or 2 edits away and words without any dictionary word within 2 edits (no hit).
+
+    :param rng: random number generator.
+    :param dictionary: mapping of known words to their likelihood.
+    :param count: number of words per case (fewer if they can't be found in max_tries).
+    :param min_length: minimum length of the words.
+    :param max_length: maximum length of the words.
+    :param max_tries: maximum number of generated words.
+    :return: dictionary which maps 'distance0', 'distance1', 'distance2' and 'nohit' to lists of words.
+    """
+    words = [word for word in dictionary if min_length <= len(word) <= max_length]
+    index = TrieIndex(2)
+    index.build(dictionary)
+
+    cases = {'distance0': [], 'distance1': [], 'distance2': [], 'nohit': []}
+    cases['distance0'] = [rng.choice(words) for _ in range(count)]
+
+    for _ in range(max_tries):
+        if all(len(case) >= count for case in cases.values()):
+            break
+
+        if len(cases['nohit']) < count and rng.random() < 0.25:
+            word = random_word(rng, min_length, max_length)
+        else:
+            word = rng.choice(words)
+            for _ in range(rng.choice((1, 2))):
+                word = edit(rng, word)
+
+        if not word or word in dictionary:
+            continue
+
+        closest = index.lookup(word)
+        if not closest:
+            case = 'nohit'
+        else:
+            case = 'distance%d' % damerau_levenshtein_distance(word, next(iter(closest)))
+
+        if len(cases[case]) < count:
+            cases[case].append(word)
+
+    return cases
+
+
+def generate_text_files(rng, directory_path, dictionary, file_count, lines_per_file, typo_rate=0.02):
+    """
+    Writes text files made of dictionary words and some misspellings into a directory tree.
+
+    :param rng: random number generator.
+    :param directory_path: path to an existing directory.
+    :param dictionary: mapping of known words to their likelihood.
+    :param file_count: number of files.
+    :param lines_per_file: number of lines in a file.
+    :param typo_rate: probability of a word being misspelled.
+    :return: list of the written files' paths.
+    """
+    words = sorted(dictionary)
+    file_paths = []
+
+    for file_index in range(file_count):
+        subdirectory_path = os.path.join(directory_path, 'part%d' % (file_index % 10))
+        if not os.path.isdir(subdirectory_path):
+            os.makedirs(subdirectory_path)
+
+        file_path = os.path.join(subdirectory_path, 'file%d.adoc' % file_index)
+        with open(file_path, 'w') as f:
+            for _ in range(lines_per_file):
+                line_words = [rng.choice(words) for _ in range(rng.randint(5, 15))]
+                line_words = [edit(rng, word) if rng.random() < typo_rate else word for word in line_words]
+                f.write(' '.join(line_words) + '.\n')
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+def write_dictionary(dictionary, dictionary_file_path):
+    with open(dictionary_file_path, 'w') as f:
+        json.dump(dictionary, f, sort_keys=True, indent=2, separators=(',', ': '))
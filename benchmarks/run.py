@@ -0,0 +1,298 @@
+#!/usr/bin/python2
+
+"""
+This script measures the speed of the typo-finder's hot paths on synthetic inputs.
+It runs offline: every input is generated from the seed into a temporary directory.
+The results can be saved as JSON and compared to an earlier (baseline) result file.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import textwrap
+import platform
+import subprocess
+
+# The benchmarks use the modules of the repository they are in.
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_PATH)
+
+from src.linguist import Linguist, ENGINES
+from src.utils import get_words, is_text_file, find_text_file_abs_paths
+from benchmarks.corpus import generate_dictionary, generate_misspellings, generate_text_files, write_dictionary
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+
+def set_logging_verbosity(level):
+    if not level:
+        _root_log.setLevel(logging.WARNING)
+    elif level == 1:
+        _root_log.setLevel(logging.INFO)
+    else:
+        _root_log.setLevel(logging.DEBUG)
+
+
+def get_arguments():
+    description = 'Measure the speed of the typo-finder on synthetic inputs.'
+    epilog = textwrap.dedent("""
+    example usages:
+      benchmarks/run.py -o baseline.json
+                            Run every benchmark with the default sizes and
+                            save the results into baseline.json.
+      benchmarks/run.py --dictionary-size 1000000 --max-word-length 25 -b correct
+                            Measure only the correction of words with a
+                            dictionary of a million words (the words of
+                            htc-dictionary.json and random words up to 25
+                            characters).
+      benchmarks/run.py -c baseline.json --tolerance 0.1
+                            Run every benchmark and compare the results to
+                            baseline.json. Exit with an error if any of them is
+                            more than 10% slower.
+    """)
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description=description,
+                                     epilog=epilog)
+    parser.add_argument('-v', '--verbose', action='count', help='increase verbosity level.')
+    parser.add_argument('-d', '--dictionary',
+                        help='base dictionary of the generated dictionary (\'htc-dictionary.json\' by default).',
+                        type=str, default=os.path.join(REPOSITORY_PATH, 'htc-dictionary.json'),
+                        metavar='DICTIONARY_FILE')
+    parser.add_argument('--dictionary-size',
+                        help='number of words in the generated dictionary (size of the base dictionary by default).',
+                        type=int, metavar='N')
+    parser.add_argument('--max-word-length',
+                        help='maximum length of the generated words (25 by default).',
+                        type=int, default=25, metavar='N')
+    parser.add_argument('--words',
+                        help='number of corrected words per case (20 by default).',
+                        type=int, default=20, metavar='N')
+    parser.add_argument('--files',
+                        help='number of generated text files (200 by default).',
+                        type=int, default=200, metavar='N')
+    parser.add_argument('--lines',
+                        help='number of lines in a generated text file (50 by default).',
+                        type=int, default=50, metavar='N')
+    parser.add_argument('--engine',
+                        help='correction engine to measure (every engine by default).',
+                        action='append', choices=ENGINES)
+    parser.add_argument('-b', '--benchmark',
+                        help='run only the benchmarks whose name contains this text.',
+                        action='append', metavar='NAME')
+    parser.add_argument('-r', '--repeat',
+                        help='number of measurements per benchmark, the fastest is kept (3 by default).',
+                        type=int, default=3, metavar='N')
+    parser.add_argument('--seed', help='seed of the generated inputs (0 by default).', type=int, default=0)
+    parser.add_argument('-o', '--output', help='save the results into a JSON file.', type=str, metavar='RESULT_FILE')
+    parser.add_argument('-c', '--compare',
+                        help='compare the results to a baseline result file, exit with 1 on regression.',
+                        type=str, metavar='BASELINE_FILE')
+    parser.add_argument('--tolerance',
+                        help='allowed slowdown compared to the baseline (0.2 = 20%% by default).',
+                        type=float, default=0.2)
+
+    return parser.parse_args()
+
+
+def measure(function, repeat):
+    """
+    :param function: function without arguments.
+    :param repeat: number of calls.
+    :return: the shortest run time of the function in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return min(times)
+
+
+class BenchmarkSuite(object):
+    """
+    Generates the inputs into a temporary directory and runs the selected benchmarks on them.
+    """
+    def __init__(self, args):
+        self._args = args
+        self._rng = random.Random(args.seed)
+        self._results = {}
+        self._directory_path = None
+
+        with open(args.dictionary) as f:
+            base_dictionary = json.load(f)
+        size = args.dictionary_size or len(base_dictionary)
+        self._dictionary = generate_dictionary(self._rng, base_dictionary, size, args.max_word_length)
+
+    def _is_selected(self, name):
+        return not self._args.benchmark or any(text in name for text in self._args.benchmark)
+
+    def _record(self, name, function, operations=1):
+        """
+        Measures a function and records the time of one operation.
+
+        :param name: name of the benchmark.
+        :param function: function without arguments.
+        :param operations: number of operations done by one call of the function.
+        """
+        if not self._is_selected(name):
+            return
+
+        seconds = measure(function, self._args.repeat) / max(1, operations)
+        self._results[name] = {'seconds': seconds, 'operations': operations}
+        print("{0:48} {1:>14.6f} ms".format(name, seconds * 1000))
+        sys.stdout.flush()
+
+    def run(self):
+        """
+        :return: dictionary of the results (benchmark name to seconds per operation).
+        """
+        self._directory_path = tempfile.mkdtemp(prefix='typofinder-benchmark-')
+        try:
+            self._run_dictionary_benchmarks()
+            self._run_linguist_benchmarks()
+            self._run_utils_benchmarks()
+            self._run_driver_benchmarks()
+        finally:
+            shutil.rmtree(self._directory_path)
+
+        return self._results
+
+    def _run_dictionary_benchmarks(self):
+        self._dictionary_file_path = os.path.join(self._directory_path, 'dictionary.json')
+        write_dictionary(self._dictionary, self._dictionary_file_path)
+
+        linguist = Linguist()
+        self._record('linguist.load_dictionary_from_json',
+                     lambda: linguist.load_dictionary_from_json(self._dictionary_file_path))
+        self._record('linguist.save_dictionary_to_json',
+                     lambda: linguist.save_dictionary_to_json(os.path.join(self._directory_path, 'saved.json')))
+
+    def _run_linguist_benchmarks(self):
+        engines = self._args.engine or ENGINES
+        case_names = ('distance0', 'distance1', 'distance2', 'nohit')
+        names = dict((engine, ['linguist.load_dictionary[%s]' % engine, 'linguist.correct_many[%s]' % engine] +
+                      ['linguist.correct[%s].%s' % (engine, case) for case in case_names])
+                     for engine in engines)
+
+        if not self._is_selected('linguist.not_known') and \
+                not any(self._is_selected(name) for engine in engines for name in names[engine]):
+            return
+
+        cases = generate_misspellings(self._rng, self._dictionary, self._args.words,
+                                      max_length=self._args.max_word_length)
+
+        for engine in engines:
+            if not any(self._is_selected(name) for name in names[engine]):
+                continue
+
+            linguist = Linguist(engine)
+            self._record('linguist.load_dictionary[%s]' % engine,
+                         lambda: linguist.load_dictionary_from_json(self._dictionary_file_path))
+
+            for case in case_names:
+                self._record('linguist.correct[%s].%s' % (engine, case),
+                             lambda: [linguist.correct(word) for word in cases[case]], len(cases[case]))
+
+            all_words = [word for case in case_names for word in cases[case]]
+            self._record('linguist.correct_many[%s]' % engine,
+                         lambda: linguist.correct_many(all_words), len(all_words))
+
+        linguist = Linguist()
+        linguist.load_dictionary_from_json(self._dictionary_file_path)
+        word_set = set(word for words in cases.values() for word in words)
+        self._record('linguist.not_known', lambda: linguist.not_known(word_set), len(word_set))
+
+        compiled_dictionary_file_path = os.path.join(self._directory_path, 'dictionary.bin')
+        linguist.save_compiled_dictionary(compiled_dictionary_file_path)
+        compiled_linguist = Linguist()
+        compiled_linguist.load_compiled_dictionary(compiled_dictionary_file_path)
+        self._record('linguist.not_known[compiled]', lambda: compiled_linguist.not_known(word_set), len(word_set))
+
+    def _run_utils_benchmarks(self):
+        self._corpus_path = os.path.join(self._directory_path, 'corpus')
+        os.makedirs(self._corpus_path)
+        file_paths = generate_text_files(self._rng, self._corpus_path, self._dictionary,
+                                         self._args.files, self._args.lines)
+
+        with open(file_paths[0]) as f:
+            text = f.read()
+        self._record('utils.get_words', lambda: get_words(text), len(text) // 1024 or 1)
+        self._record('utils.is_text_file', lambda: [is_text_file(path) for path in file_paths], len(file_paths))
+        self._record('utils.find_text_file_abs_paths', lambda: find_text_file_abs_paths(self._corpus_path))
+
+    def _run_driver_benchmarks(self):
+        command = [sys.executable, os.path.join(REPOSITORY_PATH, 'driver.py'),
+                   '-d', self._dictionary_file_path, self._corpus_path]
+
+        with open(os.devnull, 'w') as devnull:
+            self._record('driver.directory', lambda: subprocess.call(command, stdout=devnull))
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the change of every benchmark compared to the baseline.
+
+    :param results: the current results.
+    :param baseline: the baseline results.
+    :param tolerance: allowed slowdown ratio.
+    :return: list of the regressed benchmarks' names.
+    """
+    regressions = []
+
+    print("\n{0:48} {1:>12} {2:>12} {3:>8}".format("Benchmark", "Baseline ms", "Current ms", "Change"))
+    for name in sorted(set(results).intersection(baseline)):
+        current_seconds = results[name]['seconds']
+        baseline_seconds = baseline[name]['seconds']
+        change = current_seconds / baseline_seconds - 1 if baseline_seconds else 0.0
+
+        flag = ''
+        if change > tolerance:
+            flag = ' REGRESSION'
+            regressions.append(name)
+
+        print("{0:48} {1:>12.4f} {2:>12.4f} {3:>+7.1%}{4}".format(name, baseline_seconds * 1000,
+                                                               current_seconds * 1000, change, flag))
+
+    return regressions
+
+
+def main():
+    args = get_arguments()
+    set_logging_verbosity(args.verbose)
+
+    results = BenchmarkSuite(args).run()
+    report = {
+        'python': platform.python_version(),
+        'parameters': dict((name, value) for name, value in sorted(vars(args).items())
+                           if name not in ('output', 'compare', 'verbose', 'tolerance', 'benchmark')),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, sort_keys=True, indent=2, separators=(',', ': '))
+        _log.info("Results have been saved: \'%s\'" % args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        if baseline.get('parameters') != report['parameters']:
+            _log.warning("The baseline was measured with different parameters: %s" % baseline.get('parameters'))
+
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            _log.error("%d benchmark(s) regressed: %s" % (len(regressions), ', '.join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,18 +7,45 @@ Platform's user's guide for typos. Other text files can be checked too.
 
 import sys
 import os
+import atexit
 import argparse
 import logging
 import textwrap
+import signal
+import functools
+import itertools
+import multiprocessing
+import multiprocessing.util
 
 from src.typofinder import Typofinder
-from src.linguist import Linguist
-from src.utils import find_text_file_abs_paths, is_text_file
+from src.planner import CorrectionPlanner
+from src.reports import REPORT_FORMATS, create_report
+from src.linguist import Linguist, ENGINES
+from src.limits import CorrectionLimits
+from src.cache import ResultCache
+from src.suggestions import SuggestionCache
+from src.stats import Statistics
+from src.server import TypofinderServer, TypofinderClient
+from src.snapshots import ReloadingLinguist
+from src.shards import PartialReport, parse_shard, partition_files, merge_partial_results
+from src.gitdiff import get_changed_lines
+from src.watcher import FileWatcher
+from src.utils import iter_file_abs_paths, iter_text_file_abs_paths, is_text_file
 
 logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
 _root_log = logging.getLogger("typofinder")
 _log = _root_log.getChild(__name__)
 
+# The input argument which makes the script read the standard input.
+STDIN = '-'
+
+# The Linguist, the ResultCache and the changed lines of a worker process. They are given to the worker once when
+# the process starts (forked processes simply inherit them) instead of being pickled with every checked file.
+_worker_linguist = None
+_worker_cache = None
+_worker_changed_lines = None
+_worker_is_correcting = True
+
 
 def set_logging_verbosity(level):
     if not level:
@@ -54,6 +81,72 @@ def get_arguments():
                             lines with the unknown words. If the word 'htc' is
                             found in a file it will not be marked as a typo
                             even it is not in the dictionary.
+      driver.py -j 8 -e .adoc ../dir/ -l
+                            Find typos in every .adoc extension simple text file
+                            which can be found in ../dir/ using 8 processes.
+                            Print the lines with the unknown words in the order
+                            of the files.
+      make 2>&1 | driver.py -l -
+                            Find typos in the standard input line by line and
+                            print the lines with the unknown words as soon as
+                            they are read.
+      driver.py --exclude build --exclude '*.min.txt' --include 'doc/*' ../dir/
+                            Find typos in the simple text files of ../dir/doc/
+                            but skip the files ending with .min.txt and every
+                            directory named build (the .git, .hg and .svn
+                            directories are always skipped).
+      driver.py --project-dictionary project.json -i htc -l ../dir/
+                            Find typos in every simple text file which can be
+                            found in ../dir/ with the words of project.json
+                            known too. The word 'htc' is not a typo either.
+      driver.py --serve /tmp/typofinder.sock -d my-dict.json &
+      driver.py --connect /tmp/typofinder.sock -d my-dict.json -l text_file
+                            Start a server which keeps my-dict.json loaded, then
+                            find typos in text_file with it. The second command
+                            checks the file itself if the server is not running.
+      driver.py --watch -l doc/
+                            Find typos in every simple text file which can be
+                            found in doc/, then keep watching the directory and
+                            check the new or modified files again as soon as
+                            they are saved, with the dictionary kept loaded.
+      driver.py --git-diff origin/master -l --overwrite .
+                            Find typos only in the lines which have been added
+                            or modified since origin/master in the current git
+                            working tree. Print and mark them in the files.
+      driver.py -t --alternatives 3 text_file
+                            Find typos in text_file and print the result table
+                            with the 3 next best suggestions under every
+                            suggestion.
+      driver.py --max-distance2-length 20 --max-correct-ms 50 ../dir/ -l
+                            Find typos in every simple text file which can be
+                            found in ../dir/. Words longer than 20 characters
+                            and words whose correction takes more than 50 ms
+                            get only suggestions which are 1 edit away.
+      driver.py --format sarif ../dir/ > typos.sarif
+                            Find typos in every simple text file which can be
+                            found in ../dir/ and write them as a SARIF log. The
+                            typos of a file are written as soon as it has been
+                            checked ('--format jsonl' writes one JSON object per
+                            typo instead).
+      driver.py --plan --top-unknown 20 -t ../dir/
+                            Find the unknown words of every simple text file
+                            which can be found in ../dir/ first, then correct
+                            every distinct unknown word once and print the
+                            result tables. Print the 20 most frequent unknown
+                            words of the directory at the end.
+      driver.py --shard 2/4 ../dir/ > partial2.jsonl
+      driver.py --merge partial1.jsonl partial2.jsonl partial3.jsonl partial4.jsonl -l -t
+                            Find typos in the second quarter of the simple text
+                            files which can be found in ../dir/ (e.g. on the
+                            second of four machines) and save the results. Then
+                            print the results of the four shards together, as
+                            one run with '--shard 1/1' would.
+      driver.py ../dir/ -l --stats
+                            Find typos in every simple text file which can be
+                            found in ../dir/. Print where the time was spent
+                            (discovery, dictionary load, tokenization, not
+                            known check, correction) and the slowest words and
+                            files to standard error output at the end.
     """)
     parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
                                      description=description,
@@ -62,8 +155,16 @@ def get_arguments():
     parser.add_argument('-e', '--ext',
                         help='filter for extensions if input argument is a directory.',
                         action='append', metavar='EXTENSION_TYPE')
+    parser.add_argument('--include',
+                        help='check only the files of a directory whose name or relative path matches this '
+                             'glob pattern.',
+                        action='append', metavar='GLOB')
+    parser.add_argument('--exclude',
+                        help='skip the files and directories of a directory whose name or relative path matches '
+                             'this glob pattern (.git, .hg and .svn are always skipped).',
+                        action='append', metavar='GLOB')
     parser.add_argument('-d', '--dictionary',
-                        help='define a dictionary (in .json format) which contains '
+                        help='define a dictionary (in .json or compiled format) which contains '
                              'the known words (\'htc-dictionary.json\' is given by default).',
                         type=str, default=os.path.join(os.path.dirname(__file__), 'htc-dictionary.json'),
                         metavar='DICTIONARY_FILE')
@@ -71,6 +172,11 @@ def get_arguments():
                         help='ignore a set of words when searching for typos. '
                              'There words will not be added to the dictionary.',
                         nargs='*', metavar='WORD')
+    parser.add_argument('--project-dictionary',
+                        help='put a json dictionary (e.g. the words of a project) over the dictionary. '
+                             'Its words are known too and its likelihoods override the dictionary\'s. '
+                             'It can be given more times, the last one is the top.',
+                        action='append', metavar='DICTIONARY_FILE')
     parser.add_argument('-l', '--line',
                         help='print to console the line where the typo was found.',
                         action='store_true')
@@ -78,11 +184,110 @@ def get_arguments():
                         help='print to console the result table containing the unknown words '
                              'and the suggestions (if available).',
                         action='store_true')
+    parser.add_argument('--alternatives',
+                        help='print this many alternative suggestions (ranked by distance and likelihood) '
+                             'under every suggestion of the result table.',
+                        type=int, default=0, metavar='N')
+    parser.add_argument('--format',
+                        help='print the typos in a machine-readable format instead of the -l and -t outputs: '
+                             '\'jsonl\' writes a JSON object per typo in its own line, \'sarif\' writes a SARIF 2.1.0 '
+                             'log. The typos of a file are written as soon as it has been checked (\'text\' by default).',
+                        choices=('text',) + REPORT_FORMATS, default='text')
+    parser.add_argument('--plan',
+                        help='find the unknown words of every file of a directory first, then correct every '
+                             'distinct unknown word once (the most frequent first) and print the results. '
+                             'A word misspelled in many files is corrected only once.',
+                        action='store_true')
+    parser.add_argument('--top-unknown',
+                        help='print the N most frequent unknown words of a --plan run with the number of '
+                             'their occurrences and files at the end (to standard error output with --format).',
+                        type=int, metavar='N')
+    parser.add_argument('--engine',
+                        help='the algorithm used for making suggestions (\'edits\' is used by default). '
+                             '\'symspell\' precomputes an index when the dictionary is loaded '
+                             'which makes the suggestions faster for many unknown words, '
+                             '\'trie\' walks a prefix tree of the dictionary without building '
+                             'the edited strings.',
+                        choices=ENGINES, default='edits')
+    parser.add_argument('--max-distance',
+                        help='maximum number of edits between an unknown word and its suggestion '
+                             '(2 by default, the \'edits\' engine supports maximum 2).',
+                        type=int, default=2, metavar='DISTANCE')
+    parser.add_argument('--max-distance2-length',
+                        help='correct the words longer than this with maximum 1 edit (no limit by default).',
+                        type=int, metavar='LENGTH')
+    parser.add_argument('--max-candidates',
+                        help='maximum number of edited strings generated for a word by the \'edits\' engine '
+                             '(no limit by default). A word which would need more gets no 2 edits away suggestion. '
+                             'It applies only to the \'edits\' engine, the other engines don\'t generate edited strings.',
+                        type=int, metavar='N')
+    parser.add_argument('--max-correct-ms',
+                        help='time budget of the correction of a word in milliseconds (no limit by default). '
+                             'A word which runs out of it gets only a 1 edit away suggestion, if any. It applies '
+                             'to every engine.',
+                        type=float, metavar='MILLISECONDS')
+    parser.add_argument('--max-file-correct-ms',
+                        help='time budget of the corrections of a file in milliseconds (no limit by default). '
+                             'The words corrected after it has run out get only 1 edit away suggestions, if any.',
+                        type=float, metavar='MILLISECONDS')
+    parser.add_argument('--bloom-filter',
+                        help='check the words with a Bloom filter of the dictionary before looking them up. '
+                             'It makes finding the unknown words faster with a large compiled dictionary.',
+                        action='store_true')
+    parser.add_argument('-j', '--jobs',
+                        help='number of processes checking the files of a directory in parallel '
+                             '(1 by default). The results are printed in the same order as without it.',
+                        type=int, default=1, metavar='N')
+    parser.add_argument('--cache-dir',
+                        help='store the results of the checked files in this directory and reuse them '
+                             'for files which are unchanged since the last run with the same dictionaries '
+                             'and ignored words.',
+                        type=str, metavar='CACHE_DIRECTORY')
+    parser.add_argument('--suggestion-cache',
+                        help='remember the suggestions across runs in this sqlite database file. '
+                             'Suggestions made with another dictionary are not reused.',
+                        type=str, metavar='DATABASE_FILE')
+    parser.add_argument('--stats',
+                        help='print timings and counters of the run to standard error output at the end, '
+                             'as tables or in json format (\'text\' by default). Give it after the input '
+                             'or as --stats=FORMAT.',
+                        nargs='?', const='text', choices=('text', 'json'), metavar='FORMAT')
     parser.add_argument('--overwrite',
                         help='overwrite the checked file ',
                         action='store_true')
-    parser.add_argument('input', help='A file or a directory you want to check.',
-                        metavar='INPUT')
+    parser.add_argument('--git-diff',
+                        help='check only the lines which have been added or modified since this git revision '
+                             '(e.g. HEAD or origin/master) in the tracked files of the input.',
+                        type=str, metavar='REVISION')
+    parser.add_argument('--watch',
+                        help='keep running after the input has been checked and check its new or modified files '
+                             'again whenever they are saved, until interrupted. The files are polled for changes '
+                             'of their modification time and size.',
+                        action='store_true')
+    parser.add_argument('--shard',
+                        help='check only the I-th of N about equal parts of the input directory\'s files and write '
+                             'the results to standard output as a partial result for --merge. Every machine splits '
+                             'the files the same way (by their sizes and relative paths).',
+                        type=str, metavar='I/N')
+    parser.add_argument('--merge',
+                        help='print the partial results of every shard (see --shard) together, as one run would '
+                             'print them. The files are printed in the order of their relative paths.',
+                        nargs='+', metavar='PARTIAL_FILE')
+    parser.add_argument('--serve',
+                        help='run as a server: load the dictionary once and check the files sent by '
+                             '\'driver.py --connect\' through this Unix domain socket until interrupted. '
+                             'The dictionary is loaded again in the background whenever its file or its journal '
+                             'changes, the checks go on with the old one meanwhile.',
+                        type=str, metavar='SOCKET_FILE')
+    parser.add_argument('--connect',
+                        help='check the files with the server listening on this Unix domain socket. '
+                             'The files are checked by this process if the server is not running or it uses '
+                             'another dictionary, engine, maximum distance or correction limits. '
+                             'The project dictionaries and the ignored words are sent to the server with every file.',
+                        type=str, metavar='SOCKET_FILE')
+    parser.add_argument('input', help='A file or a directory you want to check '
+                                      '(\'-\' reads the standard input).',
+                        nargs='?', metavar='INPUT')
 
     return parser.parse_args()
 
@@ -94,7 +299,78 @@ def validate_arguments(args):
       * False: if input arguments would cause an error in the program.
       * True: otherwise.
     """
-    if not os.path.exists(args.input):
+    if args.serve and args.input is not None:
+        _log.error('No input can be given in server mode: \'%s\'' % args.input)
+        return False
+
+    if args.merge and args.input is not None:
+        _log.error('No input can be given when partial results are merged: \'%s\'' % args.input)
+        return False
+
+    if args.merge and (args.serve or args.shard or args.watch or args.overwrite or args.alternatives or args.plan or
+                       args.git_diff or args.connect):
+        _log.error('--merge only prints the partial results, it can be used with -l, -t and --format only.')
+        return False
+
+    for partial_file_path in args.merge or []:
+        if not os.path.isfile(partial_file_path):
+            _log.error('Partial result file does not exists: \'%s\'' % partial_file_path)
+            return False
+
+    if args.shard is not None:
+        if parse_shard(args.shard) is None:
+            _log.error('Invalid shard, it must be I/N with 1 <= I <= N: \'%s\'' % args.shard)
+            return False
+
+        if args.input is None or not os.path.isdir(args.input):
+            _log.error('Only the files of a directory can be split into shards: \'%s\'' % args.input)
+            return False
+
+        if args.format != 'text' or args.connect:
+            _log.error('--shard writes a partial result, the format is chosen by --merge. It is checked without '
+                       'a server.')
+            return False
+
+    if not args.serve and not args.merge and args.input is None:
+        _log.error('A file or a directory must be given (\'-\' reads the standard input).')
+        return False
+
+    if args.input == STDIN and args.overwrite:
+        _log.error('The standard input can not be overwritten.')
+        return False
+
+    if args.serve and (args.ignore or args.project_dictionary):
+        _log.error('The ignored words and the project dictionaries are given by the clients in server mode.')
+        return False
+
+    for project_dictionary in args.project_dictionary or []:
+        if not os.path.exists(project_dictionary):
+            _log.error('Project dictionary does not exists: \'%s\'' % project_dictionary)
+            return False
+
+    if args.input == STDIN and args.plan:
+        _log.error('The standard input is checked line by line, it can not be planned.')
+        return False
+
+    if args.top_unknown is not None and (not args.plan or args.top_unknown < 1):
+        _log.error('--top-unknown needs --plan and a positive number of words: %s' % args.top_unknown)
+        return False
+
+    if args.watch and (args.input == STDIN or args.overwrite or args.git_diff or args.plan or args.connect or
+                       args.shard):
+        _log.error('--watch checks the files of the input itself, it can not be used with the standard input, '
+                   '--overwrite, --git-diff, --plan, --connect or --shard.')
+        return False
+
+    if args.input == STDIN and args.git_diff:
+        _log.error('The standard input has no git revision to compare to.')
+        return False
+
+    if args.git_diff is not None and (not args.git_diff or args.git_diff.startswith('-')):
+        _log.error('Invalid git revision: \'%s\'' % args.git_diff)
+        return False
+
+    if args.input not in (None, STDIN) and not os.path.exists(args.input):
         _log.error('File or directory does not exists: \'%s\'' % args.input)
         return False
 
@@ -102,56 +378,556 @@ def validate_arguments(args):
         _log.error('Dictionary does not exists: \'%s\'' % args.dictionary)
         return False
 
-    if not os.path.isdir(args.input) and not is_text_file(args.input):
+    if args.input not in (None, STDIN) and not os.path.isdir(args.input) and not is_text_file(args.input):
         _log.error('File is not a simple text file: \'%s\'' % args.input)
         return False
 
-    if os.path.isdir(args.input):
-        text_file_paths = find_text_file_abs_paths(args.input, args.ext)
-        if not text_file_paths:
-            if args.ext:
-                _log.error("No simple text file were found with the extension(s) %s in directory: \'%s\'"
-                           % (args.ext, args.input))
-            else:
-                _log.error("No simple text file were found in directory: \'%s\'" % args.input)
+    if args.max_distance < 1 or (args.engine == 'edits' and args.max_distance > 2):
+        _log.error("Unsupported maximum distance for engine \'%s\': %d" % (args.engine, args.max_distance))
+        return False
+
+    if args.jobs < 1:
+        _log.error("Number of jobs must be positive: %d" % args.jobs)
+        return False
+
+    for name in ('max_distance2_length', 'max_candidates', 'max_correct_ms', 'max_file_correct_ms'):
+        if getattr(args, name) is not None and getattr(args, name) <= 0:
+            _log.error("Correction limit must be positive: --%s %s" % (name.replace('_', '-'), getattr(args, name)))
             return False
 
-    if args.ext and '' in args.ext and os.path.isdir(args.input):
+    if args.alternatives < 0:
+        _log.error("Number of alternative suggestions must not be negative: %d" % args.alternatives)
+        return False
+
+    if args.ext and '' in args.ext and args.input is not None and os.path.isdir(args.input):
         _log.warning('Giving an empty string in extensions will ignore other extension filters. '
                      'The script operates on default: find every simple text file in folder: \'%s\'' % args.input)
 
     return True
 
 
-def main():
-    args = get_arguments()
-    set_logging_verbosity(args.verbose)
-    if not validate_arguments(args):
-        sys.exit(1)
+def init_worker(linguist, cache, changed_lines, is_correcting):
+    global _worker_linguist, _worker_cache, _worker_changed_lines, _worker_is_correcting
+    _worker_linguist = linguist
+    _worker_cache = cache
+    _worker_changed_lines = changed_lines
+    _worker_is_correcting = is_correcting
+
+    suggestion_cache = linguist.get_suggestion_cache()
+    if suggestion_cache is not None:
+        # The last batch of suggestions is written when the worker exits (after Pool.close()).
+        multiprocessing.util.Finalize(suggestion_cache, suggestion_cache.close, exitpriority=10)
+
+
+def find_typos(file_path):
+    """
+    Finds the typos of a file in a worker process.
+
+    :param file_path: path to the checked file.
+    :return: path to the file, result map, typo positions and cache state of the file's Typofinder
+    and the Statistics of the check (or None).
+    """
+    statistics = None
+    if _worker_linguist.get_statistics().enabled:
+        # Every file is measured separately, the main process adds them up.
+        statistics = Statistics()
+        _worker_linguist.set_statistics(statistics)
+
+    typofinder = Typofinder(_worker_linguist, file_path, cache=_worker_cache,
+                            line_numbers=_worker_changed_lines.get(file_path) if _worker_changed_lines else None)
+    typofinder.find_typos(_worker_is_correcting)
+    return (file_path, typofinder.get_result_map(), typofinder.get_typo_positions(), typofinder.get_cache_state(),
+            statistics)
+
+
+def check_files(linguist, file_paths, jobs=1, cache=None, changed_lines=None, is_correcting=True):
+    """
+    Finds the typos of files, in parallel if more jobs are given.
+    The files are checked as they come: file_paths can be a generator which is still discovering them.
+
+    :param linguist: Linguist with the loaded dictionary.
+    :param file_paths: iterable of paths to the checked files.
+    :param jobs: number of worker processes.
+    :param cache: ResultCache of the linguist (optional).
+    :param changed_lines: dictionary which maps the file paths to the numbers of their checked lines (optional).
+    Every line of the files is checked without it.
+    :param is_correcting: make the suggestions too, otherwise the suggestions are None (see Typofinder.find_typos()).
+    :return: generator of Typofinders (with their typos already found) in the order of file_paths.
+    """
+    file_path_iterator = iter(file_paths)
+
+    # The worker processes are started only if there are at least two files to check.
+    first_file_paths = list(itertools.islice(file_path_iterator, 2 if jobs > 1 else 0))
+    file_path_iterator = itertools.chain(first_file_paths, file_path_iterator)
+
+    if len(first_file_paths) <= 1:
+        for file_path in file_path_iterator:
+            typofinder = Typofinder(linguist, file_path, cache=cache,
+                                    line_numbers=changed_lines.get(file_path) if changed_lines else None)
+            typofinder.find_typos(is_correcting)
+            yield typofinder
+        return
+
+    pool = multiprocessing.Pool(jobs, init_worker, (linguist, cache, changed_lines, is_correcting))
+    try:
+        # imap() returns the results in the order of the files regardless of which worker finished first.
+        for file_path, result_map, typo_positions, cache_state, statistics in pool.imap(find_typos,
+                                                                                       file_path_iterator):
+            if statistics is not None:
+                linguist.get_statistics().merge(statistics)
+            yield Typofinder(linguist, file_path, result_map, typo_positions, cache_state=cache_state)
+        pool.close()
+        # The workers are let to exit by themselves, so they write their suggestion caches.
+        pool.join()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def check_stream(linguist, stream, is_line_mode, is_table_mode, alternative_count=0, report=None):
+    """
+    Finds the typos of a stream line by line. Lines are reported as soon as they are read.
+
+    :param linguist: Linguist with the loaded dictionary.
+    :param stream: file object of the checked text (e.g. the standard input).
+    :param is_line_mode: print the lines where typos were found.
+    :param is_table_mode: print the result table at the end of the stream.
+    :param alternative_count: number of alternative suggestions printed in the result table.
+    :param report: JsonLinesReport which is given the typos of every line instead of printing them (optional).
+    """
+    typofinder = Typofinder(linguist, stream.name)
+
+    # readline() returns a line as soon as it arrives, iterating over the file object would wait for a full buffer.
+    for line_number, line, positions in typofinder.find_typos_in_lines(iter(stream.readline, '')):
+        if report is not None:
+            report.add_typofinder(Typofinder(linguist, stream.name, typofinder.get_result_map(),
+                                             [(line_number, line, positions)]))
+        elif is_line_mode:
+            print("%d:%s" % (line_number, typofinder.mark_typos(line, positions).strip()))
+            sys.stdout.flush()
+
+    if report is not None:
+        return
+
+    typofinder.print_summary()
+    if is_table_mode:
+        typofinder.print_result_map(alternative_count)
+
+
+def log_suggestion_statistics(linguist):
+    """
+    Logs the hit and miss counts of the linguist's suggestion cache (the worker processes' caches are not included).
+    """
+    _log.info("Suggestion cache: %(hits)d hit(s) (%(database_hits)d from the database), %(misses)d miss(es), "
+              "%(evictions)d eviction(s)." % linguist.get_suggestion_cache().get_statistics())
+
+
+def discover_files(args, statistics):
+    """
+    Starts looking for the text files of the input directory. Only the first file is looked for
+    before returning, the rest are found while the files are checked.
+
+    :param args: Input arguments of the driver script.
+    :param statistics: Statistics of the run.
+    :return: iterator of the text files' paths, or None if the directory has no text file.
+    """
+    file_paths = iter_text_file_abs_paths(args.input, args.ext, args.include, args.exclude, statistics)
+
+    first_file_path = next(file_paths, None)
+    if first_file_path is None:
+        if args.ext:
+            _log.error("No simple text file were found with the extension(s) %s in directory: \'%s\'"
+                       % (args.ext, args.input))
+        else:
+            _log.error("No simple text file were found in directory: \'%s\'" % args.input)
+        return None
+
+    return itertools.chain([first_file_path], file_paths)
+
+
+def discover_changed_lines(args, statistics):
+    """
+    Asks git for the lines of the input's text files which have been changed since the revision of --git-diff.
+
+    :param args: Input arguments of the driver script.
+    :param statistics: Statistics of the run.
+    :return: OrderedDict which maps the paths of the changed text files to the numbers of their added or modified
+    lines (empty if nothing has changed), or None if git couldn't tell.
+    """
+    extensions = tuple(args.ext) if args.ext else ''
+
+    with statistics.phase('discovery'):
+        changed_lines = get_changed_lines(args.input, args.git_diff)
+        if changed_lines is None:
+            _log.error("Changed lines couldn't be found since revision \'%s\' in: \'%s\'" % (args.git_diff, args.input))
+            return None
+
+        for file_path in list(changed_lines):
+            if not file_path.endswith(extensions) or not os.path.isfile(file_path) or not is_text_file(file_path):
+                del changed_lines[file_path]
+
+    if not changed_lines:
+        _log.info("No line of a simple text file has been changed since revision \'%s\' in: \'%s\'"
+                  % (args.git_diff, args.input))
+    return changed_lines
+
+
+def get_configuration(args):
+    """
+    :param args: Input arguments of the driver script.
+    :return: the arguments which change the results of the checks, the server and its clients must agree on them.
+    """
+    return {'dictionary': os.path.realpath(args.dictionary),
+            'engine': args.engine,
+            'max_distance': args.max_distance,
+            'limits': [args.max_distance2_length, args.max_candidates, args.max_correct_ms, args.max_file_correct_ms]}
+
+
+def get_correction_limits(args):
+    """
+    :param args: Input arguments of the driver script.
+    :return: CorrectionLimits of the Linguist.
+    """
+    return CorrectionLimits(args.max_distance2_length, args.max_candidates,
+                            args.max_correct_ms / 1000.0 if args.max_correct_ms else None,
+                            args.max_file_correct_ms / 1000.0 if args.max_file_correct_ms else None)
 
-    linguist = Linguist()
-    linguist.load_dictionary_from_json(args.dictionary)
+
+def prepare_linguist(args, linguist):
+    """
+    Loads the dictionary into the Linguist and puts the project dictionaries and the ignored words over it
+    as layers, the loaded dictionary itself is not modified.
+    """
+    linguist.load_dictionary(args.dictionary)
+
+    for project_dictionary in args.project_dictionary or []:
+        linguist.load_layer(project_dictionary)
 
     if args.ignore:
         add_word_list = [word.lower() for word in args.ignore]
+        linguist.push_layer()
         linguist.train_dictionary(add_word_list)
         _log.info("The following words will be ignored: %s." % ', '.join(add_word_list))
 
-    if os.path.isdir(args.input):
-        file_path_list = find_text_file_abs_paths(args.input, args.ext)
-    else:
-        file_path_list = [args.input]
 
-    for file_path in file_path_list:
-        typofinder = Typofinder(linguist, file_path)
-        typofinder.execute()
+def serve(args, create_linguist):
+    """
+    Serves the clients with the snapshots of a ReloadingLinguist until the process is interrupted.
+    The dictionary is loaded again whenever its file or its journal changes.
+
+    :param args: Input arguments of the driver script.
+    :param create_linguist: function without arguments which returns a new Linguist without a dictionary.
+    :return: False if the server couldn't be started, True otherwise.
+    """
+    linguist = ReloadingLinguist(args.dictionary, create_linguist)
+    if not linguist.load():
+        return False
+    cache = ResultCache(args.cache_dir, linguist.get_linguist().get_fingerprint()) if args.cache_dir else None
+
+    # Terminating the server ends it like an interrupt does, so the socket file is removed.
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
+    linguist.start_auto_reload()
+    try:
+        return TypofinderServer(linguist, args.serve, get_configuration(args), cache).serve_forever()
+    finally:
+        linguist.stop_auto_reload()
+
+
+def connect_to_server(args):
+    """
+    :param args: Input arguments of the driver script.
+    :return: TypofinderClient connected to the server, or None if the server is not running or
+    it would check the files differently.
+    """
+    client = TypofinderClient(args.connect)
+    if not client.connect():
+        _log.info("Server is not running, the files are checked without it: \'%s\'" % args.connect)
+        return None
+
+    status = client.request({'command': 'status'})
+    if status is None or status.get('configuration') != get_configuration(args):
+        _log.warning("Server checks the files with other arguments, the files are checked without it: %s"
+                     % (status or {}).get('configuration'))
+        client.close()
+        return None
+
+    client.set_layers(args.project_dictionary, [word.lower() for word in args.ignore or []])
+    return client
+
+
+def check_files_on_server(client, linguist, file_paths, unchecked_file_paths, changed_lines=None):
+    """
+    Finds the typos of files with a server. It stops at the first file the server couldn't check.
+
+    :param client: TypofinderClient connected to the server.
+    :param linguist: Linguist of the Typofinders (its dictionary is not used).
+    :param file_paths: iterator of paths to the checked files.
+    :param unchecked_file_paths: list, the file which couldn't be checked is appended to it.
+    :param changed_lines: dictionary which maps the file paths to the numbers of their checked lines (optional).
+    :return: generator of Typofinders (with their typos already found) in the order of file_paths.
+    """
+    statistics = linguist.get_statistics()
+
+    for file_path in file_paths:
+        with statistics.file_check(file_path):
+            with open(file_path) as f:
+                content = f.read()
+
+            results = client.check(file_path, content, changed_lines.get(file_path) if changed_lines else None)
+            if results is None:
+                unchecked_file_paths.append(file_path)
+                return
+
+            result_map, typo_positions = results
+            typofinder = Typofinder(linguist, file_path, result_map)
+            typofinder.set_typo_positions(typo_positions, Typofinder.split_lines(content))
+
+        yield typofinder
+
+
+def print_results(args, typofinder, statistics, report=None):
+    """
+    Prints the results of a file as the arguments of the driver script tell.
+    The report (if any) is given the typos instead of printing the lines and the result table.
+    """
+    with statistics.phase('output'):
+        if report is not None:
+            report.add_typofinder(typofinder)
+            if args.overwrite:
+                typofinder.print_affected_rows(is_overwrite_mode=True)
+            return
+
+        typofinder.print_summary()
         if args.line:
             typofinder.print_affected_rows()
         if args.table:
-            typofinder.print_result_map()
+            typofinder.print_result_map(args.alternatives)
         if args.overwrite:
             typofinder.print_affected_rows(is_overwrite_mode=True)
 
+
+def check_files_planned(args, linguist, file_paths, cache=None, changed_lines=None, report=None):
+    """
+    Finds the unknown words of every file first, then corrects every distinct unknown word once
+    (see CorrectionPlanner) and prints the results of the files in their order. The files whose results
+    are in the cache are not corrected again, the results of the other ones are stored after the correction.
+
+    :param args: Input arguments of the driver script.
+    :param linguist: Linguist with the loaded dictionary.
+    :param file_paths: iterable of paths to the checked files.
+    :param cache: ResultCache of the linguist (optional).
+    :param changed_lines: dictionary which maps the file paths to the numbers of their checked lines (optional).
+    :param report: JsonLinesReport which is given the typos instead of printing them (optional).
+    """
+    statistics = linguist.get_statistics()
+    planner = CorrectionPlanner(linguist, cache)
+
+    for typofinder in check_files(linguist, file_paths, args.jobs, cache, changed_lines, is_correcting=False):
+        planner.add(typofinder)
+
+    for typofinder in planner.correct():
+        print_results(args, typofinder, statistics, report)
+
+    if args.top_unknown:
+        sys.stdout.flush()
+        planner.print_summary(sys.stdout if report is None else sys.stderr, args.top_unknown)
+
+
+def watch_files(args, linguist, watcher, cache=None, report=None):
+    """
+    Checks the new or modified files again whenever they are saved, until the process is interrupted.
+    The files are checked by this process with the loaded dictionary, one by one as they changed.
+
+    :param args: Input arguments of the driver script.
+    :param linguist: Linguist with the loaded dictionary.
+    :param watcher: FileWatcher of the input's files.
+    :param cache: ResultCache of the linguist (optional).
+    :param report: JsonLinesReport which is given the typos instead of printing them (optional).
+    """
+    statistics = linguist.get_statistics()
+    _log.info("Watching %d file(s) for changes: \'%s\'" % (len(watcher.get_file_paths()), args.input))
+
+    try:
+        while True:
+            changed_file_paths, removed_file_paths = watcher.wait_for_changes()
+            for file_path in removed_file_paths:
+                _log.info("File has been removed: \'%s\'" % file_path)
+
+            for file_path in changed_file_paths:
+                try:
+                    if not is_text_file(file_path):
+                        continue
+                    typofinder = Typofinder(linguist, file_path, cache=cache)
+                    typofinder.find_typos()
+                except (IOError, OSError) as e:
+                    # The file has been removed or replaced while it was checked, the next change brings it back.
+                    _log.warning("File couldn't be checked: \'%s\' (%s)" % (file_path, e))
+                    continue
+
+                print_results(args, typofinder, statistics, report)
+                if report is None and not typofinder.get_result_map():
+                    print("No unknown word has been found in file: \'%s\'" % file_path)
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        _log.info("Watching has been stopped: \'%s\'" % args.input)
+
+
+def merge(args, linguist, report=None):
+    """
+    Prints the partial results of the shards together, as one run would print them.
+
+    :param args: Input arguments of the driver script.
+    :param linguist: Linguist of the Typofinders (its dictionary is not used).
+    :param report: JsonLinesReport which is given the typos instead of printing them (optional).
+    :return: False if the partial results couldn't be merged, True otherwise.
+    """
+    files = merge_partial_results(args.merge)
+    if files is None:
+        return False
+
+    statistics = linguist.get_statistics()
+    for file_path, result_map, typo_positions in files:
+        print_results(args, Typofinder(linguist, file_path, result_map, typo_positions), statistics, report)
+
+    return True
+
+
+def run(args, linguist, report=None):
+    """
+    Checks the input with a Linguist and prints the results.
+
+    :param args: Input arguments of the driver script.
+    :param linguist: Linguist without a dictionary.
+    :param report: JsonLinesReport which is given the typos instead of printing them (optional).
+    :return:
+      * False: if the input has no text file to check.
+      * True: otherwise.
+    """
+    statistics = linguist.get_statistics()
+
+    if args.input == STDIN:
+        prepare_linguist(args, linguist)
+        check_stream(linguist, sys.stdin, args.line, args.table, args.alternatives, report)
+        return True
+
+    watcher = None
+    if args.watch:
+        # The files are stamped before they are checked, so a file saved during the first check is checked again.
+        if os.path.isdir(args.input):
+            watcher = FileWatcher(lambda: iter_file_abs_paths(args.input, args.ext, args.include, args.exclude))
+        else:
+            watcher = FileWatcher(lambda: [args.input])
+
+    changed_lines = None
+    if args.git_diff:
+        changed_lines = discover_changed_lines(args, statistics)
+        if changed_lines is None:
+            return False
+        file_paths = iter(changed_lines)
+    elif os.path.isdir(args.input):
+        file_paths = discover_files(args, statistics)
+        if file_paths is None:
+            return False
+    else:
+        file_paths = iter([args.input])
+
+    if args.shard:
+        shard_number, shard_count = parse_shard(args.shard)
+        shard = partition_files(file_paths, args.input, shard_count)[shard_number - 1]
+        _log.info("Shard %s has %d file(s)." % (args.shard, len(shard)))
+        file_paths = iter([file_path for _, file_path in shard])
+
+    client = None
+    if args.connect and args.alternatives and (args.table or report is not None):
+        # The alternatives are found by the local Linguist, it needs the dictionary anyway.
+        _log.info("Alternative suggestions are requested, the files are checked without the server.")
+    elif args.connect and args.plan:
+        _log.info("The corrections are planned, the files are checked without the server.")
+    elif args.connect:
+        client = connect_to_server(args)
+    if client is not None:
+        unchecked_file_paths = []
+        try:
+            for typofinder in check_files_on_server(client, linguist, file_paths, unchecked_file_paths, changed_lines):
+                print_results(args, typofinder, statistics, report)
+        finally:
+            client.close()
+
+        if not unchecked_file_paths:
+            return True
+
+        _log.warning("The rest of the files are checked without the server.")
+        file_paths = itertools.chain(unchecked_file_paths, file_paths)
+
+    prepare_linguist(args, linguist)
+
+    # The cache is created after the layers have been put over the dictionary, they are part of the fingerprint.
+    cache = ResultCache(args.cache_dir, linguist.get_fingerprint()) if args.cache_dir else None
+
+    if args.plan:
+        check_files_planned(args, linguist, file_paths, cache, changed_lines, report)
+        return True
+
+    for typofinder in check_files(linguist, file_paths, args.jobs, cache, changed_lines):
+        print_results(args, typofinder, statistics, report)
+
+    if watcher is not None:
+        sys.stdout.flush()
+        watch_files(args, linguist, watcher, cache, report)
+
+    return True
+
+
+def main():
+    args = get_arguments()
+    set_logging_verbosity(args.verbose)
+    if not validate_arguments(args):
+        sys.exit(1)
+
+    statistics = Statistics() if args.stats else None
+    suggestion_cache = SuggestionCache(database_path=args.suggestion_cache)
+    # The last batch of suggestions is written at exit, sys.exit() included.
+    atexit.register(suggestion_cache.close)
+    # The Linguists of a server's dictionary snapshots share the suggestion cache.
+    create_linguist = functools.partial(Linguist, args.engine, args.max_distance, suggestion_cache,
+                                        statistics, args.bloom_filter, get_correction_limits(args))
+
+    if args.serve:
+        if not serve(args, create_linguist):
+            sys.exit(1)
+        return
+
+    linguist = create_linguist()
+
+    report = None
+    if args.shard:
+        if args.line or args.table:
+            _log.warning("The lines and the result tables are not printed by a shard, see --merge.")
+        shard_number, shard_count = parse_shard(args.shard)
+        report = PartialReport(sys.stdout, linguist, args.input, shard_number, shard_count)
+        report.begin()
+    elif args.format != 'text':
+        if args.line or args.table:
+            _log.warning("The lines and the result tables are not printed in \'%s\' format." % args.format)
+        report = create_report(args.format, sys.stdout, args.alternatives)
+        report.begin()
+
+    with linguist.get_statistics().phase('total'):
+        is_successful = merge(args, linguist, report) if args.merge else run(args, linguist, report)
+
+    if report is not None:
+        report.end()
+
+    log_suggestion_statistics(linguist)
+
+    if statistics is not None:
+        sys.stdout.flush()
+        statistics.print_summary(sys.stderr, is_json=args.stats == 'json')
+
+    if not is_successful:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     if sys.version_info >= (3, 0):
         sys.stdout.write("Sorry, requires Python 2.x, not Python 3.x\n")
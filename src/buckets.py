@@ -0,0 +1,208 @@
+"""
+This file contains the implementation of the LengthBucketIndex class.
+Use this class to find the closest dictionary words to many words at once
+with NumPy array operations instead of interpreted loops.
+NumPy is optional: check HAS_NUMPY before using the class.
+"""
+
+import logging
+import collections
+
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    numpy = None
+    HAS_NUMPY = False
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+# Larger than any distance which can be calculated but still fits into the table's int16 cells.
+_INFINITY = 1 << 12
+
+
+def _encode(word_list, length):
+    """
+    :param word_list: list of ASCII words with the same length.
+    :param length: length of the words.
+    :return: uint8 array of the words' characters with one row per word.
+    """
+    return numpy.frombuffer(''.join(word_list).encode('ascii'), dtype=numpy.uint8).reshape(len(word_list), length)
+
+
+class LengthBucketIndex(object):
+    """
+    Dictionary words grouped by their length into fixed-width uint8 arrays.
+
+    A lookup compares every looked up word with every dictionary word whose length is maximum max_distance
+    away from its length. Only the pairs whose character histograms differ by maximum max_distance characters
+    (the bag distance, a lower bound of the edit distance) get their Damerau-Levenshtein distance calculated.
+    Every step is done on all pairs of the same lengths at once: the number of interpreted loop iterations
+    depends on the words' lengths instead of the number of words.
+    """
+    def __init__(self, max_distance=2, max_cells=1 << 22):
+        """
+        :param max_distance: maximum distance of the found words.
+        :param max_cells: maximum number of cells in a temporary array, limits the memory usage.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._max_distance = max_distance
+        self._max_cells = max_cells
+        # Maps a length to the list of words, the array of their characters and the array of their histograms.
+        self._buckets = {}
+        # Maps a character to the histogram column counting it. Characters not in the dictionary share the last one.
+        self._char_codes = numpy.zeros(256, dtype=numpy.intp)
+
+    def build(self, word_list):
+        """
+        Builds the index from scratch.
+
+        :param word_list: the dictionary words. Words which are not ASCII are skipped.
+        """
+        words_by_length = collections.defaultdict(list)
+        for word in word_list:
+            try:
+                word.encode('ascii')
+            except (UnicodeEncodeError, UnicodeDecodeError):
+                _log.debug("Word is skipped from the length buckets: \'%s\'" % word)
+                continue
+            words_by_length[len(word)].append(word)
+
+        chars = sorted(set(char for bucket in words_by_length.values() for word in bucket for char in word))
+        self._char_codes = numpy.full(256, len(chars), dtype=numpy.intp)
+        for code, char in enumerate(chars):
+            self._char_codes[ord(char)] = code
+
+        self._buckets = {}
+        for length, bucket_words in words_by_length.items():
+            encoded = _encode(bucket_words, length)
+            self._buckets[length] = (bucket_words, encoded, self._histograms(encoded))
+
+        _log.debug("Length buckets have been built for %d lengths." % len(self._buckets))
+
+    def _histograms(self, encoded):
+        """
+        :param encoded: uint8 array of words with the same length.
+        :return: int16 array of the words' character histograms.
+        """
+        histograms = numpy.zeros((encoded.shape[0], self._char_codes.max() + 1), dtype=numpy.int16)
+        rows = numpy.arange(encoded.shape[0])
+        for column in range(encoded.shape[1]):
+            histograms[rows, self._char_codes[encoded[:, column]]] += 1
+        return histograms
+
+    def lookup_many(self, word_list):
+        """
+        Finds the closest words to every word of a list.
+
+        :param word_list: the words which are looked up (ASCII only).
+        :return: dictionary which maps every looked up word to the set of dictionary words which have
+        the smallest Damerau-Levenshtein distance from it if it is maximum max_distance, or to an empty set.
+        """
+        closest = dict((word, set()) for word in word_list)
+        closest_distance = dict((word, self._max_distance + 1) for word in word_list)
+
+        words_by_length = collections.defaultdict(list)
+        for word in closest:
+            words_by_length[len(word)].append(word)
+
+        for length, query_words in words_by_length.items():
+            queries = _encode(query_words, length)
+            query_histograms = self._histograms(queries)
+
+            for bucket_length in range(length - self._max_distance, length + self._max_distance + 1):
+                if bucket_length not in self._buckets:
+                    continue
+                bucket_words, targets, target_histograms = self._buckets[bucket_length]
+
+                query_indexes, target_indexes = self._filter(query_histograms, target_histograms)
+                if not len(query_indexes):
+                    continue
+
+                chunk_size = max(1, self._max_cells // ((length + 2) * (bucket_length + 2)))
+                distances = numpy.concatenate([
+                    self._distances(queries[query_indexes[start:start + chunk_size]],
+                                    targets[target_indexes[start:start + chunk_size]])
+                    for start in range(0, len(query_indexes), chunk_size)])
+
+                for query_index, target_index, distance in zip(query_indexes, target_indexes, distances):
+                    word = query_words[query_index]
+                    if distance > self._max_distance:
+                        continue
+                    elif distance < closest_distance[word]:
+                        closest[word] = set([bucket_words[target_index]])
+                        closest_distance[word] = distance
+                    elif distance == closest_distance[word]:
+                        closest[word].add(bucket_words[target_index])
+
+        return closest
+
+    def _filter(self, query_histograms, target_histograms):
+        """
+        :param query_histograms: histograms of the looked up words.
+        :param target_histograms: histograms of the dictionary words.
+        :return: indexes of the query and target pairs whose bag distance is maximum max_distance.
+        """
+        query_index_list = []
+        target_index_list = []
+        chunk_size = max(1, self._max_cells // target_histograms.size)
+
+        for start in range(0, len(query_histograms), chunk_size):
+            difference = query_histograms[start:start + chunk_size, None, :] - target_histograms[None, :, :]
+            surplus = numpy.clip(difference, 0, None).sum(axis=2)
+            deficit = numpy.clip(-difference, 0, None).sum(axis=2)
+            query_indexes, target_indexes = numpy.nonzero(numpy.maximum(surplus, deficit) <= self._max_distance)
+            query_index_list.append(query_indexes + start)
+            target_index_list.append(target_indexes)
+
+        return numpy.concatenate(query_index_list), numpy.concatenate(target_index_list)
+
+    def _distances(self, queries, targets):
+        """
+        Calculates the Damerau-Levenshtein distances like damerau_levenshtein_distance() does,
+        but for every pair at once. Only the cells maximum max_distance away from the diagonal are calculated,
+        the others can't be small enough.
+
+        :param queries: uint8 array of the looked up words (one row per pair).
+        :param targets: uint8 array of the dictionary words (one row per pair).
+        :return: array of the pairs' distances (values over max_distance are not exact).
+        """
+        pairs, rows = queries.shape
+        columns = targets.shape[1]
+        pair_indexes = numpy.arange(pairs)
+
+        # table[i + 1, j + 1] is the distance of queries[:, :i] and targets[:, :j], the first row and column
+        # are sentinels.
+        table = numpy.full((rows + 2, columns + 2, pairs), _INFINITY, dtype=numpy.int16)
+        table[1, 1:, :] = numpy.arange(columns + 1)[:, None]
+        table[1:, 1, :] = numpy.arange(rows + 1)[:, None]
+        # Last row of every character in the queries, per pair.
+        last_row_of_char = numpy.zeros((256, pairs), dtype=numpy.int16)
+
+        for i in range(1, rows + 1):
+            query_chars = queries[:, i - 1]
+            last_match_column = numpy.zeros(pairs, dtype=numpy.int16)
+
+            first_column = max(1, i - self._max_distance)
+            for j in range(1, first_column):
+                last_match_column[query_chars == targets[:, j - 1]] = j
+
+            for j in range(first_column, min(columns, i + self._max_distance) + 1):
+                target_chars = targets[:, j - 1]
+                k = last_row_of_char[target_chars, pair_indexes]
+                l = last_match_column
+
+                match = query_chars == target_chars
+                transposition = table[k, l, pair_indexes] + (i - k - 1) + 1 + (j - l - 1)
+                table[i + 1, j + 1] = numpy.minimum(numpy.minimum(table[i, j] + ~match,
+                                                                  table[i + 1, j] + 1),
+                                                    numpy.minimum(table[i, j + 1] + 1,
+                                                                  transposition))
+                last_match_column = numpy.where(match, j, l).astype(numpy.int16)
+
+            last_row_of_char[query_chars, pair_indexes] = i
+
+        return table[rows + 1, columns + 1]
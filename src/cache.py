@@ -0,0 +1,97 @@
+"""
+This file contains the implementation of the ResultCache class.
+Use this class to store the typos found in a file, so an unchanged file
+doesn't have to be checked again by a later run.
+"""
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+
+class ResultCache(object):
+    """
+    On-disk cache of Typofinder results in a directory.
+    An entry is keyed by the hash of the file's content and the Linguist's fingerprint, thus any change of
+    the dictionary (including the ignored words trained into it) makes the old entries unreachable.
+    """
+    def __init__(self, cache_directory_path, fingerprint):
+        """
+        :param cache_directory_path: path to the cache directory (created if non-existent).
+        :param fingerprint: fingerprint of the Linguist which finds the typos (see Linguist.get_fingerprint()).
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._cache_directory_path = cache_directory_path
+        self._fingerprint = fingerprint
+
+    def with_fingerprint(self, fingerprint):
+        """
+        :param fingerprint: fingerprint of another Linguist (e.g. the same one with other dictionary layers).
+        :return: ResultCache of the other Linguist in the same directory.
+        """
+        return ResultCache(self._cache_directory_path, fingerprint)
+
+    def get_key(self, content):
+        """
+        :param content: content of a file (bytes).
+        :return: key of the content's entry (see put_entry()).
+        """
+        return hashlib.sha1(self._fingerprint.encode('ascii') + b'\0' + content).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self._cache_directory_path, key[:2], key[2:] + '.json')
+
+    def get(self, content):
+        """
+        :param content: content of a file (bytes).
+        :return: (result map, typo positions without the lines) tuple stored for the content, or None.
+        """
+        try:
+            with open(self._entry_path(self.get_key(content)), 'r') as f:
+                entry = json.load(f)
+        except (IOError, ValueError):
+            return None
+
+        typo_positions = [(line_number, [(column, str(word)) for column, word in positions])
+                          for line_number, positions in entry['typo_positions']]
+        return entry['result_map'], typo_positions
+
+    def put(self, content, result_map, typo_positions):
+        """
+        Stores the results of a file.
+
+        :param content: content of the file (bytes).
+        :param result_map: the file's result map.
+        :param typo_positions: the file's typo positions without the lines: (line number, [(column, word), ...]).
+        """
+        self.put_entry(self.get_key(content), result_map, typo_positions)
+
+    def put_entry(self, key, result_map, typo_positions):
+        """
+        Stores the results of a file whose content is no longer at hand (e.g. they were completed later).
+
+        :param key: key of the file's content (see get_key()).
+        :param result_map: the file's result map.
+        :param typo_positions: the file's typo positions without the lines.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(entry_path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        # Concurrent runs (or the threads of a server) may store the same entry: it is written under a unique name
+        # and renamed.
+        temporary_file_path = "%s.%d.%d.tmp" % (entry_path, os.getpid(), threading.current_thread().ident)
+        with open(temporary_file_path, 'w') as f:
+            json.dump({'result_map': result_map, 'typo_positions': typo_positions}, f)
+        os.rename(temporary_file_path, entry_path)
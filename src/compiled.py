@@ -0,0 +1,161 @@
+"""
+This file contains the implementation of the compiled dictionary format.
+Use compile_dictionary() to write a dictionary into a compiled file and
+the CompiledDictionary class to use it without loading it into memory.
+
+Layout of a compiled dictionary file (every integer is a little-endian uint32):
+  * header: the MAGIC bytes, the format version and the number of words (N).
+  * counts: N integers, the likelihood of the words.
+  * offsets: N + 1 integers, the start of every word in the string table and the end of the last one.
+  * string table: the UTF-8 encoded words sorted bytewise, without separators.
+"""
+
+import array
+import collections
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+MAGIC = b'TYPODICT'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sII')
+_UINT32 = struct.Struct('<I')
+
+try:
+    _Mapping = collections.Mapping
+except AttributeError:
+    import collections.abc
+    _Mapping = collections.abc.Mapping
+
+
+def _to_bytes(word):
+    return word if isinstance(word, bytes) else word.encode('utf-8')
+
+
+def _uint32_array(values):
+    result = array.array('I', values)
+    if result.itemsize != 4:
+        result = array.array('L', values)
+    if sys.byteorder != 'little':
+        result.byteswap()
+    return result
+
+
+def is_compiled_dictionary(dictionary_file_path):
+    """
+    :param dictionary_file_path: path to a dictionary file.
+    :return: True if the file is a compiled dictionary, False otherwise.
+    """
+    with open(dictionary_file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def compile_dictionary(dictionary, dictionary_file_path):
+    """
+    Writes a dictionary into a compiled dictionary file.
+    The file is written next to its final place first and renamed, so readers never see a half written file.
+
+    :param dictionary: mapping of words to their likelihood.
+    :param dictionary_file_path: path to the compiled dictionary file (could be non-existent).
+    """
+    encoded_words = sorted((_to_bytes(word), count) for word, count in dictionary.items())
+
+    offsets = [0]
+    for word, _ in encoded_words:
+        offsets.append(offsets[-1] + len(word))
+
+    # Concurrent compilations of the same dictionary don't overwrite each other's temporary file.
+    temporary_file_path = "%s.%d.tmp" % (dictionary_file_path, os.getpid())
+    with open(temporary_file_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(encoded_words)))
+        _uint32_array([count for _, count in encoded_words]).tofile(f)
+        _uint32_array(offsets).tofile(f)
+        f.write(b''.join(word for word, _ in encoded_words))
+    os.rename(temporary_file_path, dictionary_file_path)
+
+    _log.info("Compiled dictionary has been saved: \'%s\'" % dictionary_file_path)
+
+
+class CompiledDictionary(_Mapping):
+    """
+    Read-only mapping of words to their likelihood backed by a memory-mapped compiled dictionary file.
+    Words are looked up with binary search in the string table, nothing is loaded until it is needed
+    and processes using the same file share its pages.
+    """
+    def __init__(self, dictionary_file_path):
+        self._log = _log.getChild(self.__class__.__name__)
+
+        with open(dictionary_file_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self._length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a compiled dictionary (version %d): \'%s\'" % (VERSION, dictionary_file_path))
+
+        self._counts_start = _HEADER.size
+        self._offsets_start = self._counts_start + 4 * self._length
+        self._strings_start = self._offsets_start + 4 * (self._length + 1)
+
+    def _offset(self, index):
+        return self._strings_start + _UINT32.unpack_from(self._mmap, self._offsets_start + 4 * index)[0]
+
+    def _word(self, index):
+        return self._mmap[self._offset(index):self._offset(index + 1)]
+
+    def _count(self, index):
+        return _UINT32.unpack_from(self._mmap, self._counts_start + 4 * index)[0]
+
+    def _find(self, word):
+        """
+        :param word: the searched word.
+        :return: index of the word, or -1 if it is not in the dictionary.
+        """
+        word = _to_bytes(word)
+        low, high = 0, self._length
+        while low < high:
+            middle = (low + high) // 2
+            if self._word(middle) < word:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self._length and self._word(low) == word:
+            return low
+        return -1
+
+    def __contains__(self, word):
+        return self._find(word) >= 0
+
+    def __getitem__(self, word):
+        index = self._find(word)
+        if index < 0:
+            raise KeyError(word)
+        return self._count(index)
+
+    def get(self, word, default=None):
+        index = self._find(word)
+        return self._count(index) if index >= 0 else default
+
+    def get_digest(self):
+        """
+        :return: SHA-1 hex digest of the whole compiled dictionary file.
+        """
+        return hashlib.sha1(self._mmap).hexdigest()
+
+    def items(self):
+        return [(self._word(index).decode('utf-8'), self._count(index)) for index in range(self._length)]
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self._word(index).decode('utf-8')
+
+    def __len__(self):
+        return self._length
@@ -0,0 +1,114 @@
+"""
+This file contains helper functions which ask the local git for the changes of a working tree.
+Use them to check only the lines which have been added or modified since a revision.
+"""
+
+import collections
+import logging
+import os
+import re
+import subprocess
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+# Header of a hunk in a diff without context lines: @@ -<old start>[,<old count>] +<new start>[,<new count>] @@
+_HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def _run_git(arguments, directory_path):
+    """
+    :param arguments: arguments of the git command.
+    :param directory_path: working directory of the git command.
+    :return: standard output of the command, or None if it failed.
+    """
+    try:
+        process = subprocess.Popen(['git'] + arguments, cwd=directory_path,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        _log.error("Git couldn't be run: %s" % e)
+        return None
+
+    output, error = process.communicate()
+    if process.returncode:
+        _log.error("Git command failed (git %s): %s" % (' '.join(arguments), error.decode('utf-8', 'replace').strip()))
+        return None
+
+    return output
+
+
+def parse_diff(diff):
+    """
+    Finds the added and modified lines of the new files in a diff which was made without context lines
+    ('git diff --unified=0 --no-prefix').
+
+    :param diff: text of the diff.
+    :return: OrderedDict which maps the paths of the new files (relative to the repository's root)
+    to the sorted list of their added or modified line numbers.
+    """
+    changed_lines = collections.OrderedDict()
+    file_path = None
+    # The file headers come between 'diff --git' and the first hunk. In a hunk, an added line which starts
+    # with "++ " looks like the header of a new file.
+    is_file_header = False
+
+    for line in diff.splitlines():
+        if line.startswith("diff --git "):
+            is_file_header = True
+            continue
+
+        if is_file_header and line.startswith("+++ "):
+            # Git ends the path with a tab if it has a space in it.
+            file_path = line[4:].rstrip("\t")
+            if file_path == "/dev/null":
+                file_path = None
+            elif file_path.startswith('"'):
+                # Git quotes paths with unusual characters, like a C string literal.
+                file_path = file_path[1:-1].decode('string_escape')
+            continue
+
+        match = _HUNK_HEADER.match(line)
+        if match is None:
+            continue
+
+        is_file_header = False
+        if file_path is None:
+            continue
+
+        start = int(match.group(1))
+        count = 1 if match.group(2) is None else int(match.group(2))
+        # A hunk which only deletes lines has no new lines.
+        changed_lines.setdefault(file_path, []).extend(range(start, start + count))
+
+    for line_numbers in changed_lines.values():
+        line_numbers.sort()
+
+    return changed_lines
+
+
+def get_changed_lines(path, revision):
+    """
+    Asks git which lines of the working tree's files have been added or modified since a revision.
+    Only the tracked files are compared, the deleted lines and files are left out.
+
+    :param path: a file or a directory in a git working tree, only the changes under it are collected.
+    :param revision: the revision the working tree is compared to (e.g. 'HEAD', 'origin/master').
+    :return: OrderedDict which maps the absolute paths of the changed files to the sorted list of their
+    added or modified line numbers, or None if git couldn't tell.
+    """
+    path = os.path.realpath(path)
+    directory_path = path if os.path.isdir(path) else os.path.dirname(path)
+
+    top_level = _run_git(['rev-parse', '--show-toplevel'], directory_path)
+    if top_level is None:
+        return None
+    top_level = top_level.strip()
+
+    diff = _run_git(['diff', '--no-color', '--no-ext-diff', '--no-prefix', '--unified=0', '--diff-filter=ACMR',
+                     revision, '--', path], top_level)
+    if diff is None:
+        return None
+
+    return collections.OrderedDict((os.path.join(top_level, file_path), line_numbers)
+                                   for file_path, line_numbers in parse_diff(diff).items())
@@ -0,0 +1,235 @@
+"""
+This file contains the implementation of the DictionaryJournal class.
+Use this class to record changes of a json dictionary file in an append-only
+journal next to it instead of rewriting the whole file.
+
+Layout of a journal file (one json document per line):
+  * header: {"snapshot": "<sha1 of the dictionary file>", "file": [<size>, <mtime>, <inode>]}, the snapshot
+    the changes belong to. The file's identity spares hashing it: the digest is compared only if it has changed.
+  * changes: {"add": {"<word>": <count>, ...}} or {"delete": ["<word>", ...]}, in the order they were made.
+A journal whose header doesn't match the dictionary file has already been folded into it (see compact()),
+its changes are not replayed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Without file locks only the atomicity of appending writes protects concurrent appenders.
+    fcntl = None
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+JOURNAL_SUFFIX = '.journal'
+
+
+def get_file_digest(file_path, block_size=1 << 20):
+    """
+    :param file_path: path to a file.
+    :return: sha1 hex digest of the file's content.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_file_identity(file_path):
+    """
+    :param file_path: path to a file.
+    :return: [size, modification time, inode] of the file. It changes whenever the file is rewritten (an atomic
+    replacement gives it a new inode), a touched but unchanged file gets a new identity too.
+    """
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime, stat.st_ino]
+
+
+def _is_snapshot(header, file_path):
+    """
+    :param header: the header of a journal (or None).
+    :param file_path: path to the dictionary file.
+    :return: True if the journal belongs to the dictionary file. The file is hashed only if its identity
+    differs from the header's one.
+    """
+    if header is None:
+        return False
+    if header.get('file') == get_file_identity(file_path):
+        return True
+    return header.get('snapshot') == get_file_digest(file_path)
+
+
+def _lock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _write_all(fd, data):
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _parse_header(line):
+    """
+    :return: the header dictionary in the first line of a journal, or None.
+    """
+    try:
+        header = json.loads(line.decode('utf-8') if isinstance(line, bytes) else line)
+    except ValueError:
+        return None
+    return header if isinstance(header, dict) else None
+
+
+def _read_header(fd):
+    """
+    :return: the header of an open journal file, or None.
+    """
+    os.lseek(fd, 0, os.SEEK_SET)
+    return _parse_header(os.read(fd, 256).split(b"\n", 1)[0])
+
+
+def _replace_header(fd, header_line):
+    """
+    Writes a new header over the header of an open journal file, its changes are kept.
+    """
+    os.lseek(fd, 0, os.SEEK_SET)
+    content = b"".join(iter(lambda: os.read(fd, 1 << 20), b""))
+    changes = content.split(b"\n", 1)[1] if b"\n" in content else b""
+    os.ftruncate(fd, 0)
+    _write_all(fd, header_line.encode('utf-8') + b"\n" + changes)
+
+
+def _ends_with_newline(fd):
+    size = os.fstat(fd).st_size
+    if not size:
+        return True
+    os.lseek(fd, size - 1, os.SEEK_SET)
+    return os.read(fd, 1) == b"\n"
+
+
+class DictionaryJournal(object):
+    """
+    Append-only journal of the changes of a json dictionary file, stored in '<dictionary file>.journal'.
+      * append() costs as much as the change: the dictionary file is hashed only when the journal is started
+        or the file's identity has changed (see get_file_identity()).
+      * Appenders and compact() lock the journal file, so concurrent trainers don't lose each other's changes.
+      * compact() folds the journal into the dictionary file, which is replaced atomically.
+    """
+    def __init__(self, dictionary_file_path):
+        """
+        :param dictionary_file_path: path to the json dictionary file (the snapshot).
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._dictionary_file_path = dictionary_file_path
+        self._journal_file_path = dictionary_file_path + JOURNAL_SUFFIX
+
+    def get_path(self):
+        return self._journal_file_path
+
+    def append(self, word_counts=None, deleted_words=None):
+        """
+        Appends changes of the dictionary to the journal in one write. The additions are applied first.
+
+        :param word_counts: mapping of lowercase words to the number their likelihood is incremented by.
+        :param deleted_words: lowercase words which are deleted from the dictionary.
+        """
+        lines = []
+        if word_counts:
+            lines.append(json.dumps({'add': dict(word_counts)}, sort_keys=True))
+        if deleted_words:
+            lines.append(json.dumps({'delete': sorted(deleted_words)}))
+        if not lines:
+            return
+
+        fd = os.open(self._journal_file_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _lock(fd)
+
+            header = _read_header(fd) or {}
+            identity = get_file_identity(self._dictionary_file_path)
+            if header.get('file') != identity:
+                snapshot = get_file_digest(self._dictionary_file_path)
+                header_line = json.dumps({'snapshot': snapshot, 'file': identity})
+                if header.get('snapshot') == snapshot:
+                    # The file has been touched without a change, the next appends don't hash it again.
+                    _replace_header(fd, header_line)
+                else:
+                    # The journal is new or it has already been folded into the dictionary file.
+                    os.ftruncate(fd, 0)
+                    lines.insert(0, header_line)
+
+            if not _ends_with_newline(fd):
+                # The last write was interrupted, the changes must not be glued to its remainder.
+                lines.insert(0, "")
+
+            _write_all(fd, ("\n".join(lines) + "\n").encode('utf-8'))
+        finally:
+            # Closing the file releases the lock.
+            os.close(fd)
+
+        _log.info("Change(s) have been appended to the journal: \'%s\'" % self._journal_file_path)
+
+    def read(self):
+        """
+        :return: list of ('add', {word: count}) and ('delete', [word, ...]) changes of the dictionary file
+        in their order. Empty if there is no journal or it doesn't belong to the dictionary file.
+        """
+        if not os.path.exists(self._journal_file_path):
+            return []
+
+        with open(self._journal_file_path, 'rb') as f:
+            lines = f.read().decode('utf-8').splitlines()
+
+        if not lines:
+            return []
+
+        if not _is_snapshot(_parse_header(lines[0]), self._dictionary_file_path):
+            _log.debug("Journal has already been folded into the dictionary: \'%s\'" % self._journal_file_path)
+            return []
+
+        changes = []
+        for line_number, line in enumerate(lines[1:], 2):
+            try:
+                change = json.loads(line)
+            except ValueError:
+                # A trainer may have been killed in the middle of a write.
+                _log.warning("Invalid change is skipped in line %d of the journal: \'%s\'"
+                             % (line_number, self._journal_file_path))
+                continue
+
+            if 'add' in change:
+                changes.append(('add', change['add']))
+            elif 'delete' in change:
+                changes.append(('delete', change['delete']))
+
+        return changes
+
+    def compact(self, rewrite_snapshot):
+        """
+        Folds the journal into the dictionary file. Appenders wait until it is finished.
+        If the process is killed after the dictionary file has been replaced, the journal's header doesn't match
+        the new dictionary file anymore: its changes are not replayed twice.
+
+        :param rewrite_snapshot: function without arguments which loads the dictionary file with the journal
+        replayed and replaces the dictionary file with the result atomically.
+        """
+        if not os.path.exists(self._journal_file_path):
+            _log.info("There is no journal to compact: \'%s\'" % self._journal_file_path)
+            return
+
+        fd = os.open(self._journal_file_path, os.O_RDWR)
+        try:
+            _lock(fd)
+            rewrite_snapshot()
+            os.ftruncate(fd, 0)
+        finally:
+            os.close(fd)
+
+        _log.info("Journal has been compacted into the dictionary: \'%s\'" % self._dictionary_file_path)
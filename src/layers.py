@@ -0,0 +1,221 @@
+"""
+This file contains the implementation of the LayeredDictionary and the LayeredIndex classes.
+Use them to put a writable layer (e.g. project words or ignored words)
+over a shared dictionary and its index without copying or modifying them.
+"""
+
+import collections
+import hashlib
+import logging
+
+from src.utils import damerau_levenshtein_distance
+
+try:
+    _MutableMapping = collections.MutableMapping
+except AttributeError:
+    import collections.abc
+    _MutableMapping = collections.abc.MutableMapping
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+
+class LayeredDictionary(_MutableMapping):
+    """
+    Mapping of words to their likelihood made of a read-only base (a dict, a CompiledDictionary or another
+    LayeredDictionary) and a writable layer over it.
+      * Lookups see the layer first and then the base.
+      * Writes go to the layer only: a changed likelihood is stored in the layer, a deleted word of the base
+        is hidden by the layer. The base is never modified, many layers can share it.
+    Creating and dropping a layer costs as much as the layer, not as much as the base.
+    """
+    def __init__(self, base, layer=None):
+        """
+        :param base: mapping of words to their likelihood, it must not be modified while the layer is used.
+        :param layer: mapping of words to their likelihood which override the base (e.g. a project dictionary).
+        It is modified by the writes. Empty by default.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._base = base
+        self._layer = layer if layer is not None else {}
+        # Words of the base which have been deleted through the layer.
+        self._deleted = set()
+        self._length = len(base) + sum(1 for word in self._layer if word not in base)
+
+    def get_base(self):
+        return self._base
+
+    def get_layer(self):
+        return self._layer
+
+    def get_deleted_words(self):
+        return self._deleted
+
+    def copy(self):
+        """
+        :return: LayeredDictionary over the same base with a copy of this layer, the writes of either one
+        don't change the other. It costs as much as the layer.
+        """
+        dictionary = LayeredDictionary(self._base, dict(self._layer))
+        dictionary._deleted = set(self._deleted)
+        dictionary._length = self._length
+        return dictionary
+
+    def get_word_containers(self):
+        """
+        :return: list of the mappings the words are stored in: the layers from the top and the base at the bottom.
+        Every word of the dictionary is in one of them, but the deleted words can be there too.
+        """
+        containers = [self._layer]
+        if isinstance(self._base, LayeredDictionary):
+            containers.extend(self._base.get_word_containers())
+        else:
+            containers.append(self._base)
+        return containers
+
+    def get_digest(self):
+        """
+        :return: SHA-1 hex digest of the layer's words and deleted words (the base is not included).
+        """
+        digest = hashlib.sha1()
+        for word, count in sorted(self._layer.items()):
+            digest.update(("%s:%d\n" % (word, count)).encode('utf-8'))
+        for word in sorted(self._deleted):
+            digest.update(("-%s\n" % word).encode('utf-8'))
+        return digest.hexdigest()
+
+    def __contains__(self, word):
+        if word in self._layer:
+            return True
+        return word not in self._deleted and word in self._base
+
+    def __getitem__(self, word):
+        try:
+            return self._layer[word]
+        except KeyError:
+            if word in self._deleted:
+                raise
+            return self._base[word]
+
+    def get(self, word, default=None):
+        count = self._layer.get(word)
+        if count is not None:
+            return count
+        if word in self._deleted:
+            return default
+        return self._base.get(word, default)
+
+    def __setitem__(self, word, count):
+        if word not in self:
+            self._length += 1
+        self._layer[word] = count
+        self._deleted.discard(word)
+
+    def __delitem__(self, word):
+        if word not in self:
+            raise KeyError(word)
+
+        self._layer.pop(word, None)
+        if word in self._base:
+            self._deleted.add(word)
+        self._length -= 1
+
+    def items(self):
+        return [(word, self[word]) for word in self]
+
+    def __iter__(self):
+        for word in self._layer:
+            yield word
+        for word in self._base:
+            if word not in self._layer and word not in self._deleted:
+                yield word
+
+    def __len__(self):
+        return self._length
+
+
+class LayeredIndex(object):
+    """
+    Correction index (a SymmetricDeleteIndex or a TrieIndex) of a LayeredDictionary made of the index of its base
+    and a small index of the words added by the layer.
+      * The index of the base is shared and never modified: the words deleted by the layer are only left out
+        of its lookups.
+      * The added words are indexed in the layer's own index.
+    Creating it costs nothing, the base index is not built again.
+    """
+    def __init__(self, base, layer_index):
+        """
+        :param base: index of the base dictionary, it must not be modified while the layer is used.
+        :param layer_index: empty index of the same kind and maximum distance.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._base = base
+        self._layer_index = layer_index
+        # Words indexed by the layer's index and words of the base index which are left out.
+        self._added = set()
+        self._removed = set()
+
+    def copy(self, layer_index):
+        """
+        :param layer_index: empty index of the same kind and maximum distance, the added words are indexed in it.
+        :return: LayeredIndex over the same base index with a copy of this layer, the changes of either one
+        don't change the other. It costs as much as the added words.
+        """
+        index = LayeredIndex(self._base, layer_index)
+        for word in self._added:
+            layer_index.add(word)
+        index._added = set(self._added)
+        index._removed = set(self._removed)
+        return index
+
+    def add(self, word):
+        """
+        :param word: a word which is not in the index yet.
+        """
+        if word in self._removed:
+            self._removed.discard(word)
+        else:
+            self._added.add(word)
+            self._layer_index.add(word)
+
+    def remove(self, word):
+        """
+        :param word: a word which is in the index.
+        """
+        if word in self._added:
+            self._added.discard(word)
+            self._layer_index.remove(word)
+        else:
+            self._removed.add(word)
+
+    def lookup(self, word, max_distance=None, deadline=None):
+        """
+        :return: set of the indexed words with the smallest distance from the word (see SymmetricDeleteIndex.lookup()).
+        """
+        if self._removed:
+            # The closest words of the base can be deleted ones, the farther words are needed too.
+            found = self.lookup_within(word, max_distance, deadline)
+        else:
+            found = dict((candidate, damerau_levenshtein_distance(word, candidate))
+                         for candidate in self._base.lookup(word, max_distance, deadline))
+            found.update((candidate, damerau_levenshtein_distance(word, candidate))
+                         for candidate in self._layer_index.lookup(word, max_distance, deadline))
+
+        if not found:
+            return set()
+        closest_distance = min(found.values())
+        return set(candidate for candidate, distance in found.items() if distance == closest_distance)
+
+    def lookup_within(self, word, max_distance=None, deadline=None):
+        """
+        :return: dictionary which maps every indexed word maximum max_distance away from the word to its distance
+        (see SymmetricDeleteIndex.lookup_within()).
+        """
+        found = dict((candidate, distance)
+                     for candidate, distance in self._base.lookup_within(word, max_distance, deadline).items()
+                     if candidate not in self._removed)
+        found.update(self._layer_index.lookup_within(word, max_distance, deadline))
+        return found
@@ -0,0 +1,89 @@
+"""
+This file contains the implementation of the CorrectionLimits class.
+Use this class to bound the cost of the Linguist's corrections, so one long
+or run-together word can't stall the check of a file.
+"""
+
+import logging
+import time
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+# The correction indexes check the deadline after this many steps (probed deletes, calculated distances
+# or walked trie nodes).
+DEADLINE_CHECK_INTERVAL = 64
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised by the lookups of the correction indexes when they run out of time.
+    """
+    pass
+
+
+class CorrectionLimits(object):
+    """
+    Limits of a correction. A correction which would exceed them gives up the farther candidates:
+    it makes the suggestion from the closer ones, or no suggestion at all.
+      * max_distance2_length: words longer than this are corrected with maximum 1 edit.
+      * max_candidates: maximum number of edited strings generated for a word by the 'edits' engine
+        (the other engines don't generate edited strings, they are not limited by it).
+      * max_word_seconds: time budget of a word.
+      * max_file_seconds: time budget of a correct_many() call, i.e. of the unknown words of a file.
+    The limits are turned off by None. The closest candidates (1 edit away) are always searched.
+    """
+    def __init__(self, max_distance2_length=None, max_candidates=None, max_word_seconds=None, max_file_seconds=None):
+        self._max_distance2_length = max_distance2_length
+        self._max_candidates = max_candidates
+        self._max_word_seconds = max_word_seconds
+        self._max_file_seconds = max_file_seconds
+
+    def is_enabled(self):
+        return any(limit is not None for limit in (self._max_distance2_length, self._max_candidates,
+                                                   self._max_word_seconds, self._max_file_seconds))
+
+    def get_description(self):
+        """
+        :return: text describing the limits which change the suggestions the same way every time,
+        empty if there is none. The time budgets are not part of it: their results are never cached.
+        """
+        parts = []
+        if self._max_distance2_length is not None:
+            parts.append("max_distance2_length:%d\n" % self._max_distance2_length)
+        if self._max_candidates is not None:
+            parts.append("max_candidates:%d\n" % self._max_candidates)
+        return "".join(parts)
+
+    def get_max_distance(self, word, max_distance):
+        """
+        :param word: the corrected word.
+        :param max_distance: maximum distance of the suggestions without limits.
+        :return: maximum distance of the word's suggestions.
+        """
+        if self._max_distance2_length is not None and len(word) > self._max_distance2_length:
+            return min(1, max_distance)
+        return max_distance
+
+    def get_max_candidates(self):
+        return self._max_candidates
+
+    def get_file_deadline(self):
+        """
+        :return: time (see time.time()) the corrections of a file must be finished by, or None.
+        """
+        if self._max_file_seconds is None:
+            return None
+        return time.time() + self._max_file_seconds
+
+    def get_word_deadline(self, file_deadline=None):
+        """
+        :param file_deadline: deadline of the file the word belongs to (optional).
+        :return: time (see time.time()) the correction of a word must be finished by, or None.
+        """
+        if self._max_word_seconds is None:
+            return file_deadline
+
+        deadline = time.time() + self._max_word_seconds
+        return deadline if file_deadline is None else min(deadline, file_deadline)
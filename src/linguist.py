@@ -7,12 +7,98 @@ and make a suggestion for a not known word.
 import logging
 import json
 import collections
+import hashlib
+import itertools
 import os
+import threading
+import time
+
+from src.symspell import SymmetricDeleteIndex
+from src.trie import TrieIndex
+from src.buckets import LengthBucketIndex, HAS_NUMPY
+from src.compiled import CompiledDictionary, compile_dictionary, is_compiled_dictionary
+from src.suggestions import MISSING
+from src.stats import NO_STATISTICS
+from src.journal import DictionaryJournal
+from src.membership import MembershipIndex
+from src.limits import CorrectionLimits, DeadlineExceeded
+from src.layers import LayeredDictionary, LayeredIndex
+from src.utils import damerau_levenshtein_distance
 
 logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
 _root_log = logging.getLogger("typofinder")
 _log = _root_log.getChild(__name__)
 
+# The correction engines which can be chosen for the Linguist.
+#   * edits: generates every string maximum 2 edits away from the word and looks them up.
+#   * symspell: looks up the word's deletes in a precomputed index of the dictionary words' deletes.
+#   * trie: walks a prefix tree of the dictionary words and drops the branches which are too far.
+ENGINES = ('edits', 'symspell', 'trie')
+
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+
+# Version numbers of the dictionaries in the process, every change of a Linguist's dictionary takes a new one.
+_VERSIONS = itertools.count()
+
+
+def _iter_edits1(word):
+    """
+    Generates every string which is 1 edit (delete, transpose, replace or insert) away from a word.
+    The strings are made one by one instead of being collected first, some of them are made more than once.
+
+    :param word: the edited word.
+    :return: generator of edited strings, _count_edits1(len(word)) of them.
+    """
+    for i in range(len(word) + 1):
+        head, tail = word[:i], word[i:]
+        if tail:
+            yield head + tail[1:]
+            if len(tail) > 1:
+                yield head + tail[1] + tail[0] + tail[2:]
+            for c in _ALPHABET:
+                yield head + c + tail[1:]
+        for c in _ALPHABET:
+            yield head + c + tail
+
+
+def _count_edits1(length):
+    """
+    :param length: length of a word.
+    :return: number of strings generated by _iter_edits1() for a word of this length.
+    """
+    return length + max(0, length - 1) + len(_ALPHABET) * (2 * length + 1)
+
+
+def _find_known(strings, dictionary, containers):
+    """
+    :param strings: iterable of strings.
+    :param dictionary: mapping of the known words.
+    :param containers: the mappings the dictionary's words are stored in (see LayeredDictionary.get_word_containers()).
+    Searching them one by one is faster than going through the layers for every string.
+    :return: set of the strings which are known words.
+    """
+    if len(containers) == 1:
+        return set(string for string in strings if string in dictionary)
+
+    strings = list(strings)
+    found = set()
+    for container in containers:
+        found.update(string for string in strings if string in container)
+    # The deleted words of the layers are found in the containers too.
+    return set(string for string in found if string in dictionary)
+
+
+class _LimitExceeded(Exception):
+    """
+    Raised by the candidate search when a correction exceeds its limits (see CorrectionLimits).
+    """
+    def __init__(self, tier, distance, candidate_count):
+        Exception.__init__(self, tier)
+        self.tier = tier
+        # Distance of the tier which was given up and the number of candidates generated in it.
+        self.distance = distance
+        self.candidate_count = candidate_count
+
 
 class Linguist(object):
     """
@@ -20,15 +106,244 @@ class Linguist(object):
       * handling dictionary: initialize, edit, save, load, etc.
       * checking if a set of words are in the dictionary.
       * making a suggestion for a not known word.
+    A Linguist which is not modified can check and correct words in many threads at once.
     """
-    def __init__(self):
+    def __init__(self, engine='edits', max_distance=2, suggestion_cache=None, statistics=None, use_bloom_filter=False,
+                 limits=None):
+        """
+        :param engine: name of the correction engine (see ENGINES).
+        :param max_distance: maximum number of edits between a word and its suggestion.
+        The 'edits' engine supports maximum 2 edits.
+        :param suggestion_cache: SuggestionCache which remembers the suggestions (optional).
+        :param statistics: Statistics which records the corrections and the phases of the checks (optional).
+        :param use_bloom_filter: check the words with a Bloom filter of the dictionary before looking them up
+        (see MembershipIndex). It makes finding the unknown words faster with a large compiled dictionary.
+        :param limits: CorrectionLimits which bounds the cost of the corrections (optional).
+        """
         self._log = _log.getChild(self.__class__.__name__)
 
+        if engine not in ENGINES:
+            raise ValueError("Unknown correction engine: \'%s\'" % engine)
+
+        if max_distance < 1 or (engine == 'edits' and max_distance > 2):
+            raise ValueError("Unsupported maximum distance for engine \'%s\': %d" % (engine, max_distance))
+
+        self._engine = engine
+        self._max_distance = max_distance
+        self._suggestion_cache = suggestion_cache
+        self._statistics = statistics or NO_STATISTICS
         self._dictionary = collections.defaultdict()
+        self._membership = MembershipIndex(use_bloom_filter)
+        # The empty dictionary can be trained without loading a dictionary file first.
+        self._membership.build(self._dictionary)
+        self._limits = limits or CorrectionLimits()
+        # Number of corrections cut short by a time budget, their suggestions are not cached.
+        self._time_limit_count = 0
+        self._index = self._create_index()
+        # Guards the state which is built or counted while the words are checked (the buckets and the counter).
+        self._lock = threading.Lock()
+
+        # Built on the first correct_many() call and dropped whenever the set of known words changes.
+        self._buckets = None
+        # Calculated on the first get_fingerprint() call and dropped whenever the dictionary changes.
+        self._fingerprint = None
+        # Changes with the dictionary like the fingerprint but costs nothing, it is unique in the process only.
+        self._version = next(_VERSIONS)
+        # Digest of the dictionary under the layers, kept while only the layers change.
+        self._base_digest = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _create_index(self):
+        """
+        :return: new empty index of the correction engine, or None if the engine doesn't have one.
+        """
+        if self._engine == 'symspell':
+            return SymmetricDeleteIndex(self._max_distance)
+        elif self._engine == 'trie':
+            return TrieIndex(self._max_distance)
+        return None
 
     def get_dictionary(self):
         return self._dictionary
 
+    def get_suggestion_cache(self):
+        return self._suggestion_cache
+
+    def get_statistics(self):
+        return self._statistics
+
+    def set_statistics(self, statistics):
+        self._statistics = statistics or NO_STATISTICS
+
+    def get_time_limit_count(self):
+        """
+        :return: number of corrections which have been cut short by a time budget so far.
+        """
+        return self._time_limit_count
+
+    def get_fingerprint(self):
+        """
+        :return: hash of the dictionary (with its layers), the maximum distance of suggestions and the correction
+        limits. It changes whenever a suggestion could change. The engine is not part of it: every engine makes
+        the same suggestions. The dictionary under the layers is hashed only once.
+        """
+        if self._fingerprint is None:
+            layers = []
+            dictionary = self._dictionary
+            while isinstance(dictionary, LayeredDictionary):
+                layers.append(dictionary)
+                dictionary = dictionary.get_base()
+
+            if self._base_digest is None:
+                if isinstance(dictionary, CompiledDictionary):
+                    self._base_digest = dictionary.get_digest()
+                else:
+                    base_digest = hashlib.sha1()
+                    for word, count in sorted(dictionary.items()):
+                        base_digest.update(("%s:%d\n" % (word, count)).encode('utf-8'))
+                    self._base_digest = base_digest.hexdigest()
+
+            digest = hashlib.sha1(("max_distance:%d\n" % self._max_distance).encode('ascii'))
+            digest.update(self._limits.get_description().encode('ascii'))
+            digest.update(self._base_digest.encode('ascii'))
+            for layer in reversed(layers):
+                digest.update(layer.get_digest().encode('ascii'))
+            self._fingerprint = digest.hexdigest()
+
+        return self._fingerprint
+
+    def _drop_fingerprint(self):
+        """
+        Must be called whenever the dictionary is changed or replaced.
+        """
+        self._fingerprint = None
+        self._version = next(_VERSIONS)
+
+    def _get_suggestion_stamp(self):
+        """
+        :return: version stamp of the suggestions in the suggestion cache. The fingerprint is calculated only
+        if the cache stores the suggestions on disk: they are looked up by other processes too.
+        """
+        if self._suggestion_cache.is_persistent():
+            return self.get_fingerprint()
+        return "version:%d" % self._version
+
+    def _dictionary_changed(self):
+        """
+        Drops the fingerprint after the words of the dictionary (or its top layer) have been changed.
+        """
+        self._drop_fingerprint()
+        if not isinstance(self._dictionary, LayeredDictionary):
+            self._base_digest = None
+
+    def get_layer_count(self):
+        """
+        :return: number of layers over the loaded dictionary.
+        """
+        count = 0
+        dictionary = self._dictionary
+        while isinstance(dictionary, LayeredDictionary):
+            count += 1
+            dictionary = dictionary.get_base()
+        return count
+
+    def push_layer(self, layer=None):
+        """
+        Puts a layer over the dictionary (see LayeredDictionary). The dictionary under it is neither copied
+        nor modified: training and deleting words change only the top layer until pop_layer() drops it.
+        Loading a dictionary drops every layer.
+
+        :param layer: mapping of words to their likelihood which override the dictionary (e.g. a project
+        dictionary). It is modified by training and deleting words. Empty by default.
+        """
+        dictionary = LayeredDictionary(self._dictionary, layer)
+        self._switch_dictionary(dictionary, [word for word in dictionary.get_layer() if word not in self._dictionary],
+                                [])
+
+    def pop_layer(self):
+        """
+        Drops the top layer, the dictionary is the same as it was before push_layer().
+
+        :return: the words of the dropped layer mapped to their likelihood, or None if there is no layer.
+        """
+        if not isinstance(self._dictionary, LayeredDictionary):
+            _log.error("There is no dictionary layer to drop.")
+            return None
+
+        dictionary = self._dictionary
+        base = dictionary.get_base()
+        self._switch_dictionary(base, dictionary.get_deleted_words(),
+                                [word for word in dictionary.get_layer() if word not in base])
+        return dictionary.get_layer()
+
+    def _switch_dictionary(self, dictionary, added_words, removed_words):
+        """
+        Replaces the dictionary with a layer over it or under it. The indexes are updated with the differing
+        words instead of being built again.
+
+        :param dictionary: the new dictionary.
+        :param added_words: words which are in the new dictionary but not in the current one.
+        :param removed_words: words which are in the current dictionary but not in the new one.
+        """
+        self._dictionary = dictionary
+        self._drop_fingerprint()
+        self._buckets = None
+        self._membership.switch(dictionary, added_words)
+
+        if self._index is not None:
+            for word in removed_words:
+                self._index.remove(word)
+            for word in added_words:
+                self._index.add(word)
+
+    def load_layer(self, dictionary_file_path):
+        """
+        Loads a json dictionary file (e.g. a project dictionary) and puts it over the dictionary as a layer
+        (see push_layer()). The changes in the journal of the file are replayed into the layer.
+
+        :param dictionary_file_path: path to a json dictionary file.
+        :return: True if the layer has been loaded, False otherwise.
+        """
+        try:
+            with self._statistics.phase('dictionary_load'), open(dictionary_file_path, 'r') as f:
+                layer = json.load(f)
+        except (ValueError, IOError):
+            _log.error("Given path is not a dictionary: \'%s\'" % dictionary_file_path)
+            return False
+
+        if not isinstance(layer, dict):
+            _log.error("Given path is not a dictionary: \'%s\'" % dictionary_file_path)
+            return False
+
+        for operation, words in DictionaryJournal(dictionary_file_path).read():
+            if operation == 'add':
+                for word, count in words.items():
+                    layer[word] = layer.get(word, 0) + count
+            else:
+                for word in words:
+                    layer.pop(word, None)
+
+        self.push_layer(layer)
+        _log.info("Dictionary layer has been loaded: \'%s\'" % dictionary_file_path)
+        return True
+
+    def _make_writable(self):
+        """
+        Copies a read-only (compiled) dictionary into memory before it is modified.
+        """
+        if isinstance(self._dictionary, CompiledDictionary):
+            _log.debug("Compiled dictionary is copied into memory for modification.")
+            self._dictionary = dict(self._dictionary.items())
+            self._membership.build(self._dictionary)
+
     def train_dictionary(self, word_list):
         """
         Updates the dictionary by
@@ -43,11 +358,41 @@ class Linguist(object):
             _log.warning("No words will be added to dictionary: word list is empty.")
             return
 
+        self._make_writable()
+        self._dictionary_changed()
+
         for word in word_list:
             try:
                 self._dictionary[word] += 1
             except KeyError:
                 self._dictionary[word] = 1
+                self._membership.add(word)
+                self._buckets = None
+                if self._index is not None:
+                    self._index.add(word)
+
+    def train_dictionary_counts(self, word_counts):
+        """
+        Updates the dictionary as if train_dictionary() was called with every word repeated by its count.
+
+        :param word_counts: mapping of lowercase words to their number of occurrences (e.g. collections.Counter).
+        """
+        if not word_counts:
+            _log.warning("No words will be added to dictionary: word counts are empty.")
+            return
+
+        self._make_writable()
+        self._dictionary_changed()
+
+        for word, count in word_counts.items():
+            try:
+                self._dictionary[word] += count
+            except KeyError:
+                self._dictionary[word] = count
+                self._membership.add(word)
+                self._buckets = None
+                if self._index is not None:
+                    self._index.add(word)
 
     def delete_from_dictionary(self, word_list):
         """
@@ -65,12 +410,28 @@ class Linguist(object):
             _log.warning("Can't remove word(s): dictionary is empty.")
             return
 
+        self._make_writable()
+        self._dictionary_changed()
+
         for word in word_list:
-            try:
-                del self._dictionary[word]
-            except KeyError:
+            if not self._remove_word(word):
                 _log.warning("Can't remove word: \'%s\'. No such word in directory." % word)
 
+    def _remove_word(self, word):
+        """
+        :return: True if the word was in the dictionary, False otherwise.
+        """
+        try:
+            del self._dictionary[word]
+        except KeyError:
+            return False
+
+        self._membership.remove(word)
+        self._buckets = None
+        if self._index is not None:
+            self._index.remove(word)
+        return True
+
     def save_dictionary_to_json(self, dictionary_file_path):
         """
         Saves or creates a dictionary file in json format.
@@ -86,14 +447,130 @@ class Linguist(object):
         else:
             _log.info("Dictionary will be created: \'%s\'" % dictionary_file_path)
 
-        with open(dictionary_file_path, 'w') as f:
-            json.dump(self._dictionary, f, sort_keys=True, indent=2, separators=(',', ': '))
+        # The file is written next to its final place first and renamed, so readers never see a half written file.
+        temporary_file_path = "%s.%d.tmp" % (dictionary_file_path, os.getpid())
+        with open(temporary_file_path, 'w') as f:
+            json.dump(dict(self._dictionary.items()), f, sort_keys=True, indent=2, separators=(',', ': '))
+        os.rename(temporary_file_path, dictionary_file_path)
 
         _log.info("Dictionary has been saved: \'%s\'" % dictionary_file_path)
 
+    def save_compiled_dictionary(self, dictionary_file_path):
+        """
+        Saves or creates a dictionary file in the compiled format (see src/compiled.py).
+
+        :param dictionary_file_path: path to a dictionary file (could be non-existent).
+        """
+        if not self._dictionary:
+            _log.warning("Dictionary is empty, refusing save.")
+            return
+
+        compile_dictionary(self._dictionary, dictionary_file_path)
+
+    def load_dictionary(self, dictionary_file_path):
+        """
+        Loads a dictionary from a compiled or a json format file.
+
+        :param dictionary_file_path: path to a dictionary file.
+        """
+        if not os.path.exists(dictionary_file_path):
+            _log.error('Dictionary does not exists: \'%s\'' % dictionary_file_path)
+            return
+
+        if is_compiled_dictionary(dictionary_file_path):
+            self.load_compiled_dictionary(dictionary_file_path)
+        else:
+            self.load_dictionary_from_json(dictionary_file_path)
+
+    def set_dictionary(self, dictionary):
+        """
+        Uses a mapping of words to their likelihood as the dictionary (e.g. a LayeredDictionary over the dictionary
+        of another Linguist) and builds the indexes of it. The mapping is modified by training and deleting words.
+
+        :param dictionary: mapping of lowercase words to their likelihood.
+        """
+        self._dictionary = dictionary
+        self._buckets = None
+        self._drop_fingerprint()
+        self._base_digest = None
+        self._build_index()
+
+    def layer_over(self, linguist):
+        """
+        Uses an empty layer over the dictionary of another Linguist (e.g. a published snapshot) as the dictionary,
+        like set_dictionary(LayeredDictionary(linguist.get_dictionary())) but without building the indexes again:
+        the other Linguist's indexes are shared and the words of the layer are indexed separately (see LayeredIndex).
+        The other Linguist is never modified by this one, it must not be modified while this one is used.
+
+        :param linguist: Linguist with the same engine and maximum distance.
+        """
+        self._check_can_share_indexes(linguist)
+
+        self._share_dictionary(linguist, LayeredDictionary(linguist._dictionary))
+        if linguist._index is not None:
+            self._index = LayeredIndex(linguist._index, self._create_index())
+
+    def copy_layer(self, linguist):
+        """
+        Uses a copy of the top layer of another Linguist's dictionary as the dictionary (see LayeredDictionary.copy()),
+        e.g. to change a layered snapshot without stacking a new layer over it. Like layer_over(), the indexes
+        of the dictionary under the layer are shared: only the words of the layer are indexed again.
+        The other Linguist is never modified by this one, it must not be modified while this one is used.
+
+        :param linguist: Linguist with a LayeredDictionary, the same engine and maximum distance.
+        """
+        self._check_can_share_indexes(linguist)
+        if not isinstance(linguist._dictionary, LayeredDictionary):
+            raise ValueError("Only the layer of a LayeredDictionary can be copied")
+
+        self._share_dictionary(linguist, linguist._dictionary.copy())
+        if isinstance(linguist._index, LayeredIndex):
+            self._index = linguist._index.copy(self._create_index())
+        elif linguist._index is not None:
+            self._index = LayeredIndex(linguist._index, self._create_index())
+
+    def _check_can_share_indexes(self, linguist):
+        if linguist._engine != self._engine or linguist._max_distance != self._max_distance:
+            raise ValueError("Linguist with engine '%s' and maximum distance %d can't be layered over "
+                             "engine '%s' and maximum distance %d" % (self._engine, self._max_distance,
+                                                                        linguist._engine, linguist._max_distance))
+
+    def _share_dictionary(self, linguist, dictionary):
+        """
+        :param dictionary: LayeredDictionary with the same words as the dictionary of the other Linguist.
+        """
+        self._dictionary = dictionary
+        self._buckets = None
+        self._drop_fingerprint()
+        # The layers are hashed one by one over the digest of the shared dictionary.
+        self._base_digest = linguist._base_digest
+        self._membership = linguist._membership.copy()
+        self._membership.switch(self._dictionary)
+
+    def load_compiled_dictionary(self, dictionary_file_path):
+        """
+        Opens a compiled dictionary file. The file is memory-mapped instead of being read into memory,
+        it is copied only if the dictionary is modified.
+
+        :param dictionary_file_path: path to a compiled dictionary file.
+        """
+        try:
+            with self._statistics.phase('dictionary_load'):
+                self._dictionary = CompiledDictionary(dictionary_file_path)
+        except (ValueError, IOError, EnvironmentError):
+            _log.error("Given path is not a compiled dictionary: \'%s\'" % dictionary_file_path)
+            return
+
+        self._buckets = None
+        self._drop_fingerprint()
+        self._base_digest = None
+        self._build_index()
+
+        _log.info("Compiled dictionary has been opened: \'%s\'" % dictionary_file_path)
+
     def load_dictionary_from_json(self, dictionary_file_path):
         """
-        Loads a dictionary from a json format file.
+        Loads a dictionary from a json format file and replays the changes of its journal (see src/journal.py).
 
         :param dictionary_file_path: path to a dictionary file.
         """
@@ -102,14 +579,48 @@ class Linguist(object):
             return
 
         try:
-            with open(dictionary_file_path, 'r') as f:
+            with self._statistics.phase('dictionary_load'), open(dictionary_file_path, 'r') as f:
                 self._dictionary = json.load(f)
         except (ValueError, IOError):
             _log.error("Given path is not a dictionary: \'%s\'" % dictionary_file_path)
             return
 
+        self._buckets = None
+        self._drop_fingerprint()
+        self._base_digest = None
+        self._replay_journal(dictionary_file_path)
+        self._build_index()
+
         _log.info("Dictionary has been loaded: \'%s\'" % dictionary_file_path)
 
+    def _replay_journal(self, dictionary_file_path):
+        """
+        Applies the changes recorded in the journal of a json dictionary file to the loaded dictionary.
+        The index is not updated, it is built after the replay.
+        """
+        changes = DictionaryJournal(dictionary_file_path).read()
+        if not changes:
+            return
+
+        index, self._index = self._index, None
+        for operation, words in changes:
+            if operation == 'add':
+                self.train_dictionary_counts(words)
+            else:
+                for word in words:
+                    self._remove_word(word)
+        self._index = index
+
+        _log.info("%d change(s) of the journal have been replayed: \'%s\'" % (len(changes), dictionary_file_path))
+
+    def _build_index(self):
+        with self._statistics.phase('index_build'):
+            self._membership.build(self._dictionary)
+            if self._index is not None:
+                # A LayeredIndex (see layer_over()) is replaced by an index of the whole dictionary.
+                self._index = self._create_index()
+                self._index.build(self._dictionary)
+
     def not_known(self, word_set):
         """
         Checks a set of words if they are known by the dictionary.
@@ -123,49 +634,339 @@ class Linguist(object):
             _log.info("There is no known word because the given word set is empty.")
             return set()
 
-        return word_set.difference(set(self._dictionary))
+        return self._membership.not_known(word_set)
+
+    def not_known_many(self, word_sets):
+        """
+        Checks the word sets of many texts (e.g. files) at once, every distinct word is looked up only once.
+
+        :param word_sets: list of word sets.
+        :return: list of sets of the words which are not known from the dictionary, in the order of word_sets.
+        """
+        word_sets = [set(word.lower() for word in word_set) for word_set in word_sets]
+        unknown_words = self._membership.not_known(set().union(*word_sets))
+        return [word_set.intersection(unknown_words) for word_set in word_sets]
 
     def correct(self, word):
         """
-        Implements the algorithm which will correct a word if it is not in the dictionary
-        and returns a word that is maximum 2 characters away from an already known one.
-        The algorithm was found here (although small changes have been made):
-        http://www.learntosolveit.com/python/algorithm_spelling.html
-        There is no known use-cases where the 'edits1()', 'known_edits2()' and 'known()' functions will be used
-        elsewhere thus they should be nested functions.
+        Corrects a word if it is not in the dictionary (see _correct()).
+        If the Linguist has a suggestion cache, the suggestion is looked up there first. The cache is keyed by
+        the version of the dictionary (see _get_suggestion_stamp()): training or deleting words makes the old
+        suggestions unreachable.
 
         :param word: The word which will be corrected if possible.
         :return:
           * The most likely word from the dictionary which is maximum 2 characters away from the word if it is unknown.
           * None otherwise.
         """
-        def edits1(w):
-            alphabet = "abcdefghijklmnopqrstuvwxyz"
-
-            splits = [(w[:i], w[i:]) for i in range(len(w) + 1)]
-            deletes = [a + b[1:] for a, b in splits if b]
-            transposes = [a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1]
-            replaces = [a + c + b[1:] for a, b in splits for c in alphabet if b]
-            inserts = [a + c + b for a, b in splits for c in alphabet]
-            return set(deletes + transposes + replaces + inserts)
-
-        def known_edits2(w):
-            return set(e2 for e1 in edits1(w) for e2 in edits1(e1) if e2 in self._dictionary)
-
-        def known(word_list):
-            return set(w for w in word_list if w in self._dictionary)
-
-        candidates = known([word]) or known(edits1(word)) or known_edits2(word) or [word]
-        suggestion = max(candidates, key=self._dictionary.get)
-
-        if suggestion is word:
-            """
-            At this point the word could be:
-            * known by the dictionary.
-            * not known but there are no suggestions available.
-            In these cases no additional information would be got by returning the word.
-            Return None instead.
-            """
-            return None
+        if self._suggestion_cache is None:
+            return self._correct(word)[0]
+
+        stamp = self._get_suggestion_stamp()
+        suggestion = self._suggestion_cache.get(word, stamp)
+        if suggestion is MISSING:
+            suggestion, tier = self._correct(word)
+            if tier != 'time_limit':
+                self._suggestion_cache.put(word, stamp, suggestion)
 
         return suggestion
+
+    def _correct(self, word, file_deadline=None):
+        """
+        Corrects a word (see _suggest()) within its limits. The correction is recorded if the Linguist has statistics.
+
+        :param word: The word which will be corrected if possible.
+        :param file_deadline: time the corrections of the word's file must be finished by (optional).
+        :return: (suggestion, tier) tuple (see _suggest()).
+        """
+        deadline = self._limits.get_word_deadline(file_deadline)
+
+        if not self._statistics.enabled:
+            suggestion, tier, _ = self._suggest(word, deadline)
+        else:
+            start = time.time()
+            suggestion, tier, candidate_counts = self._suggest(word, deadline)
+            self._statistics.record_correction(word, tier, candidate_counts, time.time() - start)
+
+        if tier == 'time_limit':
+            with self._lock:
+                self._time_limit_count += 1
+        return suggestion, tier
+
+    def _get_tier(self, word, suggestion):
+        """
+        :return: the tier of a suggestion: 'known', 'distance1', 'distance2', ... or 'none'.
+        """
+        if suggestion is not None:
+            return 'distance%d' % damerau_levenshtein_distance(word, suggestion)
+        return 'known' if word in self._dictionary else 'none'
+
+    def _suggest(self, word, deadline=None):
+        """
+        Implements the algorithm which will correct a word if it is not in the dictionary
+        and returns a word that is maximum 2 (or max_distance) characters away from an already known one.
+        The algorithm was found here (although small changes have been made):
+        http://www.learntosolveit.com/python/algorithm_spelling.html
+        The candidates are searched tier by tier (see _iter_candidate_tiers()), the first tier with a known word
+        settles the suggestion. Other engines only change how the candidates are found: the suggestion is the same.
+        The farther tiers are given up if the word exceeds the limits of the Linguist (see CorrectionLimits).
+
+        :param word: The word which will be corrected if possible.
+        :param deadline: time (see time.time()) the correction must be finished by (optional).
+        :return: (suggestion, tier, candidate counts) tuple:
+          * suggestion: the most likely word from the dictionary which is maximum 2 characters away from the word
+            if it is unknown, None otherwise.
+          * tier: 'known', 'distance1', 'distance2', ... or 'none'. If a limit prevented the suggestion:
+            'length_limit', 'candidate_limit' or 'time_limit'.
+          * candidate counts: dictionary which maps the searched tiers ('distance1', 'distance2', ...) to the number
+            of strings generated by the 'edits' engine or the number of close words found by the others.
+        """
+        if word in self._dictionary:
+            return None, 'known', {}
+
+        max_distance = self._limits.get_max_distance(word, self._max_distance)
+        limit_tier = 'length_limit' if max_distance < self._max_distance else 'none'
+        if deadline is not None and max_distance > 1 and time.time() > deadline:
+            # The budget is spent (e.g. by the other words of the file): only the closest candidates are searched.
+            max_distance, limit_tier = 1, 'time_limit'
+
+        candidate_counts = {}
+        try:
+            for distance, candidates, generated in self._iter_candidate_tiers(word, max_distance, deadline):
+                candidate_counts['distance%d' % distance] = generated
+                if candidates:
+                    return self._most_likely(candidates), 'distance%d' % distance, candidate_counts
+        except _LimitExceeded as e:
+            limit_tier = e.tier
+            candidate_counts['distance%d' % e.distance] = e.candidate_count
+
+        if limit_tier != 'none':
+            self._log.debug("No suggestion has been made within the limits (%s) for word: \'%s\'" % (limit_tier, word))
+        return None, limit_tier, candidate_counts
+
+    def _iter_candidate_tiers(self, word, max_distance, deadline=None):
+        """
+        Finds the known words close to an unknown word tier by tier, with growing distance.
+        A tier is searched only when the previous one has been consumed, thus the caller can stop early.
+          * 'edits' engine: the edited strings are generated lazily and looked up as soon as they are made,
+            the 2nd tier edits the 1st tier's strings again. The 2nd tier raises _LimitExceeded if it would generate
+            more candidates than the limit or it runs out of time.
+          * other engines: the 1st tier is the index's closest words, the rest are found by one more lookup.
+            The lookups raise _LimitExceeded when they run out of time, but the words 1 edit away are always searched.
+
+        :param word: an unknown word.
+        :param max_distance: maximum distance of the found words.
+        :param deadline: time (see time.time()) the search must be finished by (optional).
+        :return: generator of (distance, set of known words, number of generated or found candidates) tuples.
+        """
+        if self._index is not None:
+            # Distance of the first tier which hasn't been searched yet.
+            searched_distance = 1
+            try:
+                if deadline is None:
+                    closest = self._index.lookup(word, max_distance)
+                else:
+                    # The candidates 1 edit away are searched without the deadline, the farther ones with it.
+                    closest = self._index.lookup(word, 1)
+                    if not closest and max_distance > 1:
+                        closest = self._index.lookup(word, max_distance, deadline)
+                if not closest:
+                    return
+
+                closest_distance = damerau_levenshtein_distance(word, next(iter(closest)))
+                searched_distance = closest_distance + 1
+                yield closest_distance, closest, len(closest)
+
+                tiers = collections.defaultdict(set)
+                for candidate, distance in self._index.lookup_within(word, max_distance, deadline).items():
+                    if distance > closest_distance:
+                        tiers[distance].add(candidate)
+                for distance in sorted(tiers):
+                    yield distance, tiers[distance], len(tiers[distance])
+            except DeadlineExceeded:
+                raise _LimitExceeded('time_limit', max(2, searched_distance), 0)
+            return
+
+        dictionary = self._dictionary
+        containers = dictionary.get_word_containers() if isinstance(dictionary, LayeredDictionary) else [dictionary]
+        first_count = _count_edits1(len(word))
+        yield 1, _find_known(_iter_edits1(word), dictionary, containers), first_count
+
+        if max_distance > 1:
+            max_candidates = self._limits.get_max_candidates()
+            found = set()
+            generated = 0
+            for e1 in _iter_edits1(word):
+                if deadline is not None and time.time() > deadline:
+                    raise _LimitExceeded('time_limit', 2, generated)
+                if max_candidates is not None and first_count + generated + _count_edits1(len(e1)) > max_candidates:
+                    raise _LimitExceeded('candidate_limit', 2, generated)
+
+                generated += _count_edits1(len(e1))
+                found.update(_find_known(_iter_edits1(e1), dictionary, containers))
+            yield 2, found, generated
+
+    def suggest(self, word, k=3):
+        """
+        Finds the k best suggestions for a word. The tiers of candidates are searched only until
+        k suggestions are found. The first suggestion is the same as the one made by correct().
+
+        :param word: the word which will be corrected if possible.
+        :param k: maximum number of suggestions.
+        :return: list of maximum k (suggestion, distance, likelihood) tuples ordered by the distance, then by
+        the likelihood (most likely first) and then alphabetically. Empty if the word is known or there is no
+        known word close enough. The farther tiers are given up if the word exceeds the limits of the Linguist.
+        """
+        if k < 1 or word in self._dictionary:
+            return []
+
+        distances = {}
+        tiers = self._iter_candidate_tiers(word, self._limits.get_max_distance(word, self._max_distance),
+                                           self._limits.get_word_deadline())
+        try:
+            for distance, candidates, _ in tiers:
+                for candidate in candidates:
+                    distances.setdefault(candidate, distance)
+                if len(distances) >= k:
+                    break
+        except _LimitExceeded:
+            pass
+
+        suggestions = sorted((candidate, distance, self._dictionary.get(candidate, 0))
+                             for candidate, distance in distances.items())
+        suggestions.sort(key=lambda suggestion: (suggestion[1], -suggestion[2]))
+        return suggestions[:k]
+
+    def complete(self, prefix):
+        """
+        Finds the known words which start with a prefix.
+
+        :param prefix: beginning of the words.
+        :return: alphabetically sorted list of known words starting with the prefix.
+        """
+        prefix = prefix.lower()
+
+        if isinstance(self._index, TrieIndex):
+            return list(self._index.words_with_prefix(prefix))
+
+        return sorted(word for word in self._dictionary if word.startswith(prefix))
+
+    def correct_many(self, word_list):
+        """
+        Corrects many words at once. The suggestions are the same as the ones made by correct().
+        If NumPy is available and the 'edits' engine is used, the words without a candidate 1 edit away are compared
+        to the dictionary words with array operations in batches (see LengthBucketIndex). Otherwise correct() is called for every word:
+        the other engines' precomputed indexes are faster one by one, and the limits of the Linguist are kept
+        word by word in the order of word_list. The words share the time budget of a file (see CorrectionLimits),
+        thus the most important words should be the first ones.
+
+        :param word_list: the words which will be corrected if possible.
+        :return: dictionary which maps every word to its suggestion (None if there is no suggestion).
+        """
+        # Duplicates are dropped, the order of the words is kept.
+        words = list(collections.OrderedDict.fromkeys(word_list))
+
+        if self._suggestion_cache is None:
+            return self._correct_many(words)[0]
+
+        stamp = self._get_suggestion_stamp()
+        result_map = {}
+        for word in words:
+            suggestion = self._suggestion_cache.get(word, stamp)
+            if suggestion is not MISSING:
+                result_map[word] = suggestion
+
+        corrected_map, time_limited_words = self._correct_many([word for word in words if word not in result_map])
+        for word, suggestion in corrected_map.items():
+            if word not in time_limited_words:
+                self._suggestion_cache.put(word, stamp, suggestion)
+            result_map[word] = suggestion
+
+        return result_map
+
+    def _correct_many(self, words):
+        """
+        :param words: list of distinct words which will be corrected if possible.
+        :return: (result map, time limited words) tuple:
+          * result map: dictionary which maps every word to its suggestion (None if there is no suggestion).
+          * time limited words: set of the words whose correction has been cut short by a time budget.
+        """
+        if not words:
+            return {}, set()
+
+        if not HAS_NUMPY or self._index is not None or self._limits.is_enabled():
+            file_deadline = self._limits.get_file_deadline()
+            result_map = {}
+            time_limited_words = set()
+            for word in words:
+                result_map[word], tier = self._correct(word, file_deadline)
+                if tier == 'time_limit':
+                    time_limited_words.add(word)
+            return result_map, time_limited_words
+
+        dictionary = self._dictionary
+        containers = dictionary.get_word_containers() if isinstance(dictionary, LayeredDictionary) else [dictionary]
+        result_map = {}
+        batch = []
+        for word in words:
+            try:
+                word.encode('ascii')
+            except (UnicodeEncodeError, UnicodeDecodeError):
+                result_map[word] = self._correct(word)[0]
+                continue
+
+            if word in dictionary:
+                result_map[word] = None
+                continue
+
+            # Most typos are 1 edit away: their candidates are cheaper to generate than to batch.
+            start = time.time()
+            candidates = _find_known(_iter_edits1(word), dictionary, containers)
+            if candidates:
+                result_map[word] = self._most_likely(candidates)
+                if self._statistics.enabled:
+                    self._statistics.record_correction(word, 'distance1', {'distance1': _count_edits1(len(word))},
+                                                       time.time() - start)
+            elif self._max_distance > 1:
+                batch.append(word)
+            else:
+                result_map[word] = None
+                if self._statistics.enabled:
+                    self._statistics.record_correction(word, 'none', {'distance1': _count_edits1(len(word))},
+                                                       time.time() - start)
+
+        if not batch:
+            return result_map, set()
+
+        with self._lock:
+            if self._buckets is None:
+                buckets = LengthBucketIndex(self._max_distance)
+                with self._statistics.phase('index_build'):
+                    buckets.build(dictionary)
+                self._buckets = buckets
+            buckets = self._buckets
+
+        start = time.time()
+        candidates_map = buckets.lookup_many(batch)
+        for word, candidates in candidates_map.items():
+            result_map[word] = self._most_likely(candidates) if candidates else None
+
+        if self._statistics.enabled:
+            # The words are corrected together, every one of them is recorded with the average time.
+            # The batch finds the words of the farther tiers (there are only 2 tiers for the 'edits' engine).
+            seconds = (time.time() - start) / len(batch)
+            for word in batch:
+                self._statistics.record_correction(word, self._get_tier(word, result_map[word]),
+                                                   {'distance1': _count_edits1(len(word)),
+                                                    'distance%d' % self._max_distance: len(candidates_map[word])},
+                                                   seconds)
+
+        return result_map, set()
+
+    def _most_likely(self, candidates):
+        """
+        :param candidates: words to choose from.
+        :return: the most frequent candidate. Ties are broken alphabetically, so every engine makes
+        the same suggestion regardless of the order the candidates were found in.
+        """
+        return min(candidates, key=lambda w: (-self._dictionary.get(w, 0), w))
@@ -0,0 +1,206 @@
+"""
+This file contains the implementation of the MembershipIndex and the BloomFilter classes.
+Use the MembershipIndex to decide which words of a text are not in a dictionary
+without copying or searching the whole dictionary for every text.
+"""
+
+import hashlib
+import logging
+import math
+import struct
+import threading
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+_HASHES = struct.Struct('<QQ')
+
+# Maximum number of remembered answers, they are forgotten when there are more (e.g. in a long running server).
+MAX_REMEMBERED_WORDS = 100000
+
+
+def _to_bytes(word):
+    return word if isinstance(word, bytes) else word.encode('utf-8')
+
+
+class BloomFilter(object):
+    """
+    Probabilistic set of words: a word which was added is always found, a word which was not added is
+    found with maximum error_rate probability (if no more than capacity words are added).
+    Words can't be removed.
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        """
+        :param capacity: expected number of words.
+        :param error_rate: probability of finding a word which was not added.
+        """
+        capacity = max(1, capacity)
+        bit_count = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+
+        self._bit_count = max(8, bit_count)
+        self._hash_count = max(1, int(round(float(self._bit_count) / capacity * math.log(2))))
+        self._bits = bytearray((self._bit_count + 7) // 8)
+
+    def copy(self):
+        """
+        :return: BloomFilter with the same words, the words added to either one are not added to the other.
+        """
+        bloom_filter = BloomFilter.__new__(BloomFilter)
+        bloom_filter._bit_count = self._bit_count
+        bloom_filter._hash_count = self._hash_count
+        bloom_filter._bits = bytearray(self._bits)
+        return bloom_filter
+
+    def _positions(self, word):
+        # Double hashing: the k positions are made of two independent 64 bit hashes.
+        first, second = _HASHES.unpack(hashlib.md5(_to_bytes(word)).digest())
+        return [(first + i * second) % self._bit_count for i in range(self._hash_count)]
+
+    def add(self, word):
+        for position in self._positions(word):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, word):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(word))
+
+
+class MembershipIndex(object):
+    """
+    Answers whether words are in a dictionary. It is built when a dictionary is loaded and updated
+    when words are trained or deleted, a query costs as much as the number of queried words.
+      * A dict dictionary is its own index.
+      * The answers of a dictionary with expensive lookups (e.g. a CompiledDictionary searched on disk)
+        are remembered, so every distinct word is searched only once. Maximum max_remembered_words answers
+        are remembered, all of them are forgotten when there would be more.
+      * The optional Bloom filter rejects most of the unknown words before they are searched.
+    The queries can be made by many threads at once, the changes of the dictionary must not overlap them.
+    """
+    def __init__(self, use_bloom_filter=False, error_rate=0.01, max_remembered_words=MAX_REMEMBERED_WORDS):
+        """
+        :param use_bloom_filter: build a Bloom filter of the dictionary words (it reads every word once).
+        :param error_rate: probability of the Bloom filter letting an unknown word through to the search.
+        :param max_remembered_words: maximum number of remembered answers.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._use_bloom_filter = use_bloom_filter
+        self._error_rate = error_rate
+        self._max_remembered_words = max_remembered_words
+
+        self._dictionary = {}
+        self._is_remembered = False
+        self._known_words = set()
+        self._unknown_words = set()
+        self._bloom_filter = None
+        # The Bloom filter of another index (see copy()), it is copied before a word is added to it.
+        self._is_bloom_filter_shared = False
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def copy(self):
+        """
+        :return: MembershipIndex of the same dictionary without the remembered answers. The Bloom filter is shared
+        until a word is added to either index, thus copying costs nothing.
+        """
+        membership = MembershipIndex(self._use_bloom_filter, self._error_rate, self._max_remembered_words)
+        membership._dictionary = self._dictionary
+        membership._is_remembered = self._is_remembered
+        membership._bloom_filter = self._bloom_filter
+        membership._is_bloom_filter_shared = self._is_bloom_filter_shared = self._bloom_filter is not None
+        return membership
+
+    def _add_to_bloom_filter(self, word):
+        if self._is_bloom_filter_shared:
+            self._bloom_filter = self._bloom_filter.copy()
+            self._is_bloom_filter_shared = False
+        self._bloom_filter.add(word)
+
+    def build(self, dictionary):
+        """
+        :param dictionary: mapping of the known words (a dict or a CompiledDictionary).
+        """
+        self._dictionary = dictionary
+        self._is_remembered = not isinstance(dictionary, dict)
+        self._known_words = set()
+        self._unknown_words = set()
+        self._bloom_filter = None
+        self._is_bloom_filter_shared = False
+
+        if self._use_bloom_filter:
+            self._bloom_filter = BloomFilter(len(dictionary), self._error_rate)
+            for word in dictionary:
+                self._bloom_filter.add(word)
+
+    def switch(self, dictionary, added_words=()):
+        """
+        Switches to a dictionary which differs from the current one only in a few words (e.g. a layer has been
+        put over it or dropped from it). The remembered answers are forgotten, the Bloom filter is kept:
+        the words which are not in the new dictionary only let more unknown words through to the search.
+
+        :param dictionary: the new dictionary.
+        :param added_words: words of the new dictionary which are not in the current one.
+        """
+        self._dictionary = dictionary
+        self._is_remembered = not isinstance(dictionary, dict)
+        self._known_words = set()
+        self._unknown_words = set()
+
+        if self._bloom_filter is not None:
+            for word in added_words:
+                self._add_to_bloom_filter(word)
+
+    def add(self, word):
+        """
+        Must be called when a word is added to the dictionary.
+        """
+        self._unknown_words.discard(word)
+        if self._is_remembered:
+            self._remember(word, True)
+        if self._bloom_filter is not None:
+            self._add_to_bloom_filter(word)
+
+    def remove(self, word):
+        """
+        Must be called when a word is deleted from the dictionary.
+        """
+        self._known_words.discard(word)
+        if self._is_remembered:
+            self._remember(word, False)
+
+    def _remember(self, word, is_known):
+        with self._lock:
+            if len(self._known_words) + len(self._unknown_words) >= self._max_remembered_words:
+                # The dictionary has the answers too, forgetting them costs only the searches.
+                self._known_words = set()
+                self._unknown_words = set()
+            (self._known_words if is_known else self._unknown_words).add(word)
+
+    def _is_known(self, word):
+        if word in self._known_words:
+            return True
+        if word in self._unknown_words:
+            return False
+
+        is_known = (self._bloom_filter is None or word in self._bloom_filter) and word in self._dictionary
+        if self._is_remembered:
+            self._remember(word, is_known)
+        return is_known
+
+    def not_known(self, word_set):
+        """
+        :param word_set: set of lowercase words.
+        :return: set of the words which are not in the dictionary.
+        """
+        if not self._is_remembered and self._bloom_filter is None:
+            return set(word for word in word_set if word not in self._dictionary)
+
+        return set(word for word in word_set if not self._is_known(word))
@@ -0,0 +1,123 @@
+"""
+This file contains the implementation of the CorrectionPlanner class.
+Use this class to correct the unknown words of many files together,
+so a word which is misspelled in many files is corrected only once.
+"""
+
+import collections
+import logging
+
+from src.typofinder import Typofinder
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+
+class CorrectionPlanner(object):
+    """
+    Plans the corrections of a tree in two passes:
+      * the Typofinders of the files find their unknown words without correcting them (see Typofinder.find_typos()),
+        the planner counts the occurrences of every unknown word and collects the files it appears in.
+      * every distinct unknown word is corrected once, the most frequent ones first, and the suggestions
+        are given back to the Typofinders.
+    The correction work depends on the number of distinct unknown words instead of the number of files.
+    The results of the files which were taken from the cache keep their suggestions and their words are not corrected
+    again, the results of the other files are stored in the cache once they are corrected.
+    """
+    def __init__(self, linguist, cache=None):
+        """
+        :param linguist: the Linguist which corrects the words.
+        :param cache: ResultCache the Typofinders were given (optional).
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._linguist = linguist
+        self._cache = cache
+        self._typofinders = []
+        self._occurrences = collections.Counter()
+        # Maps an unknown word to the paths of the files it appears in.
+        self._file_paths = collections.defaultdict(list)
+        self._suggestions = {}
+
+    def add(self, typofinder):
+        """
+        :param typofinder: Typofinder of a file, with its typos found but not corrected.
+        """
+        file_path = typofinder.get_text_file_path()
+        for _, _, positions in typofinder.get_typo_positions():
+            for _, word in positions:
+                self._occurrences[word.lower()] += 1
+        is_cached, _ = typofinder.get_cache_state()
+        for word, suggestion in typofinder.get_result_map().items():
+            self._file_paths[word].append(file_path)
+            if is_cached:
+                self._suggestions[word] = suggestion
+
+        # Only the typos are kept: the lines of the file are read again if it is overwritten.
+        self._typofinders.append(Typofinder(self._linguist, file_path, typofinder.get_result_map(),
+                                            typofinder.get_typo_positions(),
+                                            cache_state=typofinder.get_cache_state()))
+
+    def get_unknown_words(self):
+        """
+        :return: list of the distinct unknown words, the most frequent first (ties in alphabetical order).
+        """
+        return sorted(self._file_paths, key=lambda word: (-self._occurrences[word], word))
+
+    def correct(self):
+        """
+        Corrects every distinct unknown word once (except the ones with a cached suggestion), gives the suggestions
+        to the Typofinders and stores their results in the cache.
+
+        :return: list of the Typofinders in the order they were added.
+        """
+        unknown_words = [word for word in self.get_unknown_words() if word not in self._suggestions]
+        _log.info("%d distinct unknown word(s) of %d file(s) will be corrected."
+                  % (len(unknown_words), len(self._typofinders)))
+
+        time_limit_count = self._linguist.get_time_limit_count()
+        with self._linguist.get_statistics().phase('correction'):
+            self._suggestions.update(self._linguist.correct_many(unknown_words))
+        time_limit_count = self._linguist.get_time_limit_count() - time_limit_count
+
+        if time_limit_count:
+            _log.info("Correction of %d word(s) has been cut short by the time budget, the results are not cached."
+                      % time_limit_count)
+
+        for typofinder in self._typofinders:
+            is_cached, _ = typofinder.get_cache_state()
+            if is_cached:
+                continue
+            typofinder.set_suggestions(self._suggestions)
+            if self._cache is not None and not time_limit_count:
+                typofinder.store_results(self._cache)
+
+        return self._typofinders
+
+    def get_top_unknown_words(self, count=10):
+        """
+        :param count: maximum number of words.
+        :return: list of (word, occurrences, file paths, suggestion) tuples of the most frequent unknown words.
+        """
+        return [(word, self._occurrences[word], self._file_paths[word], self._suggestions.get(word))
+                for word in self.get_unknown_words()[:count]]
+
+    def print_summary(self, stream, count=10):
+        """
+        Prints the most frequent unknown words of the tree in a table format.
+
+        :param stream: file object to print to.
+        :param count: maximum number of words.
+        """
+        top_unknown_words = self.get_top_unknown_words(count)
+        if not top_unknown_words:
+            return
+
+        lines = ["", "+" * 72,
+                 "{0:33} {1:>8} {2:>6}  {3:>21}".format("Top unknown word", "Count", "Files", "Suggestion"),
+                 "-" * 72]
+        for word, occurrences, file_paths, suggestion in top_unknown_words:
+            lines.append("{0:33} {1:>8} {2:>6}  {3:>21}".format(word, occurrences, len(file_paths), suggestion or ''))
+        lines.append("+" * 72)
+        stream.write("\n".join(lines) + "\n")
@@ -0,0 +1,64 @@
+"""
+This file contains the implementation of the PruningPolicy class.
+Use this class to decide which words of a trained dictionary are junk
+(e.g. one-off tokens, long hex strings) and should be removed from it.
+"""
+
+import logging
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+
+class PruningPolicy(object):
+    """
+    Rules of removing words from a dictionary. A word is pruned if it breaks any of them:
+      * min_count: its likelihood is lower than this.
+      * top_count: it is not among this many most likely words (ties are broken in alphabetical order).
+      * max_length: it is longer than this.
+    The protected words are never pruned, but they are counted in the most likely words.
+    The rules are turned off by None.
+    """
+    def __init__(self, min_count=None, top_count=None, max_length=None, protected_words=()):
+        self._min_count = min_count
+        self._top_count = top_count
+        self._max_length = max_length
+        self._protected_words = set(word.lower() for word in protected_words)
+
+    def is_enabled(self):
+        return any(rule is not None for rule in (self._min_count, self._top_count, self._max_length))
+
+    def get_description(self):
+        """
+        :return: text describing the rules, e.g. "count >= 2, length <= 30".
+        """
+        parts = []
+        if self._min_count is not None:
+            parts.append("count >= %d" % self._min_count)
+        if self._top_count is not None:
+            parts.append("top %d" % self._top_count)
+        if self._max_length is not None:
+            parts.append("length <= %d" % self._max_length)
+        if self._protected_words:
+            parts.append("%d protected word(s)" % len(self._protected_words))
+        return ", ".join(parts)
+
+    def get_pruned_words(self, dictionary):
+        """
+        :param dictionary: mapping of words to their likelihood.
+        :return: set of the words which are pruned from the dictionary.
+        """
+        pruned_words = set()
+
+        if self._min_count is not None or self._max_length is not None:
+            for word, count in dictionary.items():
+                if (self._min_count is not None and count < self._min_count) or \
+                        (self._max_length is not None and len(word) > self._max_length):
+                    pruned_words.add(word)
+
+        if self._top_count is not None and len(dictionary) > self._top_count:
+            ranked_words = sorted(dictionary.items(), key=lambda item: (-item[1], item[0]))
+            pruned_words.update(word for word, _ in ranked_words[self._top_count:])
+
+        return pruned_words.difference(self._protected_words)
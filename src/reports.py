@@ -0,0 +1,147 @@
+"""
+This file contains the machine-readable reports of the typo-finder (JSON Lines and SARIF).
+Use them to hand the typos to another program: the findings of a file are written
+and flushed as soon as the file has been checked.
+"""
+
+import json
+import logging
+import os
+
+try:
+    from urllib import pathname2url
+except ImportError:
+    from urllib.request import pathname2url
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+REPORT_FORMATS = ('jsonl', 'sarif')
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+SARIF_RULE_ID = 'typo'
+
+
+class JsonLinesReport(object):
+    """
+    Writes every typo as a JSON object in its own line:
+      {"column": 5, "file": "doc/a.txt", "line": 3, "suggestions": ["word"], "word": "wrod"}
+    The line and the column are 1-based, the suggestions are empty if there is none.
+    """
+    def __init__(self, stream, alternative_count=0):
+        """
+        :param stream: file object the report is written to (e.g. the standard output).
+        :param alternative_count: number of alternative suggestions after the suggestion of a typo.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._stream = stream
+        self._alternative_count = alternative_count
+
+    def begin(self):
+        """
+        Writes the beginning of the report, before any file is added.
+        """
+        pass
+
+    def add(self, file_path, findings):
+        """
+        Writes the typos of a file and flushes the stream.
+
+        :param file_path: path to the checked file.
+        :param findings: iterable of (line number, column, word, suggestions) tuples (see Typofinder.iter_findings()),
+        the column is 0-based.
+        """
+        for line_number, column, word, suggestions in findings:
+            self._stream.write(json.dumps({'file': file_path, 'line': line_number, 'column': column + 1,
+                                           'word': word, 'suggestions': suggestions}, sort_keys=True) + "\n")
+        self._stream.flush()
+
+    def add_typofinder(self, typofinder):
+        """
+        Writes the typos of a Typofinder whose typos have been found (see add()).
+        """
+        self.add(typofinder.get_text_file_path(), typofinder.iter_findings(self._alternative_count))
+
+    def end(self):
+        """
+        Writes the end of the report, after every file has been added.
+        """
+        pass
+
+
+class SarifReport(JsonLinesReport):
+    """
+    Writes the typos as the results of a SARIF 2.1.0 log with one run. The log is written in parts:
+    the results of a file are written when it is added, the closing brackets at the end.
+    """
+    def __init__(self, stream, alternative_count=0):
+        super(SarifReport, self).__init__(stream, alternative_count)
+        self._result_count = 0
+
+    def begin(self):
+        driver = {'name': 'typofinder',
+                  'informationUri': 'https://github.com/bencegobolos/typofinder-python',
+                  'rules': [{'id': SARIF_RULE_ID,
+                             'shortDescription': {'text': 'Unknown word'},
+                             'fullDescription': {'text': 'The word is not in the dictionary.'},
+                             'defaultConfiguration': {'level': 'warning'}}]}
+        header = json.dumps({'$schema': SARIF_SCHEMA, 'version': '2.1.0'}, sort_keys=True)
+        run_header = json.dumps({'tool': {'driver': driver}}, sort_keys=True)
+        # The results array is left open, the results are written into it as the files are added.
+        self._stream.write('%s, "runs": [%s, "results": [\n' % (header[:-1], run_header[:-1]))
+        self._stream.flush()
+
+    def add(self, file_path, findings):
+        uri = self.get_uri(file_path)
+        for line_number, column, word, suggestions in findings:
+            if suggestions:
+                text = "Unknown word '%s', did you mean '%s'?" % (word, "', '".join(suggestions))
+            else:
+                text = "Unknown word '%s'." % word
+
+            result = {'ruleId': SARIF_RULE_ID,
+                      'level': 'warning',
+                      'message': {'text': text},
+                      'locations': [{'physicalLocation': {
+                          'artifactLocation': {'uri': uri},
+                          'region': {'startLine': line_number, 'startColumn': column + 1,
+                                     'endColumn': column + 1 + len(word)}}}],
+                      'properties': {'word': word, 'suggestions': suggestions}}
+
+            self._stream.write("%s%s" % (",\n" if self._result_count else "", json.dumps(result, sort_keys=True)))
+            self._result_count += 1
+        self._stream.flush()
+
+    def end(self):
+        self._stream.write("\n]}]}\n")
+        self._stream.flush()
+
+    @staticmethod
+    def get_uri(file_path):
+        """
+        :param file_path: path to a checked file.
+        :return: the URI of the file relative to the current directory if it is under it,
+        otherwise the absolute file:// URI of the file.
+        """
+        if file_path == '<stdin>':
+            return 'stdin'
+
+        absolute_path = os.path.abspath(file_path)
+        relative_path = os.path.relpath(absolute_path)
+        if relative_path != os.pardir and not relative_path.startswith(os.pardir + os.sep):
+            return pathname2url(relative_path)
+        return 'file://' + pathname2url(absolute_path)
+
+
+def create_report(report_format, stream, alternative_count=0):
+    """
+    :param report_format: one of REPORT_FORMATS.
+    :param stream: file object the report is written to.
+    :param alternative_count: number of alternative suggestions after the suggestion of a typo.
+    :return: JsonLinesReport or SarifReport.
+    """
+    if report_format == 'sarif':
+        return SarifReport(stream, alternative_count)
+    return JsonLinesReport(stream, alternative_count)
@@ -0,0 +1,281 @@
+"""
+This file contains the implementation of the TypofinderServer and the TypofinderClient classes.
+Use the server to keep a Linguist with its dictionary and indexes loaded between checks,
+and the client to check files with it over a Unix domain socket.
+
+Protocol: the client sends one json request per line and the server answers every request
+with one json response per line, in the same order, on the same connection.
+  * {"command": "status"}
+    ==> {"configuration": {...}, "fingerprint": "..."}
+  * {"command": "check", "name": "<file name>", "text": "<content>", "encoding": "utf-8", "lines": [<line number>, ...],
+     "layers": ["<dictionary file>", ...], "ignore": ["<word>", ...]}
+    ==> {"result_map": {"<word>": "<suggestion>" or null, ...}, "typo_positions": [[<line number>, [[<column>, "<word>"], ...]], ...]}
+    The text is encoded with the given encoding ('utf-8' by default) before it is checked, the columns are
+    indexes of the encoded text. Only the given lines are checked if "lines" is not null (every line by default).
+    The dictionary files of "layers" (e.g. project dictionaries) and the words of "ignore" are put over the server's
+    dictionary as layers for this check only.
+  * {"command": "correct", "words": ["<word>", ...]}
+    ==> {"suggestions": {"<word>": "<suggestion>" or null, ...}}
+  * {"command": "suggest", "word": "<word>", "k": 3}
+    ==> {"suggestions": [["<suggestion>", <distance>, <likelihood>], ...]}
+A request which can't be answered gets {"error": "<message>"}.
+"""
+
+import errno
+import json
+import logging
+import os
+import socket
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from src.typofinder import Typofinder
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the requests of a connection until the client closes it.
+    """
+    def handle(self):
+        for line in iter(self.rfile.readline, b''):
+            try:
+                response = self.server.typofinder_server.respond(json.loads(line.decode('utf-8')))
+            except ValueError as e:
+                response = {'error': "Invalid request: %s" % e}
+
+            self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+            self.wfile.flush()
+
+
+class _ThreadingUnixStreamServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Every connection is answered in its own thread, they don't keep the server running at shutdown.
+    daemon_threads = True
+
+
+class TypofinderServer(object):
+    """
+    Serves the requests of many clients at once with the snapshots of a ReloadingLinguist over a Unix domain socket.
+    Every request takes the current snapshot, a reloaded dictionary is used from the next request on.
+    The snapshots are never modified, so the requests are answered in parallel: a check with dictionary layers
+    or ignored words puts them over a private Linguist of its own (see ReloadingLinguist.create_private_linguist()).
+    """
+    def __init__(self, linguist, socket_path, configuration=None, cache=None):
+        """
+        :param linguist: ReloadingLinguist with the loaded dictionary.
+        :param socket_path: path to the socket file (must be non-existent or a socket without a server).
+        :param configuration: dictionary describing the Linguist (e.g. the dictionary file and the engine),
+        the clients compare it to their own to decide if the server checks files the same way.
+        :param cache: ResultCache of the linguist (optional). It is used with the fingerprint of the Linguist
+        which checks the file.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._linguist = linguist
+        self._socket_path = socket_path
+        self._configuration = configuration or {}
+        self._cache = cache
+        self._server = None
+
+    def respond(self, request):
+        """
+        :param request: the decoded json request.
+        :return: the response, which can be encoded to json.
+        """
+        if not isinstance(request, dict):
+            return {'error': "Request must be a json object."}
+
+        command = request.get('command')
+        try:
+            if command == 'status':
+                return {'configuration': self._configuration,
+                        'fingerprint': self._linguist.get_linguist().get_fingerprint()}
+            elif command == 'check':
+                return self._check(request.get('name', '<request>'),
+                                   request['text'].encode(request.get('encoding', 'utf-8')),
+                                   request.get('lines'), request.get('layers') or [], request.get('ignore') or [])
+            elif command == 'correct':
+                return {'suggestions': self._linguist.get_linguist().correct_many([word.lower()
+                                                                                   for word in request['words']])}
+            elif command == 'suggest':
+                return {'suggestions': self._linguist.get_linguist().suggest(request['word'].lower(),
+                                                                             int(request.get('k', 3)))}
+        except (KeyError, TypeError, ValueError, AttributeError, LookupError, UnicodeError) as e:
+            return {'error': "Invalid \'%s\' request: %s" % (command, e)}
+
+        return {'error': "Unknown command: \'%s\'" % command}
+
+    def _check(self, name, content, line_numbers=None, layer_file_paths=(), ignored_words=()):
+        if line_numbers is not None:
+            line_numbers = sorted(int(line_number) for line_number in line_numbers)
+
+        if layer_file_paths or ignored_words:
+            # The layers are put over a private Linguist, it is dropped with them after the check.
+            linguist = self._linguist.create_private_linguist()
+            for layer_file_path in layer_file_paths:
+                if not linguist.load_layer(layer_file_path):
+                    return {'error': "Dictionary layer couldn't be loaded: \'%s\'" % layer_file_path}
+            if ignored_words:
+                linguist.push_layer()
+                linguist.train_dictionary(ignored_words)
+        else:
+            linguist = self._linguist.get_linguist()
+
+        cache = self._cache
+        if cache is not None:
+            cache = cache.with_fingerprint(linguist.get_fingerprint())
+
+        typofinder = Typofinder(linguist, name, cache=cache, line_numbers=line_numbers)
+        typofinder.find_typos_in_content(content)
+
+        return {'result_map': typofinder.get_result_map(),
+                'typo_positions': [(line_number, positions)
+                                   for line_number, _, positions in typofinder.get_typo_positions()]}
+
+    def _remove_stale_socket(self):
+        """
+        :return: False if another server is listening on the socket, True otherwise.
+        """
+        if not os.path.exists(self._socket_path):
+            return True
+
+        client = TypofinderClient(self._socket_path)
+        if client.connect():
+            client.close()
+            return False
+
+        os.remove(self._socket_path)
+        return True
+
+    def serve_forever(self):
+        """
+        Serves the clients until the process is interrupted. The socket file is removed at the end.
+
+        :return: False if the server couldn't be started, True otherwise.
+        """
+        if not self._remove_stale_socket():
+            _log.error("Another server is already running on socket: \'%s\'" % self._socket_path)
+            return False
+
+        self._server = _ThreadingUnixStreamServer(self._socket_path, _RequestHandler)
+        self._server.typofinder_server = self
+        _log.info("Server is listening on socket: \'%s\'" % self._socket_path)
+
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            _log.info("Server has been interrupted.")
+        finally:
+            self._server.server_close()
+            os.remove(self._socket_path)
+
+        return True
+
+    def shutdown(self):
+        """
+        Stops serve_forever() from another thread.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class TypofinderClient(object):
+    """
+    Sends requests to a TypofinderServer over one connection.
+    """
+    def __init__(self, socket_path, timeout=60):
+        """
+        :param socket_path: path to the socket file of the server.
+        :param timeout: seconds to wait for a response.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._socket_path = socket_path
+        self._timeout = timeout
+        self._socket = None
+        self._file = None
+        self._layer_file_paths = []
+        self._ignored_words = []
+
+    def set_layers(self, layer_file_paths=None, ignored_words=None):
+        """
+        Sets the dictionary layers of the checks (see TypofinderServer).
+
+        :param layer_file_paths: paths to dictionary files (e.g. project dictionaries), they must be readable
+        by the server.
+        :param ignored_words: words which are not typos.
+        """
+        self._layer_file_paths = [os.path.realpath(path) for path in layer_file_paths or []]
+        self._ignored_words = list(ignored_words or [])
+
+    def connect(self):
+        """
+        :return: True if a server is listening on the socket, False otherwise.
+        """
+        client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client_socket.settimeout(self._timeout)
+        try:
+            client_socket.connect(self._socket_path)
+        except socket.error as e:
+            client_socket.close()
+            if e.errno not in (errno.ENOENT, errno.ECONNREFUSED):
+                _log.warning("Server is not available on socket \'%s\': %s" % (self._socket_path, e))
+            return False
+
+        self._socket = client_socket
+        self._file = client_socket.makefile('rwb')
+        return True
+
+    def close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+            self._socket = None
+            self._file = None
+
+    def request(self, request):
+        """
+        :param request: json object of the request (see the protocol above).
+        :return: the decoded response, or None if the connection was lost.
+        """
+        try:
+            self._file.write((json.dumps(request) + "\n").encode('utf-8'))
+            self._file.flush()
+            line = self._file.readline()
+        except socket.error as e:
+            _log.error("Connection to the server has been lost: %s" % e)
+            return None
+
+        if not line:
+            _log.error("Connection to the server has been closed.")
+            return None
+
+        return json.loads(line.decode('utf-8'))
+
+    def check(self, name, content, line_numbers=None):
+        """
+        :param name: name of the checked file.
+        :param content: the text of the file (bytes).
+        :param line_numbers: list of the checked lines' numbers, every line by default.
+        :return: (result map, typo positions without the lines) tuple of the file, or None if the check failed.
+        """
+        # Latin-1 maps every byte to a character, the server gets back the exact bytes of the file.
+        response = self.request({'command': 'check', 'name': name, 'text': content.decode('latin-1'),
+                                 'encoding': 'latin-1', 'lines': line_numbers,
+                                 'layers': self._layer_file_paths, 'ignore': self._ignored_words})
+        if response is None:
+            return None
+        if 'error' in response:
+            _log.error("Server couldn't check file \'%s\': %s" % (name, response['error']))
+            return None
+
+        result_map = dict((str(word), suggestion) for word, suggestion in response['result_map'].items())
+        typo_positions = [(line_number, [(column, str(word)) for column, word in positions])
+                          for line_number, positions in response['typo_positions']]
+        return result_map, typo_positions
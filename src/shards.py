@@ -0,0 +1,222 @@
+"""
+This file contains the helpers of checking a tree on many machines.
+Use partition_files() to split the files into shards, PartialReport to save the results
+of a shard and merge_partial_results() to put the results of the shards together.
+
+Layout of a partial result file (one json document per line):
+  * header: {"version": 1, "shard": [<shard number>, <shard count>]}
+  * files: {"path": "<path>", "relative_path": "<path relative to the input>",
+            "unknown_words": ["<word>", ...], "typo_positions": [[<line number>, "<line>", [[<column>, "<word>"], ...]], ...]}
+    Only the files with typos are saved, in the order of their relative paths.
+  * trailer: {"fingerprint": "<fingerprint of the Linguist>", "suggestions": {"<word>": "<suggestion>" or null, ...}}
+    The suggestion of a word is saved only once, even if it is misspelled in many files.
+The lines of the files are saved as latin-1 text, so any bytes are loaded back unchanged.
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+PARTIAL_RESULT_VERSION = 1
+
+# Opening and sniffing a file costs as much as checking this many bytes, so many small files are balanced too.
+FILE_COST = 4096
+
+_SHARD = re.compile(r"^(\d+)/(\d+)$")
+
+
+def parse_shard(text):
+    """
+    :param text: shard in 'I/N' format, e.g. '2/4' is the second of four shards.
+    :return: (shard number, shard count) tuple, or None if the text is not a valid shard.
+    """
+    match = _SHARD.match(text)
+    if match is None:
+        return None
+
+    shard_number, shard_count = int(match.group(1)), int(match.group(2))
+    if not 1 <= shard_number <= shard_count:
+        return None
+    return shard_number, shard_count
+
+
+def partition_files(file_paths, root_path, shard_count):
+    """
+    Splits files into shards of about the same size. Every machine splits the same files the same way:
+    only the sizes of the files and their paths relative to root_path are used, the largest files are given
+    first to the smallest shard and the files of the same size are ordered by the hash of their path.
+
+    :param file_paths: iterable of paths to the files.
+    :param root_path: path to the checked directory.
+    :param shard_count: number of shards.
+    :return: list of shard_count lists of (relative path, path) tuples, sorted by their relative paths.
+    """
+    files = []
+    for file_path in file_paths:
+        relative_path = os.path.relpath(file_path, root_path)
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        files.append((-size, hashlib.sha1(relative_path).hexdigest(), relative_path, file_path))
+    files.sort()
+
+    shards = [[] for _ in range(shard_count)]
+    shard_sizes = [(0, shard_index) for shard_index in range(shard_count)]
+    for negative_size, _, relative_path, file_path in files:
+        shard_size, shard_index = heapq.heappop(shard_sizes)
+        shards[shard_index].append((relative_path, file_path))
+        heapq.heappush(shard_sizes, (shard_size - negative_size + FILE_COST, shard_index))
+
+    for shard in shards:
+        shard.sort()
+    return shards
+
+
+class PartialReport(object):
+    """
+    Writes the results of a shard into a partial result file (see the layout above) as the files are checked.
+    Only the suggestions are kept in memory until the end.
+    """
+    def __init__(self, stream, linguist, root_path, shard_number, shard_count):
+        """
+        :param stream: file object the partial result is written to (e.g. the standard output).
+        :param linguist: the Linguist which checks the files, its fingerprint is saved at the end.
+        :param root_path: path to the checked directory, the relative paths of the files are relative to it.
+        :param shard_number: number of the shard (from 1).
+        :param shard_count: number of shards.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._stream = stream
+        self._linguist = linguist
+        self._root_path = root_path
+        self._shard_number = shard_number
+        self._shard_count = shard_count
+        self._suggestions = {}
+
+    def begin(self):
+        self._write({'version': PARTIAL_RESULT_VERSION, 'shard': [self._shard_number, self._shard_count]})
+
+    def add_typofinder(self, typofinder):
+        """
+        Writes the typos of a Typofinder whose typos have been found. Files without typos are left out.
+        """
+        result_map = typofinder.get_result_map()
+        if not result_map:
+            return
+
+        self._suggestions.update(result_map)
+        file_path = typofinder.get_text_file_path()
+        self._write({'path': file_path,
+                     'relative_path': os.path.relpath(file_path, self._root_path),
+                     'unknown_words': sorted(result_map),
+                     'typo_positions': [(line_number, line.decode('latin-1'), positions)
+                                        for line_number, line, positions in typofinder.get_typo_positions()]})
+
+    def end(self):
+        self._write({'fingerprint': self._linguist.get_fingerprint(), 'suggestions': self._suggestions})
+
+    def _write(self, document):
+        self._stream.write(json.dumps(document, sort_keys=True) + "\n")
+        self._stream.flush()
+
+
+def _read_lines(partial_file_path):
+    """
+    :return: generator of the decoded json documents of a partial result file.
+    """
+    with open(partial_file_path) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _read_files(partial_file_path, shard_number):
+    """
+    :return: generator of (relative path, shard number, file document) tuples of a partial result file.
+    """
+    for document in _read_lines(partial_file_path):
+        if 'relative_path' in document:
+            yield document['relative_path'], shard_number, document
+
+
+def merge_partial_results(partial_file_paths):
+    """
+    Puts the partial result files of every shard together. The files are read twice: first their headers
+    and trailers are checked and their suggestions are merged, then their files are merged in the order
+    of the relative paths. Only the suggestions are kept in memory.
+
+    :param partial_file_paths: paths to the partial result files, one for every shard.
+    :return: generator of (path, result map, typo positions) tuples of the files with typos in the order
+    of their relative paths, or None if the partial results don't belong together.
+    """
+    suggestions = {}
+    shard_file_paths = {}
+    shard_counts = set()
+    fingerprints = set()
+
+    for partial_file_path in partial_file_paths:
+        header = trailer = None
+        try:
+            for document in _read_lines(partial_file_path):
+                if header is None:
+                    header = document
+                elif 'fingerprint' in document:
+                    trailer = document
+        except (IOError, ValueError) as e:
+            _log.error("Partial result couldn't be read: \'%s\' (%s)" % (partial_file_path, e))
+            return None
+
+        if header is None or header.get('version') != PARTIAL_RESULT_VERSION or trailer is None:
+            _log.error("Not a complete partial result file: \'%s\'" % partial_file_path)
+            return None
+
+        shard_number, shard_count = header['shard']
+        if shard_number in shard_file_paths:
+            _log.error("Shard %d/%d is given twice: \'%s\' and \'%s\'"
+                       % (shard_number, shard_count, shard_file_paths[shard_number], partial_file_path))
+            return None
+
+        shard_file_paths[shard_number] = partial_file_path
+        shard_counts.add(shard_count)
+        fingerprints.add(trailer['fingerprint'])
+        suggestions.update(trailer['suggestions'])
+
+    if len(shard_counts) != 1:
+        _log.error("The partial results belong to different numbers of shards: %s" % sorted(shard_counts))
+        return None
+
+    if len(fingerprints) != 1:
+        _log.error("The shards were checked with different dictionaries or arguments.")
+        return None
+
+    shard_count = shard_counts.pop()
+    missing_shard_numbers = sorted(set(range(1, shard_count + 1)).difference(shard_file_paths))
+    if missing_shard_numbers:
+        _log.error("Partial results are missing of shard(s): %s"
+                   % ', '.join("%d/%d" % (shard_number, shard_count) for shard_number in missing_shard_numbers))
+        return None
+
+    return _iter_merged_files(shard_file_paths, suggestions)
+
+
+def _encode(text):
+    return None if text is None else text.encode('utf-8')
+
+
+def _iter_merged_files(shard_file_paths, suggestions):
+    files = heapq.merge(*[_read_files(partial_file_path, shard_number)
+                          for shard_number, partial_file_path in sorted(shard_file_paths.items())])
+    for _, _, document in files:
+        result_map = dict((word.encode('utf-8'), _encode(suggestions.get(word))) for word in document['unknown_words'])
+        typo_positions = [(line_number, line.encode('latin-1'),
+                           [(column, word.encode('utf-8')) for column, word in positions])
+                          for line_number, line, positions in document['typo_positions']]
+        yield document['path'].encode('utf-8'), result_map, typo_positions
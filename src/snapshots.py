@@ -0,0 +1,173 @@
+"""
+This file contains the implementation of the ReloadingLinguist class.
+Use this class to share a Linguist between threads while its dictionary
+is reloaded or trained: the checks go on with the old dictionary until
+the new one is ready.
+"""
+
+import logging
+import threading
+
+from src.linguist import Linguist
+from src.layers import LayeredDictionary
+from src.journal import JOURNAL_SUFFIX
+from src.watcher import FileWatcher
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+# Seconds between two checks of the dictionary file for changes.
+RELOAD_INTERVAL = 1.0
+
+
+class ReloadingLinguist(object):
+    """
+    Holds a snapshot of a dictionary: a Linguist with the dictionary and its indexes loaded, which is never
+    modified after it has been published.
+      * Readers take the current snapshot (get_linguist()) without locking and use it as long as they like.
+        A reader which needs its own words (e.g. a project dictionary) layers a private Linguist over it
+        (see create_private_linguist()).
+      * load() and train() build a new Linguist next to the published one and publish it by replacing
+        a single reference. The old snapshot is freed when its last reader drops it.
+      * start_auto_reload() loads the dictionary again whenever its file or its journal changes.
+    The trained words are kept in memory only, loading the dictionary file again drops them.
+    """
+    def __init__(self, dictionary_file_path, create_linguist=Linguist, reload_interval=RELOAD_INTERVAL):
+        """
+        :param dictionary_file_path: path to a dictionary file (json or compiled).
+        :param create_linguist: function without arguments which returns a new Linguist without a dictionary
+        (e.g. functools.partial(Linguist, 'symspell')). The Linguists can share a SuggestionCache.
+        :param reload_interval: seconds between two checks of the dictionary file by start_auto_reload().
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._dictionary_file_path = dictionary_file_path
+        self._create_linguist = create_linguist
+        self._reload_interval = reload_interval
+
+        self._linguist = self._prepare(create_linguist())
+        # Only one new snapshot is built at a time, the readers never wait for it.
+        self._write_lock = threading.Lock()
+        self._watcher = FileWatcher(lambda: [dictionary_file_path, dictionary_file_path + JOURNAL_SUFFIX])
+        self._stop_event = threading.Event()
+        self._reload_thread = None
+
+    @staticmethod
+    def _prepare(linguist):
+        """
+        Calculates the lazily built state of a Linguist which is shared by its readers before it is published.
+
+        :return: the Linguist.
+        """
+        linguist.get_fingerprint()
+        return linguist
+
+    def get_linguist(self):
+        """
+        :return: the current snapshot. It must not be modified.
+        """
+        return self._linguist
+
+    def create_private_linguist(self):
+        """
+        :return: new Linguist with an empty layer over the current snapshot (see Linguist.layer_over()). It can be
+        trained and layered by its owner: the snapshot is not modified and its indexes are not built again.
+        """
+        linguist = self._create_linguist()
+        linguist.layer_over(self._linguist)
+        return linguist
+
+    def not_known(self, word_set):
+        return self._linguist.not_known(word_set)
+
+    def correct(self, word):
+        return self._linguist.correct(word)
+
+    def correct_many(self, word_list):
+        return self._linguist.correct_many(word_list)
+
+    def suggest(self, word, k=3):
+        return self._linguist.suggest(word, k)
+
+    def load(self):
+        """
+        Loads the dictionary file (with its journal) into a new snapshot and publishes it.
+
+        :return: True if the new snapshot has been published, False if the dictionary couldn't be loaded
+        (the current snapshot is kept).
+        """
+        with self._write_lock:
+            # The file is stamped before it is read, a change while loading it is loaded again.
+            self._watcher.poll()
+
+            linguist = self._create_linguist()
+            linguist.load_dictionary(self._dictionary_file_path)
+            if not linguist.get_dictionary():
+                _log.error("Dictionary couldn't be loaded, the current one is kept: \'%s\'"
+                           % self._dictionary_file_path)
+                return False
+
+            self._linguist = self._prepare(linguist)
+
+        _log.info("New dictionary snapshot has been published: \'%s\'" % self._dictionary_file_path)
+        return True
+
+    def train(self, word_counts=None, deleted_words=None):
+        """
+        Publishes a new snapshot with the changes of a batch of training. The dictionary of the current snapshot
+        and its indexes are not copied: the new one is a layer over them (see Linguist.layer_over()),
+        only the trained and deleted words are indexed.
+
+        :param word_counts: mapping of lowercase words to the number their likelihood is incremented by.
+        :param deleted_words: words which are deleted from the dictionary.
+        """
+        if not word_counts and not deleted_words:
+            _log.warning("No words will be changed in the dictionary: the training is empty.")
+            return
+
+        with self._write_lock:
+            linguist = self._create_linguist()
+            if isinstance(self._linguist.get_dictionary(), LayeredDictionary):
+                # The trainings share one layer, the lookups don't get slower with every training.
+                linguist.copy_layer(self._linguist)
+            else:
+                linguist.layer_over(self._linguist)
+            if word_counts:
+                linguist.train_dictionary_counts(word_counts)
+            if deleted_words:
+                linguist.delete_from_dictionary(deleted_words)
+
+            self._linguist = self._prepare(linguist)
+
+        _log.info("New dictionary snapshot has been published after training.")
+
+    def start_auto_reload(self):
+        """
+        Starts a background thread which loads the dictionary again (see load()) whenever its file
+        or its journal changes, until stop_auto_reload() is called.
+        """
+        if self._reload_thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._reload_thread = threading.Thread(target=self._reload_changed_dictionary,
+                                               name='dictionary-reload')
+        # The thread doesn't keep the process running.
+        self._reload_thread.daemon = True
+        self._reload_thread.start()
+
+    def stop_auto_reload(self):
+        if self._reload_thread is None:
+            return
+
+        self._stop_event.set()
+        self._reload_thread.join()
+        self._reload_thread = None
+
+    def _reload_changed_dictionary(self):
+        while not self._stop_event.wait(self._reload_interval):
+            changed_file_paths, removed_file_paths = self._watcher.poll()
+            if changed_file_paths or removed_file_paths:
+                _log.info("Dictionary has been changed, it is loaded again: \'%s\'" % self._dictionary_file_path)
+                self.load()
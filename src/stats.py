@@ -0,0 +1,238 @@
+"""
+This file contains the implementation of the Statistics class.
+Use this class to measure where the time of a run goes: the phases,
+the checked files and the corrected words.
+"""
+
+import collections
+import heapq
+import json
+import logging
+import os
+import time
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+
+def _cpu_time():
+    user_time, system_time = os.times()[:2]
+    return user_time + system_time
+
+
+class _Measurement(object):
+    """
+    Context manager which measures the wall and CPU time of its block and passes them to a callback.
+    """
+    def __init__(self, callback):
+        self._callback = callback
+
+    def __enter__(self):
+        self._wall_start = time.time()
+        self._cpu_start = _cpu_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._callback(time.time() - self._wall_start, _cpu_time() - self._cpu_start)
+        return False
+
+
+class _NoMeasurement(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class Statistics(object):
+    """
+    Collects timings and counters of a run:
+      * wall and CPU time of named phases (e.g. discovery, tokenization, correction).
+      * wall and CPU time of every checked file.
+      * number of generated candidates per tier, the tier of the suggestion and the time of every correction.
+    Only the totals and the slowest files and words are kept, so the memory use doesn't grow with the run.
+    """
+    # Checked by the instrumented code before it measures anything, see NO_STATISTICS.
+    enabled = True
+
+    def __init__(self, slowest_count=10):
+        """
+        :param slowest_count: number of the slowest files and words kept for the summary.
+        """
+        self._slowest_count = slowest_count
+
+        # Maps a phase name to its [wall time, CPU time, count].
+        self._phases = collections.OrderedDict()
+        self._file_count = 0
+        self._slowest_files = []
+        # Maps a tier ('known', 'distance1', ..., 'none') to the number of corrections finished there.
+        self._tiers = collections.defaultdict(int)
+        self._correction_count = 0
+        self._correction_seconds = 0.0
+        self._candidate_count = 0
+        # Maps a searched tier ('distance1', 'distance2', ...) to the number of candidates generated in it.
+        self._tier_candidates = collections.defaultdict(int)
+        self._slowest_words = []
+
+    def phase(self, name):
+        """
+        :param name: name of the phase.
+        :return: context manager which measures the phase.
+        """
+        return _Measurement(lambda wall_seconds, cpu_seconds: self.record_phase(name, wall_seconds, cpu_seconds))
+
+    def file_check(self, file_path):
+        """
+        :param file_path: path to the checked file.
+        :return: context manager which measures the check of the file.
+        """
+        return _Measurement(lambda wall_seconds, cpu_seconds: self.record_file(file_path, wall_seconds, cpu_seconds))
+
+    def record_phase(self, name, wall_seconds, cpu_seconds, count=1):
+        totals = self._phases.setdefault(name, [0.0, 0.0, 0])
+        totals[0] += wall_seconds
+        totals[1] += cpu_seconds
+        totals[2] += count
+
+    def record_file(self, file_path, wall_seconds, cpu_seconds):
+        self._file_count += 1
+        self.record_phase('files', wall_seconds, cpu_seconds)
+        self._keep_slowest(self._slowest_files, (wall_seconds, cpu_seconds, file_path))
+
+    def record_correction(self, word, tier, candidate_counts, seconds):
+        """
+        :param word: the corrected word.
+        :param tier: where the suggestion was found: 'known', 'distance1', 'distance2', ... or 'none'.
+        :param candidate_counts: dictionary which maps the searched tiers ('distance1', 'distance2', ...)
+        to the number of candidates generated or examined by the engine in them.
+        :param seconds: wall time of the correction.
+        """
+        candidate_count = sum(candidate_counts.values())
+        self._correction_count += 1
+        self._correction_seconds += seconds
+        self._candidate_count += candidate_count
+        for candidate_tier, count in candidate_counts.items():
+            self._tier_candidates[candidate_tier] += count
+        self._tiers[tier] += 1
+        self._keep_slowest(self._slowest_words, (seconds, candidate_count, tier, word))
+
+    def _keep_slowest(self, heap, item):
+        if len(heap) < self._slowest_count:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heappushpop(heap, item)
+
+    def merge(self, other):
+        """
+        Adds the statistics of another run (e.g. a worker process) to these.
+        """
+        for name, (wall_seconds, cpu_seconds, count) in other._phases.items():
+            self.record_phase(name, wall_seconds, cpu_seconds, count)
+        self._file_count += other._file_count
+        for item in other._slowest_files:
+            self._keep_slowest(self._slowest_files, item)
+        for tier, count in other._tiers.items():
+            self._tiers[tier] += count
+        self._correction_count += other._correction_count
+        self._correction_seconds += other._correction_seconds
+        self._candidate_count += other._candidate_count
+        for tier, count in other._tier_candidates.items():
+            self._tier_candidates[tier] += count
+        for item in other._slowest_words:
+            self._keep_slowest(self._slowest_words, item)
+
+    def get_summary(self):
+        """
+        :return: dictionary of the collected statistics (can be dumped as json).
+        """
+        return {
+            'phases': collections.OrderedDict(
+                (name, {'wall_seconds': wall_seconds, 'cpu_seconds': cpu_seconds, 'count': count})
+                for name, (wall_seconds, cpu_seconds, count) in self._phases.items()),
+            'files': {
+                'count': self._file_count,
+                'slowest': [{'path': path, 'wall_seconds': wall_seconds, 'cpu_seconds': cpu_seconds}
+                            for wall_seconds, cpu_seconds, path in sorted(self._slowest_files, reverse=True)],
+            },
+            'corrections': {
+                'count': self._correction_count,
+                'seconds': self._correction_seconds,
+                'candidates': self._candidate_count,
+                'tier_candidates': dict(self._tier_candidates),
+                'tiers': dict(self._tiers),
+                'slowest': [{'word': word, 'tier': tier, 'candidates': candidate_count, 'seconds': seconds}
+                            for seconds, candidate_count, tier, word in sorted(self._slowest_words, reverse=True)],
+            },
+        }
+
+    def print_summary(self, stream, is_json=False):
+        """
+        Prints the collected statistics.
+
+        :param stream: file object to print to.
+        :param is_json: print json instead of tables.
+        """
+        summary = self.get_summary()
+
+        if is_json:
+            stream.write(json.dumps(summary, indent=2, separators=(',', ': ')) + "\n")
+            return
+
+        lines = ["", "=" * 72, "{0:40} {1:>10} {2:>10} {3:>8}".format("Phase", "Wall s", "CPU s", "Count"), "-" * 72]
+        for name, phase in summary['phases'].items():
+            lines.append("{0:40} {1:>10.3f} {2:>10.3f} {3:>8}".format(name, phase['wall_seconds'],
+                                                                     phase['cpu_seconds'], phase['count']))
+
+        corrections = summary['corrections']
+        lines += ["-" * 72,
+                  "Corrections: %d in %.3f s, %d candidate(s). Tiers: %s" % (
+                      corrections['count'], corrections['seconds'], corrections['candidates'],
+                      ', '.join("%s=%d" % item for item in sorted(corrections['tiers'].items())) or '-'),
+                  "Candidates per tier: %s" % (
+                      ', '.join("%s=%d" % item for item in sorted(corrections['tier_candidates'].items())) or '-')]
+        if corrections['slowest']:
+            lines += ["-" * 72, "{0:40} {1:>10} {2:>10} {3:>8}".format("Slowest word", "Seconds", "Tier", "Cand.")]
+            for item in corrections['slowest']:
+                lines.append("{0:40} {1:>10.4f} {2:>10} {3:>8}".format(item['word'], item['seconds'],
+                                                                      item['tier'], item['candidates']))
+
+        if summary['files']['slowest']:
+            lines += ["-" * 72, "{0:51} {1:>10} {2:>8}".format("Slowest file (of %d)" % summary['files']['count'],
+                                                                  "Wall s", "CPU s")]
+            for item in summary['files']['slowest']:
+                lines.append("{0:51} {1:>10.3f} {2:>8.3f}".format(item['path'][-51:], item['wall_seconds'],
+                                                                  item['cpu_seconds']))
+
+        lines.append("=" * 72)
+        stream.write("\n".join(lines) + "\n")
+
+
+class _NoStatistics(Statistics):
+    """
+    Statistics which doesn't measure anything. The instrumented code checks 'enabled' first,
+    so a disabled run only pays for an attribute lookup.
+    """
+    enabled = False
+
+    def phase(self, name):
+        return _NO_MEASUREMENT
+
+    def file_check(self, file_path):
+        return _NO_MEASUREMENT
+
+    def record_phase(self, name, wall_seconds, cpu_seconds, count=1):
+        pass
+
+    def record_file(self, file_path, wall_seconds, cpu_seconds):
+        pass
+
+    def record_correction(self, word, tier, candidate_counts, seconds):
+        pass
+
+
+_NO_MEASUREMENT = _NoMeasurement()
+
+# Shared by every object which has no statistics to collect.
+NO_STATISTICS = _NoStatistics()
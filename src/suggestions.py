@@ -0,0 +1,222 @@
+"""
+This file contains the implementation of the SuggestionCache class.
+Use this class to remember the suggestions of the Linguist, in memory
+and optionally on disk across runs.
+"""
+
+import collections
+import logging
+import os
+import sqlite3
+import threading
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+# Returned by get() if the word is not cached. None can't be used: it is a valid suggestion.
+MISSING = object()
+
+
+class SuggestionCache(object):
+    """
+    Two level cache of suggestions keyed by the word and a version stamp of the dictionary.
+      * An in-process LRU cache holding maximum max_size suggestions.
+      * An optional sqlite database holding maximum max_database_size suggestions. When it grows larger,
+        the least recently stored suggestions are evicted.
+    Suggestions of an older dictionary version are never returned. The in-process cache is cleared
+    when the stamp changes, the database keeps them until they are evicted.
+    The suggestions are written into the database in batches of max_pending_size, one transaction per batch.
+    Call flush() or close() at the end, otherwise the last batch is lost.
+    The cache can be shared by the threads of a process (e.g. by the snapshots of a ReloadingLinguist).
+    """
+    def __init__(self, max_size=10000, database_path=None, max_database_size=100000, max_pending_size=100):
+        """
+        :param max_size: maximum number of suggestions in memory.
+        :param database_path: path to the sqlite database file (could be non-existent), None disables it.
+        :param max_database_size: maximum number of suggestions in the database.
+        :param max_pending_size: number of suggestions written into the database together.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._max_size = max_size
+        self._database_path = database_path
+        self._max_database_size = max_database_size
+        self._max_pending_size = max_pending_size
+
+        self._stamp = None
+        self._lru = collections.OrderedDict()
+        self._statistics = {'hits': 0, 'misses': 0, 'database_hits': 0, 'evictions': 0}
+
+        # The connection belongs to the process which opened it (see _get_connection()).
+        self._connection = None
+        self._connection_pid = None
+        self._puts_since_eviction = 0
+        # Maps (stamp, word) to the suggestions which haven't been written into the database yet.
+        self._pending = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_connection_pid'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def is_persistent(self):
+        """
+        :return: True if the suggestions are stored on disk across runs, False if they are kept in memory only.
+        """
+        return self._database_path is not None
+
+    def get_statistics(self):
+        """
+        :return: dictionary of the hit, miss, database hit and eviction counts.
+        """
+        return dict(self._statistics)
+
+    def _get_connection(self):
+        """
+        Opens the database on first use. A forked process can't use its parent's connection, it opens a new one.
+
+        :return: sqlite connection, or None if there is no database.
+        """
+        if self._database_path is None:
+            return None
+
+        if self._connection is None or self._connection_pid != os.getpid():
+            # The connection is used by one thread at a time (see the lock of get() and put()).
+            self._connection = sqlite3.connect(self._database_path, timeout=30, check_same_thread=False)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS suggestions ("
+                                     "stamp TEXT, word TEXT, suggestion TEXT, "
+                                     "PRIMARY KEY (stamp, word))")
+            self._connection.commit()
+            self._connection_pid = os.getpid()
+
+        return self._connection
+
+    def _set_stamp(self, stamp):
+        if stamp != self._stamp:
+            self._lru.clear()
+            self._stamp = stamp
+
+    def get(self, word, stamp):
+        """
+        :param word: the corrected word.
+        :param stamp: version stamp of the dictionary.
+        :return: the cached suggestion (could be None), or MISSING if the word is not cached.
+        """
+        with self._lock:
+            return self._get(word, stamp)
+
+    def _get(self, word, stamp):
+        self._set_stamp(stamp)
+
+        suggestion = self._lru.pop(word, MISSING)
+        if suggestion is not MISSING:
+            self._lru[word] = suggestion
+            self._statistics['hits'] += 1
+            return suggestion
+
+        suggestion = self._pending.get((stamp, word), MISSING)
+        if suggestion is not MISSING:
+            self._statistics['hits'] += 1
+            self._remember(word, suggestion)
+            return suggestion
+
+        connection = self._get_connection()
+        if connection is not None:
+            try:
+                row = connection.execute("SELECT suggestion FROM suggestions WHERE stamp = ? AND word = ?",
+                                         (stamp, word)).fetchone()
+            except sqlite3.Error as e:
+                _log.debug("Suggestion database is not available: %s" % e)
+                row = None
+
+            if row is not None:
+                self._statistics['hits'] += 1
+                self._statistics['database_hits'] += 1
+                self._remember(word, row[0])
+                return row[0]
+
+        self._statistics['misses'] += 1
+        return MISSING
+
+    def put(self, word, stamp, suggestion):
+        """
+        :param word: the corrected word.
+        :param stamp: version stamp of the dictionary.
+        :param suggestion: suggestion for the word (could be None).
+        """
+        with self._lock:
+            self._put(word, stamp, suggestion)
+
+    def _put(self, word, stamp, suggestion):
+        self._set_stamp(stamp)
+        self._remember(word, suggestion)
+
+        if self._database_path is None:
+            return
+
+        self._pending[(stamp, word)] = suggestion
+        if len(self._pending) >= self._max_pending_size:
+            self._flush()
+
+    def flush(self):
+        """
+        Writes the pending suggestions into the database.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, collections.OrderedDict()
+        try:
+            connection = self._get_connection()
+            # The transaction is opened only when the batch is ready, so the database is locked for a short time.
+            connection.executemany("INSERT OR REPLACE INTO suggestions (stamp, word, suggestion) VALUES (?, ?, ?)",
+                                   [(stamp, word, suggestion) for (stamp, word), suggestion in pending.items()])
+            connection.commit()
+
+            self._puts_since_eviction += len(pending)
+            if self._puts_since_eviction >= max(1, self._max_database_size // 10):
+                self._evict(connection)
+        except sqlite3.Error as e:
+            _log.debug("%d suggestion(s) couldn't be stored: %s" % (len(pending), e))
+
+    def close(self):
+        """
+        Writes the pending suggestions into the database and closes it. It is opened again on the next use.
+        """
+        with self._lock:
+            self._flush()
+            if self._connection is not None and self._connection_pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._connection_pid = None
+
+    def _remember(self, word, suggestion):
+        self._lru[word] = suggestion
+        if len(self._lru) > self._max_size:
+            self._lru.popitem(last=False)
+            self._statistics['evictions'] += 1
+
+    def _evict(self, connection):
+        """
+        Deletes the least recently stored suggestions from the database above max_database_size.
+        """
+        self._puts_since_eviction = 0
+        cursor = connection.execute("DELETE FROM suggestions WHERE rowid IN ("
+                                    "SELECT rowid FROM suggestions ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                                    (self._max_database_size,))
+        connection.commit()
+        if cursor.rowcount > 0:
+            self._statistics['evictions'] += cursor.rowcount
+            _log.debug("%d suggestion(s) have been evicted from the database." % cursor.rowcount)
@@ -0,0 +1,163 @@
+"""
+This file contains the implementation of the SymmetricDeleteIndex class.
+Use this class to find the dictionary words which are close to a word
+without generating every insert, replace and transpose of it.
+"""
+
+import logging
+import time
+
+from src.limits import DEADLINE_CHECK_INTERVAL, DeadlineExceeded
+from src.utils import damerau_levenshtein_distance
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+
+def get_deletes(word, max_distance):
+    """
+    Gets every string which can be made from a word by deleting maximum max_distance characters.
+
+    :param word: the word whose characters will be deleted.
+    :param max_distance: maximum number of deleted characters.
+    :return: set of strings (including the word itself).
+    """
+    deletes = set([word])
+    edges = [word]
+
+    for _ in range(max_distance):
+        edges = set(w[:i] + w[i + 1:] for w in edges for i in range(len(w)))
+        edges.difference_update(deletes)
+        deletes.update(edges)
+
+    return deletes
+
+
+class SymmetricDeleteIndex(object):
+    """
+    Precomputed index of the dictionary words' deletes (the SymSpell algorithm).
+    If two words are maximum max_distance edits away from each other then they have a common
+    string which can be made from both of them by maximum max_distance deletes. Thus a lookup only
+    has to generate the deletes of the looked up word instead of every possible edit of it.
+    """
+    def __init__(self, max_distance=2):
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._max_distance = max_distance
+        # Maps a delete to the word (or the tuple of words) it was made from.
+        # Most deletes belong to a single word, storing it without a container saves a lot of memory.
+        self._deletes = {}
+
+    def build(self, word_list):
+        """
+        Builds the index from scratch.
+
+        :param word_list: the dictionary words.
+        """
+        self._deletes = {}
+        for word in word_list:
+            self.add(word)
+
+        _log.debug("Symmetric delete index has been built with %d entries." % len(self._deletes))
+
+    def add(self, word):
+        """
+        Adds a new word to the index.
+
+        :param word: a word which is not in the index yet.
+        """
+        for delete in get_deletes(word, self._max_distance):
+            entry = self._deletes.get(delete)
+            if entry is None:
+                self._deletes[delete] = word
+            elif isinstance(entry, tuple):
+                self._deletes[delete] = entry + (word,)
+            else:
+                self._deletes[delete] = (entry, word)
+
+    def remove(self, word):
+        """
+        Removes a word from the index.
+
+        :param word: a word which is in the index.
+        """
+        for delete in get_deletes(word, self._max_distance):
+            entry = self._deletes.get(delete)
+            if entry == word:
+                del self._deletes[delete]
+            elif isinstance(entry, tuple) and word in entry:
+                entry = tuple(w for w in entry if w != word)
+                self._deletes[delete] = entry if len(entry) > 1 else entry[0]
+
+    def lookup(self, word, max_distance=None, deadline=None):
+        """
+        Finds the closest words to a word.
+
+        :param word: the word which is looked up.
+        :param max_distance: maximum distance of the found words, if it is lower than the index's.
+        :param deadline: time (see time.time()) the lookup must be finished by, DeadlineExceeded is raised
+        after it (optional).
+        :return: set of words from the index which have the smallest Damerau-Levenshtein distance
+        from the word if it is maximum max_distance, empty set otherwise.
+        """
+        return set(self._lookup(word, max_distance, True, deadline))
+
+    def lookup_within(self, word, max_distance=None, deadline=None):
+        """
+        Finds every word which is close enough to a word.
+
+        :param word: the word which is looked up.
+        :param max_distance: maximum distance of the found words, if it is lower than the index's.
+        :param deadline: time (see time.time()) the lookup must be finished by, DeadlineExceeded is raised
+        after it (optional).
+        :return: dictionary which maps every word from the index maximum max_distance away from the word
+        to its Damerau-Levenshtein distance.
+        """
+        return self._lookup(word, max_distance, False, deadline)
+
+    def _lookup(self, word, max_distance, is_closest_only, deadline=None):
+        """
+        :param word: the word which is looked up.
+        :param max_distance: maximum distance of the found words (the index's by default).
+        :param is_closest_only: find only the words with the smallest distance.
+        :param deadline: time the lookup must be finished by (optional).
+        :return: dictionary which maps the found words to their distance from the word.
+        """
+        found = {}
+        # The words indexed by maximum max_distance deletes are found by the word's deletes up to a lower bound too.
+        bound = min(max_distance or self._max_distance, self._max_distance)
+        checked = set()
+        # Probed deletes and calculated distances, the deadline is checked after every DEADLINE_CHECK_INTERVAL.
+        step_count = 0
+
+        for delete in get_deletes(word, bound):
+            step_count += 1
+            if deadline is not None and step_count % DEADLINE_CHECK_INTERVAL == 0 and time.time() > deadline:
+                raise DeadlineExceeded()
+
+            entry = self._deletes.get(delete)
+            if entry is None:
+                continue
+
+            for candidate in entry if isinstance(entry, tuple) else (entry,):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+
+                if abs(len(candidate) - len(word)) > bound:
+                    continue
+
+                step_count += 1
+                if deadline is not None and step_count % DEADLINE_CHECK_INTERVAL == 0 and time.time() > deadline:
+                    raise DeadlineExceeded()
+
+                distance = damerau_levenshtein_distance(word, candidate)
+                if distance > bound:
+                    continue
+                elif distance < bound and is_closest_only:
+                    found = {}
+                    bound = distance
+                found[candidate] = distance
+
+        return found
@@ -0,0 +1,221 @@
+"""
+This file contains the implementation of the TrieIndex class.
+Use this class to find the dictionary words which are close to a word
+by walking a prefix tree of the dictionary words.
+"""
+
+import logging
+import time
+
+from src.limits import DEADLINE_CHECK_INTERVAL, DeadlineExceeded
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+# Key of the word stored in a trie node. It can't be mistaken for a character of a word.
+_WORD = ''
+
+# Larger than any distance which can be calculated in the trie.
+_INFINITY = 1 << 30
+
+
+class TrieIndex(object):
+    """
+    Prefix tree of the dictionary words.
+    Every node is a dictionary which maps the next characters to the child nodes.
+    A node which ends a word maps the empty string to the word.
+
+    The lookup walks the tree and calculates one row of the Damerau-Levenshtein distance table per node,
+    so words sharing a prefix share the calculation too. A branch is dropped as soon as every value of its
+    last row is larger than the distance bound: none of the words below it can get closer than that.
+    Edited strings are never made, the cost depends on the branching of the dictionary instead of the
+    length of the word and the size of the alphabet.
+    """
+    def __init__(self, max_distance=2):
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._max_distance = max_distance
+        self._root = {}
+
+    def build(self, word_list):
+        """
+        Builds the index from scratch.
+
+        :param word_list: the dictionary words.
+        """
+        self._root = {}
+        for word in word_list:
+            self.add(word)
+
+        _log.debug("Trie index has been built.")
+
+    def add(self, word):
+        """
+        Adds a new word to the index.
+
+        :param word: a word which is not in the index yet.
+        """
+        node = self._root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_WORD] = word
+
+    def remove(self, word):
+        """
+        Removes a word from the index. Nodes which are left without a word below them are removed too.
+
+        :param word: a word which is in the index.
+        """
+        path = [self._root]
+        for char in word:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+
+        path[-1].pop(_WORD, None)
+
+        for depth in range(len(word), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][word[depth - 1]]
+
+    def words_with_prefix(self, prefix):
+        """
+        Finds the words of the index which start with a prefix.
+        Only the branch of the prefix is walked, so it is cheap even for a long prefix.
+
+        :param prefix: beginning of the words.
+        :return: generator of words in alphabetical order.
+        """
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if _WORD in node:
+                yield node[_WORD]
+            stack.extend(node[char] for char in sorted(node, reverse=True) if char != _WORD)
+
+    def lookup(self, word, max_distance=None, deadline=None):
+        """
+        Finds the closest words to a word.
+        The tree is walked with growing distance bounds: a walk with a small bound drops most of the branches
+        early, so a word which has close suggestions doesn't pay for the walk with the maximum bound.
+
+        :param word: the word which is looked up.
+        :param max_distance: maximum distance of the found words, if it is lower than the index's.
+        :param deadline: time (see time.time()) the lookup must be finished by, DeadlineExceeded is raised
+        after it (optional).
+        :return: set of words from the index which have the smallest Damerau-Levenshtein distance
+        from the word if it is maximum max_distance, empty set otherwise.
+        """
+        for bound in range(1, min(max_distance or self._max_distance, self._max_distance) + 1):
+            if deadline is not None and time.time() > deadline:
+                raise DeadlineExceeded()
+
+            closest = self._walk(word, bound, deadline=deadline)
+            if closest:
+                return set(closest)
+
+        return set()
+
+    def lookup_within(self, word, max_distance=None, deadline=None):
+        """
+        Finds every word which is close enough to a word.
+
+        :param word: the word which is looked up.
+        :param max_distance: maximum distance of the found words, if it is lower than the index's.
+        :param deadline: time (see time.time()) the lookup must be finished by, DeadlineExceeded is raised
+        after it (optional).
+        :return: dictionary which maps every word from the index maximum max_distance away from the word
+        to its Damerau-Levenshtein distance.
+        """
+        return self._walk(word, min(max_distance or self._max_distance, self._max_distance), False, deadline)
+
+    def _walk(self, word, bound, is_closest_only=True, deadline=None):
+        """
+        :param word: the word which is looked up.
+        :param bound: maximum distance of the found words.
+        :param is_closest_only: find only the words with the smallest distance (the bound is lowered as they are found).
+        :param deadline: time the walk must be finished by (optional).
+        :return: dictionary which maps the found words to their distance from the word.
+        """
+        # Like in damerau_levenshtein_distance() the table is shifted by one row and column:
+        # table[i + 1][j + 1] is the distance of the node's prefix of length i and word[:j].
+        table = [[_INFINITY] * (len(word) + 2),
+                 [_INFINITY] + list(range(len(word) + 1))]
+        last_row_of_char = {}
+        # The result is stored in a dictionary so the nested function can modify it.
+        result = {'words': {}, 'distance': bound, 'node_count': 0}
+
+        def walk(node, char):
+            if deadline is not None:
+                result['node_count'] += 1
+                if result['node_count'] % DEADLINE_CHECK_INTERVAL == 0 and time.time() > deadline:
+                    raise DeadlineExceeded()
+
+            i = len(table) - 1
+            previous_row = table[i]
+            bound = result['distance']
+            row = [_INFINITY] * (len(word) + 2)
+            row[1] = row_minimum = i
+            last_match_column = 0
+
+            # The distance of two prefixes is at least the difference of their lengths, so only the cells
+            # maximum bound away from the diagonal can be small enough. The others are left infinite.
+            first_column = max(1, i - bound)
+            for j in range(1, first_column):
+                if char == word[j - 1]:
+                    last_match_column = j
+
+            for j in range(first_column, min(len(word), i + bound) + 1):
+                k = last_row_of_char.get(word[j - 1], 0)
+                l = last_match_column
+
+                if char == word[j - 1]:
+                    value = previous_row[j]
+                    last_match_column = j
+                else:
+                    value = previous_row[j] + 1
+
+                if row[j] + 1 < value:
+                    value = row[j] + 1
+                if previous_row[j + 1] + 1 < value:
+                    value = previous_row[j + 1] + 1
+                if k and l and table[k][l] + (i - k - 1) + 1 + (j - l - 1) < value:
+                    value = table[k][l] + (i - k - 1) + 1 + (j - l - 1)
+
+                row[j + 1] = value
+                if value < row_minimum:
+                    row_minimum = value
+
+            distance = row[-1]
+            if _WORD in node and distance <= bound:
+                if distance < bound and is_closest_only:
+                    result['words'] = {}
+                    result['distance'] = distance
+                result['words'][node[_WORD]] = distance
+
+            if row_minimum > result['distance']:
+                return
+
+            table.append(row)
+            previous_char_row = last_row_of_char.get(char, 0)
+            last_row_of_char[char] = i
+            for next_char, child in node.items():
+                if next_char != _WORD:
+                    walk(child, next_char)
+            last_row_of_char[char] = previous_char_row
+            table.pop()
+
+        for char, child in self._root.items():
+            if char != _WORD:
+                walk(child, char)
+
+        return result['words']
@@ -5,7 +5,7 @@ Use this class to find typos in a file based on a dictionary.
 
 import logging
 
-from src.utils import get_words
+from src.utils import get_word_positions
 
 logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
 _root_log = logging.getLogger("typofinder")
@@ -16,16 +16,97 @@ class Typofinder(object):
     """
     Uses a Linguist to decide if a file has typos.
     """
-    def __init__(self, linguist, text_file_path):
+    def __init__(self, linguist, text_file_path, result_map=None, typo_positions=None, cache=None, line_numbers=None,
+                 cache_state=(False, None)):
+        """
+        :param linguist: the Linguist which decides if a word is a typo.
+        :param text_file_path: path to the checked file.
+        :param result_map: the result of an earlier find_typos() call on the same file (e.g. in another process).
+        :param typo_positions: the typo positions found by the same find_typos() call.
+        :param cache: ResultCache of the Linguist which answers for unchanged files without checking them.
+        :param line_numbers: sorted list of the checked lines' numbers (e.g. the changed lines), every line by default.
+        The cache is not used if only some of the lines are checked.
+        :param cache_state: the cache state of the same find_typos() call (see get_cache_state()).
+        """
         self._log = _log.getChild(self.__class__.__name__)
 
         self._linguist = linguist
         self._text_file_path = text_file_path
-        self._result_map = {}
+        self._cache = cache if line_numbers is None else None
+        self._line_numbers = line_numbers
+        self._result_map = result_map or {}
+        # List of (line number, line, [(column, word), ...]) tuples of the lines with typos, in the order of the lines.
+        self._typo_positions = typo_positions or []
+        # Every line of the file, kept after find_typos() if typos were found so overwriting doesn't read it again.
+        self._lines = None
+        # The results have been taken from the cache / key of the entry they are still to be stored in.
+        self._is_cached, self._cache_key = cache_state
+
+    def get_text_file_path(self):
+        return self._text_file_path
+
+    def get_result_map(self):
+        return self._result_map
+
+    def get_typo_positions(self):
+        return self._typo_positions
+
+    def get_cache_state(self):
+        """
+        :return: (is cached, cache key) tuple. The results of a file which were taken from the cache have their
+        suggestions already. The cache key of results which were found without the suggestions is kept,
+        so they are stored by store_results() once the suggestions are set; it is None otherwise.
+        """
+        return self._is_cached, self._cache_key
+
+    def store_results(self, cache):
+        """
+        Stores the results which were found without the suggestions, after set_suggestions() has been called.
+
+        :param cache: the ResultCache which was given to find_typos().
+        """
+        if self._cache_key is None:
+            return
+
+        cache.put_entry(self._cache_key, self._result_map,
+                        [(line_number, positions) for line_number, _, positions in self._typo_positions])
+        self._cache_key = None
+
+    def set_suggestions(self, suggestions):
+        """
+        Sets the suggestions of the unknown words which were found without correcting them
+        (see find_typos(is_correcting=False)).
+
+        :param suggestions: dictionary which maps lowercase words to their suggestion (or None).
+        """
+        self._result_map = dict((word, suggestions.get(word)) for word in self._result_map)
 
-    def print_result_map(self):
+    def iter_findings(self, alternative_count=0):
+        """
+        :param alternative_count: number of alternative suggestions after the suggestion of a typo.
+        :return: generator of (line number, column, word, suggestions) tuples of every typo in the order of the file.
+        The column is the index of the word's first character in the line, the suggestions are a list
+        (empty if there is no suggestion).
+        """
+        alternatives = {}
+        for line_number, _, positions in self._typo_positions:
+            for column, word in positions:
+                lowercase_word = word.lower()
+                suggestion = self._result_map.get(lowercase_word)
+                if not suggestion:
+                    yield line_number, column, word, []
+                    continue
+
+                if alternative_count and lowercase_word not in alternatives:
+                    alternatives[lowercase_word] = [alternative for alternative, _, _ in
+                                                    self._linguist.suggest(lowercase_word, alternative_count + 1)[1:]]
+                yield line_number, column, word, [suggestion] + alternatives.get(lowercase_word, [])
+
+    def print_result_map(self, alternative_count=0):
         """
         Prints a file's typos and suggestions for misspelled words in a table format.
+
+        :param alternative_count: number of alternative suggestions printed under every suggestion.
         """
         if not self._result_map:
             _log.debug("Result map is empty.")
@@ -39,77 +120,237 @@ class Typofinder(object):
                 print("{0:33} ==> {1:>33}".format(word, suggestion))
             else:
                 print("{0:33}".format(word))
+
+            if suggestion and alternative_count:
+                for alternative, distance, _ in self._linguist.suggest(word, alternative_count + 1)[1:]:
+                    print("{0:33}  |  {1:>33}".format("", "%s (%d)" % (alternative, distance)))
         print("+" * 72 + "\n")
 
+    def mark_typos(self, line, positions=None):
+        """
+        Marks the typos of the result map in a line and adds their suggestions.
+        Every typo is replaced at its own position, the line is built in a single pass.
+
+        :param line: a line of text.
+        :param positions: list of (column, word) tuples of the typos in the line. Found from the result map by default.
+        :return: the marked line, or None if the line has no typo.
+        """
+        if positions is None:
+            # Lowering the line's words is necessary because the Linguist's dictionary
+            # contains the words in lowercase too.
+            positions = [(column, word) for column, word in get_word_positions(line)
+                         if word.lower() in self._result_map]
+
+        if not positions:
+            return None
+
+        pieces = []
+        end = 0
+        for column, word in positions:
+            pieces.append(line[end:column])
+
+            suggestion = self._result_map.get(word.lower())
+            if suggestion:
+                pieces.append("[[%s ==> %s]]" % (word, suggestion))
+            else:
+                pieces.append("[[%s]]" % word)
+
+            end = column + len(word)
+        pieces.append(line[end:])
+
+        return "".join(pieces)
+
     def print_affected_rows(self, is_overwrite_mode=False):
         """
         Prints the text file's lines (and it's numbers) where typos were detected.
         It is useful for logging information.
+        Both printing and overwriting use the typo positions found by find_typos(), the file is not checked again.
         """
 
         if not self._result_map:
             _log.debug("Result map is empty.")
             return
 
-        content = file(self._text_file_path).readlines()
-        content = [line.strip("\n") for line in content]
+        if not is_overwrite_mode:
+            for line_number, line, positions in self._typo_positions:
+                print("%d:%s" % (line_number, self.mark_typos(line, positions).strip()))
+            print("")
+            return
 
-        line_number = 0
+        if self._lines is None:
+            # The typos were found in another process, the lines were not sent back from there.
+            self._lines = self.split_lines(self._read_content())
 
-        for line in content:
-            line_number += 1
+        for line_number, line, positions in self._typo_positions:
+            self._lines[line_number - 1] = self.mark_typos(line, positions)
 
-            line_word_set = set(get_words(line))
-            typo_list = self._result_map.keys()
+        with open(self._text_file_path, 'w') as f:
+            # The newline character is needed for the end of the file.
+            f.write("\n".join(self._lines) + "\n")
 
-            # Lowering the line's words is necessary because the Linguist's dictionary
-            # contains the words in lowercase too.
-            if not set([word.lower() for word in line_word_set]).intersection(typo_list):
-                # Checking line is unnecessary because there is no unknown word. Skip to next line.
-                continue
-
-            for word in line_word_set:
-                word_lowered = word.lower()
-                if word_lowered not in typo_list:
-                    continue
+    def print_summary(self):
+        """
+        Prints the name of the file if typos were found in it.
+        """
+        if self._result_map:
+            print("Unknown word(s) has been found in file: \'%s\'" % self._text_file_path)
 
-                suggestion = self._result_map.get(word_lowered)
-                if suggestion:
-                    line = line.replace(word, "[[%s ==> %s]]" % (word, suggestion))
-                else:
-                    line = line.replace(word, "[[%s]]" % word)
+    def execute(self):
+        """
+        Checks a file for typos, makes suggestions based on the Linguist and prints the summary.
+        """
+        self.find_typos()
+        self.print_summary()
 
-            if is_overwrite_mode:
-                content[line_number - 1] = line
-            else:
-                print("%d:%s" % (line_number, line.strip()))
+    def _read_content(self):
+        with open(self._text_file_path) as f:
+            return f.read()
 
-        if is_overwrite_mode:
-            with open(self._text_file_path, 'w') as f:
-                # The newline character is needed for the end of the file.
-                f.write("\n".join(content) + "\n")
-        else:
-            print("")
+    @staticmethod
+    def split_lines(content):
+        """
+        :param content: the text of a file.
+        :return: list of the file's lines without the newline characters.
+        """
+        lines = content.split("\n")
+        if lines[-1] == "":
+            # The newline at the end of the file doesn't start a new line.
+            lines.pop()
+        return lines
 
-    def execute(self):
+    def find_typos(self, is_correcting=True):
         """
-        Checks a file for typos and makes suggestions based on the Linguist.
-        The typofinder's result map will contain the unknown words and a suggestion for fix if possible.
+        Checks a file for typos and makes suggestions based on the Linguist (see find_typos_in_content()).
+
+        :param is_correcting: make the suggestions too. Without it the suggestions of the result map are None
+        until set_suggestions() is called.
+        :return: the result map.
         """
         _log.info("Executing typofinder on \'%s\'" % self._text_file_path)
 
         if not self._linguist.get_dictionary():
             _log.error("Linguist's dictionary is empty. Couldn't recognize typos in file(s).")
-            return
+            return self._result_map
+
+        statistics = self._linguist.get_statistics()
+        with statistics.file_check(self._text_file_path):
+            with statistics.phase('read'):
+                content = self._read_content()
+
+            return self.find_typos_in_content(content, is_correcting)
+
+    def find_typos_in_content(self, content, is_correcting=True):
+        """
+        Checks the content of a file for typos and makes suggestions based on the Linguist.
+        The typofinder's result map will contain the unknown words and a suggestion for fix if possible.
+        The positions of the typos are recorded in the same pass over the content.
+        If the typofinder has a cache, the results of an unchanged content are taken from there. Results with
+        corrections cut short by a time budget are not cached.
+
+        :param content: the text of the file (bytes).
+        :param is_correcting: make the suggestions too (see find_typos()). The results without them are cached
+        by store_results() once their suggestions are set.
+        :return: the result map.
+        """
+        lines = self.split_lines(content)
+
+        cached_results = self._cache.get(content) if self._cache else None
+        if cached_results:
+            _log.debug("Results are taken from the cache for file: \'%s\'" % self._text_file_path)
+            self._result_map, typo_positions = cached_results
+            self.set_typo_positions(typo_positions, lines)
+            self._is_cached = True
+            return self._result_map
+
+        time_limit_count = self._linguist.get_time_limit_count()
+        self._find_typos_in_file(lines, is_correcting)
+        time_limit_count = self._linguist.get_time_limit_count() - time_limit_count
+
+        if time_limit_count:
+            _log.info("Correction of %d word(s) has been cut short by the time budget in file: \'%s\'"
+                      % (time_limit_count, self._text_file_path))
+        elif self._cache and is_correcting:
+            self._cache.put(content, self._result_map,
+                            [(line_number, positions) for line_number, _, positions in self._typo_positions])
+        elif self._cache:
+            self._cache_key = self._cache.get_key(content)
+
+        return self._result_map
 
-        content = set(get_words(file(self._text_file_path).read()))
-        difference = self._linguist.not_known(content)
+    def set_typo_positions(self, typo_positions, lines):
+        """
+        Sets typo positions which were found without the lines (e.g. in the cache or in a server).
+
+        :param typo_positions: list of (line number, [(column, word), ...]) tuples.
+        :param lines: every line of the file.
+        """
+        self._typo_positions = [(line_number, lines[line_number - 1], positions)
+                                for line_number, positions in typo_positions]
+        if self._result_map:
+            self._lines = lines
+
+    def _find_typos_in_file(self, lines, is_correcting=True):
+        """
+        Tokenizes every checked line, asks the Linguist about every distinct word of the file at once
+        and then corrects the unknown ones. The steps are measured as separate phases.
+
+        :param lines: every line of the file.
+        :param is_correcting: correct the unknown words, otherwise their suggestions are None.
+        """
+        statistics = self._linguist.get_statistics()
+
+        if self._line_numbers is None:
+            line_numbers = range(1, len(lines) + 1)
+        else:
+            line_numbers = [line_number for line_number in self._line_numbers if 0 < line_number <= len(lines)]
 
-        if not difference:
+        with statistics.phase('tokenization'):
+            line_positions = [(line_number, get_word_positions(lines[line_number - 1])) for line_number in line_numbers]
+
+        with statistics.phase('not_known'):
+            # Lowering the words is necessary because the Linguist's dictionary contains the words in lowercase too.
+            unknown_words = self._linguist.not_known(set(word.lower() for _, positions in line_positions
+                                                         for _, word in positions))
+
+        if not unknown_words:
             _log.info("No typo(s) found in file: \'%s\'" % self._text_file_path)
             return
 
-        for word in difference:
-            self._result_map[word] = self._linguist.correct(word)
+        for line_number, positions in line_positions:
+            typo_positions = [(column, word) for column, word in positions if word.lower() in unknown_words]
+            if typo_positions:
+                self._typo_positions.append((line_number, lines[line_number - 1], typo_positions))
+
+        self._lines = lines
+        if not is_correcting:
+            self._result_map = dict.fromkeys(unknown_words)
+            return
+
+        with statistics.phase('correction'):
+            self._result_map = self._linguist.correct_many(unknown_words)
+
+    def find_typos_in_lines(self, lines):
+        """
+        Checks lines of text for typos one by one, without reading them all first.
+        The typofinder's result map is updated after every line, so only the unknown words are kept in memory.
+
+        :param lines: any iterable of lines (e.g. a file object or the standard input).
+        :return: generator of (line number, line, [(column, word), ...]) tuples of the lines which have typos,
+        as soon as they are checked.
+        """
+        if not self._linguist.get_dictionary():
+            _log.error("Linguist's dictionary is empty. Couldn't recognize typos in line(s).")
+            return
+
+        for line_number, line in enumerate(lines, 1):
+            positions = get_word_positions(line)
+            difference = self._linguist.not_known(word for _, word in positions)
+            if not difference:
+                continue
+
+            for word in difference:
+                if word not in self._result_map:
+                    self._result_map[word] = self._linguist.correct(word)
 
-        print("Unknown word(s) has been found in file: \'%s\'" % self._text_file_path)
+            line = line.rstrip("\n")
+            yield line_number, line, [(column, word) for column, word in positions if word.lower() in difference]
@@ -5,6 +5,17 @@ This file contains commonly used helper functions.
 import re
 import os
 import sys
+import fnmatch
+import logging
+
+from src.stats import NO_STATISTICS
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+# Directories which are never searched for text files (version control metadata).
+DEFAULT_EXCLUDES = ('.git', '.hg', '.svn')
 
 
 def get_words(text):
@@ -17,6 +28,16 @@ def get_words(text):
     return re.findall("[a-zA-Z]+", text)
 
 
+def get_word_positions(text):
+    """
+    Gets every word from a text with its position.
+
+    :param text: text string.
+    :return: list of (column, word) tuples found in text, the column is the index of the word's first character.
+    """
+    return [(match.start(), match.group()) for match in re.finditer("[a-zA-Z]+", text)]
+
+
 def is_text_file(file_path, block_size=512):
     """
     This algorithm was found here:
@@ -56,25 +77,151 @@ def is_text_file(file_path, block_size=512):
     return float(len(non_text)) / len(block) <= 0.30
 
 
-def find_text_file_abs_paths(directory_path, filter_for_ext=None):
+def find_text_file_abs_paths(directory_path, filter_for_ext=None, statistics=NO_STATISTICS):
     """
     Finds absolute paths of files in directory_path. Filter for specific extensions.
 
     :param directory_path: recursively searched for files.
     :param filter_for_ext: files with these extensions will be collected only. No filtering by default.
+    :param statistics: Statistics which records the discovery and the text file checks (optional).
     :return: list of absolute paths of simple text files found in directory_path.
     """
-    text_file_paths = []
+    return list(iter_text_file_abs_paths(directory_path, filter_for_ext, statistics=statistics))
+
+
+def _matches(name, relative_path, patterns):
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern) for pattern in patterns)
+
+
+def _warn_unreadable_directory(error):
+    _log.warning("Directory can't be read: \'%s\' (%s)" % (error.filename, error))
+
+
+def _walk(directory_path, statistics):
+    """
+    Walks a directory tree top-down with os.walk(), the listing of every directory is measured as the 'discovery'
+    phase. The caller may remove names from the yielded directory name list to prune them.
+
+    :return: generator of (directory path, directory names, file names) tuples.
+    """
+    walker = os.walk(directory_path, onerror=_warn_unreadable_directory)
+    while True:
+        with statistics.phase('discovery'):
+            item = next(walker, None)
+        if item is None:
+            return
+        yield item
+
+
+def iter_file_abs_paths(directory_path, filter_for_ext=None, include=None, exclude=None, statistics=NO_STATISTICS):
+    """
+    Finds absolute paths of the files in directory_path which pass the extension and glob filters lazily,
+    without reading their content (see iter_text_file_abs_paths()).
+
+    :param directory_path: recursively searched for files.
+    :param filter_for_ext: files with these extensions will be collected only. No filtering by default.
+    :param include: glob patterns, only the files matching one of them (by name or by path relative to
+    directory_path) are collected. Every file by default.
+    :param exclude: glob patterns of files and directories which are skipped. Matching directories are not entered.
+    The DEFAULT_EXCLUDES directories are always skipped.
+    :param statistics: Statistics which records the discovery (optional).
+    :return: generator of absolute paths of files found in directory_path.
+    """
     extensions = ''
 
     # If filter_for_ext is given it must be converted to a tuple because of the .endswith() function.
     if filter_for_ext:
         extensions = tuple(filter_for_ext)
 
-    for root, directories, files in os.walk(directory_path):
-        for file_name in files:
-            file_path = os.path.join(os.path.abspath(root), file_name)
-            if file_path.endswith(extensions) and is_text_file(file_path):
-                text_file_paths.append(file_path)
+    exclude = list(DEFAULT_EXCLUDES) + list(exclude or [])
+    root_path = os.path.abspath(directory_path)
+
+    for root, directory_names, file_names in _walk(root_path, statistics):
+        relative_root = os.path.relpath(root, root_path)
+        if relative_root == os.curdir:
+            relative_root = ''
+
+        directory_names[:] = [name for name in directory_names
+                              if not _matches(name, os.path.join(relative_root, name), exclude)]
+
+        for file_name in file_names:
+            if not file_name.endswith(extensions):
+                continue
+
+            relative_path = os.path.join(relative_root, file_name)
+            if include and not _matches(file_name, relative_path, include):
+                continue
+            if _matches(file_name, relative_path, exclude):
+                continue
+
+            yield os.path.join(root, file_name)
+
+
+def iter_text_file_abs_paths(directory_path, filter_for_ext=None, include=None, exclude=None,
+                             statistics=NO_STATISTICS):
+    """
+    Finds absolute paths of simple text files in directory_path lazily: every path is yielded as soon as
+    it is found, the tree is walked only once. The cheap filters (extension, globs) are applied
+    before the content of a file is read.
+
+    :param directory_path: recursively searched for files.
+    :param filter_for_ext: files with these extensions will be collected only. No filtering by default.
+    :param include: glob patterns, only the files matching one of them (by name or by path relative to
+    directory_path) are collected. Every file by default.
+    :param exclude: glob patterns of files and directories which are skipped. Matching directories are not entered.
+    The DEFAULT_EXCLUDES directories are always skipped.
+    :param statistics: Statistics which records the discovery and the text file checks (optional).
+    :return: generator of absolute paths of simple text files found in directory_path.
+    """
+    for file_path in iter_file_abs_paths(directory_path, filter_for_ext, include, exclude, statistics):
+        with statistics.phase('sniffing'):
+            is_text = is_text_file(file_path)
+        if is_text:
+            yield file_path
+
+
+def damerau_levenshtein_distance(source, target):
+    """
+    Calculates the Damerau-Levenshtein distance of two words: the minimum number of
+    deletions, insertions, substitutions and transpositions of two adjacent characters
+    needed to turn the source into the target.
+    Unlike the optimal string alignment distance, this one allows editing a substring
+    more than once, just like applying the Linguist's edits1 twice does.
+    The algorithm was found here:
+    https://en.wikipedia.org/wiki/Damerau%E2%80%93Levenshtein_distance
+
+    :param source: a word.
+    :param target: another word.
+    :return: the distance of the two words.
+    """
+    max_distance = len(source) + len(target)
+
+    # The table is shifted by one row and column: table[i + 1][j + 1] is the distance of
+    # source[:i] and target[:j], the first row and column are sentinels.
+    table = [[max_distance] * (len(target) + 2),
+             [max_distance] + list(range(len(target) + 1))]
+    last_row_of_char = {}
+
+    for i in range(1, len(source) + 1):
+        row = [max_distance, i] + [0] * len(target)
+        last_match_column = 0
+
+        for j in range(1, len(target) + 1):
+            k = last_row_of_char.get(target[j - 1], 0)
+            l = last_match_column
+
+            if source[i - 1] == target[j - 1]:
+                cost = 0
+                last_match_column = j
+            else:
+                cost = 1
+
+            row[j + 1] = min(table[i][j] + cost,
+                             row[j] + 1,
+                             table[i][j + 1] + 1,
+                             table[k][l] + (i - k - 1) + 1 + (j - l - 1))
+
+        table.append(row)
+        last_row_of_char[source[i - 1]] = i
 
-    return text_file_paths
+    return table[-1][-1]
@@ -0,0 +1,116 @@
+"""
+This file contains the implementation of the FileWatcher class.
+Use this class to find out which files of a directory have been modified
+since they were checked, without reading the files.
+"""
+
+import logging
+import os
+import time
+
+logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
+_root_log = logging.getLogger("typofinder")
+_log = _root_log.getChild(__name__)
+
+# Seconds between two polls of the files.
+POLL_INTERVAL = 0.5
+# A burst of writes is over when the files haven't changed for this many seconds.
+QUIET_PERIOD = 0.2
+# The changes are reported after this many seconds even if the files keep changing.
+MAX_DEBOUNCE = 2.0
+
+
+def _get_stamp(file_path):
+    """
+    :return: (modification time, size) tuple of a file, or None if it doesn't exist.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+class FileWatcher(object):
+    """
+    Polls the modification time and the size of files. Only the stamps of the files are kept between polls,
+    so the memory use depends on the number of files, not on how long the watcher runs.
+    A burst of writes (e.g. an editor saving a file in more steps) is reported as one change
+    when the files have been quiet for a while.
+    """
+    def __init__(self, list_file_paths, poll_interval=POLL_INTERVAL, quiet_period=QUIET_PERIOD,
+                 max_debounce=MAX_DEBOUNCE):
+        """
+        :param list_file_paths: function without arguments which returns the paths of the watched files.
+        It is called at every poll, so new files are found too.
+        :param poll_interval: seconds between two polls.
+        :param quiet_period: seconds without changes which end a burst of writes.
+        :param max_debounce: maximum seconds a change is held back while the files keep changing.
+        """
+        self._log = _log.getChild(self.__class__.__name__)
+
+        self._list_file_paths = list_file_paths
+        self._poll_interval = poll_interval
+        self._quiet_period = quiet_period
+        self._max_debounce = max_debounce
+        self._stamps = self._scan()
+
+    def get_file_paths(self):
+        """
+        :return: sorted list of the watched files' paths.
+        """
+        return sorted(self._stamps)
+
+    def _scan(self):
+        """
+        :return: dictionary which maps the paths of the watched files to their (modification time, size) stamp.
+        """
+        stamps = {}
+        for file_path in self._list_file_paths():
+            stamp = _get_stamp(file_path)
+            if stamp is not None:
+                stamps[file_path] = stamp
+        return stamps
+
+    def poll(self):
+        """
+        Compares the files to the last poll.
+
+        :return: (sorted list of the new or modified files' paths, sorted list of the removed files' paths) tuple.
+        """
+        stamps = self._scan()
+        changed_file_paths = sorted(file_path for file_path, stamp in stamps.items()
+                                    if self._stamps.get(file_path) != stamp)
+        removed_file_paths = sorted(file_path for file_path in self._stamps if file_path not in stamps)
+        self._stamps = stamps
+        return changed_file_paths, removed_file_paths
+
+    def wait_for_changes(self):
+        """
+        Blocks until files have been modified, created or removed and the writes have settled.
+
+        :return: (sorted list of the new or modified files' paths, sorted list of the removed files' paths) tuple.
+        """
+        while True:
+            time.sleep(self._poll_interval)
+            changed_file_paths, removed_file_paths = self.poll()
+            if changed_file_paths or removed_file_paths:
+                break
+
+        changed_file_paths = set(changed_file_paths)
+        removed_file_paths = set(removed_file_paths)
+        deadline = time.time() + self._max_debounce
+
+        while time.time() < deadline:
+            time.sleep(self._quiet_period)
+            more_changed_file_paths, more_removed_file_paths = self.poll()
+            if not more_changed_file_paths and not more_removed_file_paths:
+                break
+
+            # A file can be removed and created again during the burst (e.g. saved by renaming a new file over it).
+            changed_file_paths.difference_update(more_removed_file_paths)
+            removed_file_paths.update(more_removed_file_paths)
+            removed_file_paths.difference_update(more_changed_file_paths)
+            changed_file_paths.update(more_changed_file_paths)
+
+        return sorted(changed_file_paths), sorted(removed_file_paths)
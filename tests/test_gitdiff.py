@@ -0,0 +1,47 @@
+"""
+Tests of the git diff parser.
+Run them from the repository's directory: python -m unittest discover -s tests -t .
+"""
+
+import unittest
+
+from src.gitdiff import parse_diff
+
+
+class ParseDiffTest(unittest.TestCase):
+    def test_added_line_which_looks_like_a_file_header(self):
+        diff = "\n".join([
+            "diff --git a.txt a.txt",
+            "index 1111111..2222222 100644",
+            "--- a.txt",
+            "+++ a.txt",
+            "@@ -1,0 +2,2 @@",
+            "+++ not a file header",
+            "+second",
+            "@@ -5 +7 @@",
+            "-old",
+            "+new",
+            "diff --git b.txt b.txt",
+            "--- b.txt",
+            "+++ b.txt",
+            "@@ -0,0 +1 @@",
+            "+first",
+        ])
+
+        self.assertEqual(dict(parse_diff(diff)), {'a.txt': [2, 3, 7], 'b.txt': [1]})
+
+    def test_deleted_file_has_no_changed_lines(self):
+        diff = "\n".join([
+            "diff --git a.txt a.txt",
+            "--- a.txt",
+            "+++ /dev/null",
+            "@@ -1,2 +0,0 @@",
+            "-first",
+            "-second",
+        ])
+
+        self.assertEqual(dict(parse_diff(diff)), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests of the DictionaryJournal class.
+Run them from the repository's directory: python -m unittest discover -s tests -t .
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from src import journal
+from src.journal import DictionaryJournal
+
+
+class DictionaryJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory_path = tempfile.mkdtemp()
+        self.dictionary_file_path = os.path.join(self.directory_path, 'dictionary.json')
+        self.write_dictionary({'hello': 1})
+        self.journal = DictionaryJournal(self.dictionary_file_path)
+
+        self.digest_count = 0
+        self.get_file_digest = journal.get_file_digest
+
+        def counting_get_file_digest(file_path):
+            self.digest_count += 1
+            return self.get_file_digest(file_path)
+        journal.get_file_digest = counting_get_file_digest
+
+    def tearDown(self):
+        journal.get_file_digest = self.get_file_digest
+        shutil.rmtree(self.directory_path)
+
+    def write_dictionary(self, dictionary):
+        # Replaced atomically like a compacted dictionary file.
+        temporary_file_path = self.dictionary_file_path + '.tmp'
+        with open(temporary_file_path, 'w') as f:
+            json.dump(dictionary, f)
+        os.rename(temporary_file_path, self.dictionary_file_path)
+
+    def test_dictionary_is_hashed_only_when_the_journal_is_started(self):
+        self.journal.append({'world': 2})
+        self.journal.append(deleted_words=['hello'])
+
+        self.assertEqual(self.journal.read(), [('add', {'world': 2}), ('delete', ['hello'])])
+        self.assertEqual(self.digest_count, 1)
+
+    def test_touched_dictionary_keeps_its_journal(self):
+        self.journal.append({'world': 2})
+        mtime = os.stat(self.dictionary_file_path).st_mtime + 10
+        os.utime(self.dictionary_file_path, (time.time(), mtime))
+
+        self.assertEqual(self.journal.read(), [('add', {'world': 2})])
+        self.journal.append({'word': 3})
+        self.journal.append({'sword': 4})
+
+        self.assertEqual(self.journal.read(), [('add', {'world': 2}), ('add', {'word': 3}), ('add', {'sword': 4})])
+        # Started, read after the touch and refreshed by the first append after it.
+        self.assertEqual(self.digest_count, 3)
+
+    def test_rewritten_dictionary_drops_the_journal(self):
+        self.journal.append({'world': 2})
+        self.write_dictionary({'hello': 1, 'world': 2})
+
+        self.assertEqual(self.journal.read(), [])
+        self.journal.append({'word': 3})
+        self.assertEqual(self.journal.read(), [('add', {'word': 3})])
+
+    def test_journal_with_a_digest_only_header_is_replayed(self):
+        with open(self.journal.get_path(), 'w') as f:
+            f.write(json.dumps({'snapshot': self.get_file_digest(self.dictionary_file_path)}) + "\n")
+            f.write(json.dumps({'add': {'world': 2}}) + "\n")
+
+        self.journal.append({'word': 3})
+        self.assertEqual(self.journal.read(), [('add', {'world': 2}), ('add', {'word': 3})])
+
+
+if __name__ == '__main__':
+    unittest.main()
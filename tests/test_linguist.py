@@ -0,0 +1,85 @@
+"""
+Tests of the Linguist class.
+Run them from the repository's directory: python -m unittest discover -s tests -t .
+"""
+
+import unittest
+
+from src.linguist import Linguist, ENGINES
+from src.suggestions import SuggestionCache
+
+WORDS = ['hello', 'help', 'helm', 'world', 'word', 'sword', 'spell', 'spelling']
+
+
+class LinguistTest(unittest.TestCase):
+    def test_not_known_after_training_without_loading(self):
+        linguist = Linguist()
+        linguist.train_dictionary(['foo', 'bar'])
+
+        self.assertEqual(linguist.not_known({'foo', 'baz'}), {'baz'})
+
+    def test_not_known_after_training_without_loading_with_bloom_filter(self):
+        linguist = Linguist(use_bloom_filter=True)
+        linguist.train_dictionary(['foo', 'bar'])
+
+        self.assertEqual(linguist.not_known({'foo', 'baz'}), {'baz'})
+
+    def test_layer_over_doesnt_modify_the_other_linguist(self):
+        for engine in ENGINES:
+            base = Linguist(engine)
+            base.train_dictionary(WORDS)
+            fingerprint = base.get_fingerprint()
+
+            layered = Linguist(engine)
+            layered.layer_over(base)
+            layered.train_dictionary(['wordle'])
+            layered.delete_from_dictionary(['word', 'help'])
+
+            expected = Linguist(engine)
+            expected.train_dictionary([word for word in WORDS if word not in ('word', 'help')] + ['wordle'])
+            for word in ['wrd', 'wordl', 'hlp', 'helo', 'spel', 'xyzzy']:
+                self.assertEqual(layered.correct(word), expected.correct(word), (engine, word))
+                self.assertEqual(layered.suggest(word), expected.suggest(word), (engine, word))
+
+            self.assertEqual(base.get_fingerprint(), fingerprint)
+            self.assertEqual(base.not_known({'word', 'help', 'wordle'}), {'wordle'})
+            self.assertEqual(base.correct('wrd'), 'word')
+
+    def test_copy_layer_doesnt_modify_the_other_linguist(self):
+        for engine in ENGINES:
+            base = Linguist(engine)
+            base.train_dictionary(WORDS)
+            layered = Linguist(engine)
+            layered.layer_over(base)
+            layered.train_dictionary(['wordle'])
+            layered.delete_from_dictionary(['help'])
+            fingerprint = layered.get_fingerprint()
+
+            copied = Linguist(engine)
+            copied.copy_layer(layered)
+            copied.train_dictionary(['spells'])
+            copied.delete_from_dictionary(['wordle', 'word'])
+
+            expected = Linguist(engine)
+            expected.train_dictionary([word for word in WORDS if word not in ('word', 'help')] + ['spells'])
+            for word in ['wrd', 'wordl', 'hlp', 'helo', 'spel', 'spels', 'xyzzy']:
+                self.assertEqual(copied.correct(word), expected.correct(word), (engine, word))
+                self.assertEqual(copied.suggest(word), expected.suggest(word), (engine, word))
+            self.assertEqual(copied.get_layer_count(), 1)
+
+            self.assertEqual(layered.get_fingerprint(), fingerprint)
+            self.assertEqual(layered.not_known({'word', 'help', 'wordle', 'spells'}), {'help', 'spells'})
+            self.assertEqual(layered.correct('wordlee'), 'wordle')
+
+    def test_suggestion_cache_is_dropped_when_the_dictionary_changes(self):
+        linguist = Linguist(suggestion_cache=SuggestionCache())
+        linguist.train_dictionary(WORDS)
+        self.assertEqual(linguist.correct('wrd'), 'word')
+
+        linguist.delete_from_dictionary(['word'])
+        self.assertEqual(linguist.correct('wrd'), 'sword')
+        self.assertEqual(linguist.get_suggestion_cache().get_statistics()['hits'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
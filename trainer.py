@@ -4,21 +4,42 @@
 This script is made to maintain the htc-dictionary.json file.
 If you want to add or remove words, please use this script
 instead of modifying the .json file directly.
+The changes are appended to the journal of the dictionary file
+(see src/journal.py) until they are compacted into it.
 """
 
 import os
 import sys
+import time
+import random
 import argparse
 import logging
 import textwrap
+import itertools
+import collections
+import multiprocessing
 
+from benchmarks.corpus import generate_misspellings
 from src.linguist import Linguist
-from src.utils import get_words, is_text_file, find_text_file_abs_paths
+from src.journal import DictionaryJournal
+from src.pruning import PruningPolicy
+from src.utils import get_words, is_text_file, find_text_file_abs_paths, iter_text_file_abs_paths
 
 logging.basicConfig(format='[%(asctime)s][%(levelname)8s][%(name)s]: %(message)s')
 _root_log = logging.getLogger("typofinder")
 _log = _root_log.getChild(__name__)
 
+# Number of bytes read from a training file at once (rounded up to whole lines).
+BLOCK_SIZE = 1 << 20
+# Number of training files counted by a worker process in one task.
+FILES_PER_TASK = 16
+# Number of misspelled words of every probe group whose correction is timed before and after pruning.
+PROBE_WORD_COUNT = 100
+# Maximum length of the probe words: the correction of a longer unknown word takes seconds.
+PROBE_MAX_WORD_LENGTH = 12
+# Names of the probe word groups in the pruning report (see get_probe_words()).
+PROBE_GROUP_NAMES = {'distance2': "2 edits away", 'nohit': "no suggestion"}
+
 
 def set_logging_verbosity(level):
     if not level:
@@ -36,6 +57,12 @@ def get_arguments():
       trainer.py --add hello world --delete hey ho
                             Add 'hello' and 'world' words to htc-dictionary.json
                             file and delete 'hey' and 'ho' words from this file.
+                            The changes are appended to htc-dictionary.json.journal,
+                            they are applied whenever the dictionary is loaded.
+      trainer.py --compact
+                            Fold the changes of htc-dictionary.json.journal into
+                            htc-dictionary.json and empty the journal. Trainers
+                            running at the same time wait until it is finished.
       trainer.py -v -d my-dict.json -t text_file
                             Get every word from text_file and add them to
                             my-dict.json file. It will be created if it was not
@@ -49,6 +76,27 @@ def get_arguments():
                             delete 'test' word from dictionary. Use max level
                             of verbosity (more additional info will be logged
                             to standard error output).
+      trainer.py -j 8 -e .txt -t ../corpus/
+                            Train htc-dictionary.json from every .txt extension
+                            simple text file which can be found in ../corpus/
+                            using 8 processes. The words are counted in the
+                            processes and added to the dictionary at the end,
+                            the counts are the same as with a single process.
+      trainer.py --prune --min-count 2 --max-word-length 30 --protect htc --dry-run
+                            See which words would be pruned from
+                            htc-dictionary.json: the words seen only once and
+                            the words longer than 30 characters, except 'htc'.
+                            The size of the dictionary and the average time of
+                            a correction are printed before and after pruning.
+      trainer.py --prune --keep-top 50000
+                            Keep only the 50000 most likely words of
+                            htc-dictionary.json. The journal is folded into the
+                            dictionary file while it is rewritten.
+      trainer.py --add testing --compile htc-dictionary.bin
+                            Add 'testing' word to htc-dictionary.json and write
+                            the updated dictionary into htc-dictionary.bin in
+                            the compiled format too. The driver script opens a
+                            compiled dictionary faster and with less memory.
     """)
     parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
                                      description=description,
@@ -71,6 +119,35 @@ def get_arguments():
     parser.add_argument('-e', '--ext',
                         help='filter for extensions if input argument is a directory.',
                         action='append', metavar='EXTENSION_TYPE')
+    parser.add_argument('-j', '--jobs',
+                        help='number of processes counting the words of the training files in parallel '
+                             '(1 by default).',
+                        type=int, default=1, metavar='N')
+    parser.add_argument('--compact',
+                        help='fold the journal of the dictionary (the changes made by earlier runs) '
+                             'into the dictionary file.',
+                        action='store_true')
+    parser.add_argument('--prune',
+                        help='remove the words breaking any of the --min-count, --keep-top and --max-word-length '
+                             'rules from the dictionary (after --add, --delete and --train). The dictionary file '
+                             'is rewritten with its journal folded into it.',
+                        action='store_true')
+    parser.add_argument('--min-count',
+                        help='prune the words whose likelihood is lower than this.',
+                        type=int, metavar='COUNT')
+    parser.add_argument('--keep-top',
+                        help='prune every word but the N most likely ones.',
+                        type=int, metavar='N')
+    parser.add_argument('--max-word-length',
+                        help='prune the words longer than this.',
+                        type=int, metavar='LENGTH')
+    parser.add_argument('--protect',
+                        help='never prune these word(s).',
+                        nargs='*', metavar='WORD')
+    parser.add_argument('--compile',
+                        help='write the dictionary (after the other operations) into a file in the compiled '
+                             'format which can be used by the driver script instead of the .json file.',
+                        type=str, metavar='COMPILED_FILE')
     parser.add_argument('--dry-run',
                         help='see the difference between the old and new version of dictionary '
                              'without actually modifying the dictionary.',
@@ -109,13 +186,176 @@ def validate_arguments(args):
             _log.warning('Giving an empty string in extensions will ignore other extension filters. '
                          'The script operates on default: find every simple text file in folder: \'%s\'' % args.train)
 
-    if not args.add and not args.delete and not args.train:
+    if args.jobs < 1:
+        _log.error("Number of jobs must be positive: %d" % args.jobs)
+        return False
+
+    policy_arguments = ('min_count', 'keep_top', 'max_word_length')
+    for name in policy_arguments:
+        if getattr(args, name) is not None and getattr(args, name) < 1:
+            _log.error("Pruning rule must be positive: --%s %d" % (name.replace('_', '-'), getattr(args, name)))
+            return False
+
+    if args.prune and all(getattr(args, name) is None for name in policy_arguments):
+        _log.error('No pruning rule has been given (--min-count, --keep-top or --max-word-length).')
+        return False
+
+    if not args.prune and (args.protect or any(getattr(args, name) is not None for name in policy_arguments)):
+        _log.error('The pruning rules and the protected words are used only with --prune.')
+        return False
+
+    if args.prune and not os.path.exists(args.dictionary):
+        _log.error("Could not prune \'%s\': Dictionary does not exists." % args.dictionary)
+        return False
+
+    if not args.add and not args.delete and not args.train and not args.compile and not args.compact and \
+            not args.prune:
         _log.warning('No operation has been executed on dictionary: \'%s\'' % args.dictionary)
         return False
 
     return True
 
 
+def count_words(file_path_list):
+    """
+    Counts the words of files. A file is read in blocks of whole lines, words never span lines.
+
+    :param file_path_list: paths to text files.
+    :return: collections.Counter of the files' lowercase words.
+    """
+    word_counts = collections.Counter()
+
+    for file_path in file_path_list:
+        _log.debug("Training dictionary from file: \'%s\'" % file_path)
+        with open(file_path) as f:
+            lines = f.readlines(BLOCK_SIZE)
+            while lines:
+                # Lowering the block at once is faster than lowering every word and finds the same words.
+                word_counts.update(get_words("".join(lines).lower()))
+                lines = f.readlines(BLOCK_SIZE)
+
+    return word_counts
+
+
+def count_corpus_words(file_paths, jobs=1):
+    """
+    Counts the words of many files, in parallel if more jobs are given.
+    Only the counts of the distinct words are kept in memory, not the text of the files.
+
+    :param file_paths: iterable of paths to text files.
+    :param jobs: number of worker processes.
+    :return: collections.Counter of the files' lowercase words.
+    """
+    if jobs <= 1:
+        return count_words(file_paths)
+
+    # A worker counts a batch of files at once, so fewer counters are sent back to this process.
+    file_path_iterator = iter(file_paths)
+    batches = iter(lambda: list(itertools.islice(file_path_iterator, FILES_PER_TASK)), [])
+
+    word_counts = collections.Counter()
+    pool = multiprocessing.Pool(jobs)
+    try:
+        # The order of the batches doesn't matter: adding up the counts gives the same result in any order.
+        for batch_word_counts in pool.imap_unordered(count_words, batches):
+            word_counts.update(batch_word_counts)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return word_counts
+
+
+def compact_dictionary(dictionary_file_path):
+    """
+    Folds the journal of a dictionary file into the file.
+
+    :param dictionary_file_path: path to a json dictionary file.
+    """
+    def rewrite_snapshot():
+        linguist = Linguist()
+        linguist.load_dictionary_from_json(dictionary_file_path)
+        linguist.save_dictionary_to_json(dictionary_file_path)
+
+    DictionaryJournal(dictionary_file_path).compact(rewrite_snapshot)
+
+
+def get_probe_words(dictionary, count=PROBE_WORD_COUNT, seed=0):
+    """
+    Makes misspelled words which are slow to correct for a dictionary (see generate_misspellings()): words whose
+    closest dictionary word is 2 edits away and words without any dictionary word within 2 edits. Their correction
+    searches the dictionary the most, a word 1 edit away from a dictionary word is corrected after a few lookups.
+
+    :param dictionary: mapping of words to their likelihood.
+    :param count: maximum number of words per group.
+    :param seed: seed of the generated words, the same dictionary gives the same words.
+    :return: list of (group name, misspelled words) tuples.
+    """
+    cases = generate_misspellings(random.Random(seed), dictionary, count, 3, PROBE_MAX_WORD_LENGTH)
+    return [(PROBE_GROUP_NAMES[case], cases[case]) for case in ('distance2', 'nohit')]
+
+
+def measure_corrections(linguist, words):
+    """
+    :param linguist: Linguist with the loaded dictionary.
+    :param words: the corrected words.
+    :return: the suggestions of the words and the average time of a correction in seconds.
+    """
+    start = time.time()
+    suggestions = [linguist.correct(word) for word in words]
+    return suggestions, (time.time() - start) / max(1, len(words))
+
+
+def print_pruning_report(dictionary_file_path, linguist, policy, pruned_words):
+    """
+    Prints how pruning changes the size of a dictionary and the average time of its corrections.
+
+    :param dictionary_file_path: path to the pruned dictionary file.
+    :param linguist: Linguist with the dictionary before pruning, it is not modified.
+    :param policy: PruningPolicy of the pruning.
+    :param pruned_words: the words which are pruned from the dictionary.
+    """
+    dictionary = linguist.get_dictionary()
+    pruned_linguist = Linguist()
+    pruned_linguist.train_dictionary_counts(dict((word, count) for word, count in dictionary.items()
+                                                 if word not in pruned_words))
+
+    print("Pruning \'%s\' (%s):" % (dictionary_file_path, policy.get_description()))
+    print("  words: %d -> %d (%d pruned)" % (len(dictionary), len(dictionary) - len(pruned_words), len(pruned_words)))
+    for group_name, probe_words in get_probe_words(pruned_linguist.get_dictionary()):
+        suggestions, seconds = measure_corrections(linguist, probe_words)
+        pruned_suggestions, pruned_seconds = measure_corrections(pruned_linguist, probe_words)
+        changed_count = sum(1 for suggestion, pruned_suggestion in zip(suggestions, pruned_suggestions)
+                            if suggestion != pruned_suggestion)
+
+        print("  %s: average correct() time of %d word(s): %.3f ms -> %.3f ms, changed suggestions: %d"
+              % (group_name, len(probe_words), seconds * 1000, pruned_seconds * 1000, changed_count))
+
+
+def prune_dictionary(dictionary_file_path, policy):
+    """
+    Removes the words of a dictionary file which break the rules of a policy. The journal of the dictionary
+    is folded into the file while it is rewritten once (see compact_dictionary()).
+
+    :param dictionary_file_path: path to a json dictionary file.
+    :param policy: PruningPolicy of the pruning.
+    :return: the pruned words.
+    """
+    pruned_words = set()
+
+    def rewrite_snapshot():
+        linguist = Linguist()
+        linguist.load_dictionary_from_json(dictionary_file_path)
+        pruned_words.update(policy.get_pruned_words(linguist.get_dictionary()))
+        if pruned_words:
+            linguist.delete_from_dictionary(pruned_words)
+        linguist.save_dictionary_to_json(dictionary_file_path)
+
+    DictionaryJournal(dictionary_file_path).compact(rewrite_snapshot)
+    return pruned_words
+
+
 def main():
     args = get_arguments()
     set_logging_verbosity(args.verbose)
@@ -123,48 +363,82 @@ def main():
         sys.exit(1)
 
     dictionary_file_path = args.dictionary
+    is_existing = os.path.exists(dictionary_file_path)
 
-    linguist = Linguist()
-
-    if os.path.exists(dictionary_file_path):
-        linguist.load_dictionary_from_json(dictionary_file_path)
+    word_counts = collections.Counter()
 
     if args.train:
         text_file_path = args.train
 
         if os.path.isdir(text_file_path):
-            file_path_list = find_text_file_abs_paths(text_file_path, args.ext)
+            file_paths = iter_text_file_abs_paths(text_file_path, args.ext)
         else:
-            file_path_list = [text_file_path]
+            file_paths = [text_file_path]
 
-        for file_path in file_path_list:
-            _log.debug("Training dictionary from file: \'%s\'" % file_path)
-            linguist.train_dictionary(get_words(file(file_path).read()))
+        word_counts = count_corpus_words(file_paths, args.jobs)
 
     if args.add:
-        add_word_list = [word.lower() for word in args.add]
-        linguist.train_dictionary(add_word_list)
+        word_counts.update(word.lower() for word in args.add)
 
-    if args.delete:
-        delete_word_set = set(word.lower() for word in args.delete)
-        if not linguist.get_dictionary():
-            _log.error("Could not delete from \'%s\': Dictionary does not exists." % dictionary_file_path)
-            sys.exit(1)
-        linguist.delete_from_dictionary(delete_word_set)
+    delete_word_set = set(word.lower() for word in args.delete or [])
+    policy = PruningPolicy(args.min_count, args.keep_top, args.max_word_length, args.protect or [])
+    if delete_word_set and not is_existing and not word_counts:
+        _log.error("Could not delete from \'%s\': Dictionary does not exists." % dictionary_file_path)
+        sys.exit(1)
 
     if args.dry_run:
         linguist_old = Linguist()
-        if os.path.exists(dictionary_file_path):
+        if is_existing:
             linguist_old.load_dictionary_from_json(dictionary_file_path)
 
-        added_words = linguist_old.not_known(set(linguist.get_dictionary()))
+        added_words = linguist_old.not_known(set(word_counts).difference(delete_word_set))
 
         if added_words:
             print("New words to \'%s\': %s." % (dictionary_file_path, ', '.join(added_words)))
         else:
             _log.info("No new words would be added to \'%s\'" % dictionary_file_path)
-    else:
-        linguist.save_dictionary_to_json(dictionary_file_path)
+
+        if args.prune:
+            # The words are pruned from the dictionary as it would be after the other changes.
+            if word_counts:
+                linguist_old.train_dictionary_counts(word_counts)
+            if delete_word_set:
+                linguist_old.delete_from_dictionary(delete_word_set)
+
+            pruned_words = policy.get_pruned_words(linguist_old.get_dictionary())
+            if pruned_words:
+                print("Pruned words of \'%s\': %s." % (dictionary_file_path, ', '.join(sorted(pruned_words))))
+            else:
+                _log.info("No words would be pruned from \'%s\'" % dictionary_file_path)
+            print_pruning_report(dictionary_file_path, linguist_old, policy, pruned_words)
+        return
+
+    if word_counts or delete_word_set:
+        if is_existing:
+            # Only the changes are written, the dictionary file is not rewritten.
+            DictionaryJournal(dictionary_file_path).append(word_counts, delete_word_set)
+        else:
+            linguist = Linguist()
+            linguist.train_dictionary_counts(word_counts)
+            if delete_word_set:
+                linguist.delete_from_dictionary(delete_word_set)
+            linguist.save_dictionary_to_json(dictionary_file_path)
+
+    if args.prune:
+        # The dictionary is measured before pruning, the pruning itself reads it again under the journal's lock.
+        linguist_old = Linguist()
+        linguist_old.load_dictionary_from_json(dictionary_file_path)
+
+        pruned_words = prune_dictionary(dictionary_file_path, policy)
+        _log.info("%d word(s) have been pruned from \'%s\'" % (len(pruned_words), dictionary_file_path))
+        print_pruning_report(dictionary_file_path, linguist_old, policy, pruned_words)
+    elif args.compact:
+        compact_dictionary(dictionary_file_path)
+
+    if args.compile:
+        linguist = Linguist()
+        linguist.load_dictionary_from_json(dictionary_file_path)
+        linguist.save_compiled_dictionary(args.compile)
 
 
 if __name__ == "__main__":